@@ -0,0 +1,27 @@
+import time
+import numpy as np
+import pandas as pd
+
+def make_ohlc(rows: int, freq: str = '5min', seed: int = 0, start: str = '2020-01-01') -> pd.DataFrame:
+    """ Random walk OHLC data with the same columns as the csv files in the data folder """
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.001, rows)))
+    open = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0.0, 0.0005, rows)) * close
+    return pd.DataFrame({
+        'date': pd.date_range(start, periods=rows, freq=freq),
+        'open': open,
+        'high': np.maximum(open, close) + spread,
+        'low': np.minimum(open, close) - spread,
+        'close': close,
+        'volume': rng.uniform(1.0, 100.0, rows),
+    })
+
+def timeit(func, repeat: int = 3) -> float:
+    """ Best wall time of repeat calls in seconds """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
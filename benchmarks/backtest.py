@@ -0,0 +1,47 @@
+""" Backtest of a known action sequence: stepping TradingEnv with its metrics against one backtest call.
+
+Run from the repository root: python -m benchmarks.backtest
+Both give the same accounts and metrics, see tests/test_backtest.py.
+"""
+import numpy as np
+from benchmarks import make_ohlc, timeit
+from environment.data_feeder import PdDataFeeder
+from environment.indicators import RSI, MACD, BollingerBands, ATR
+from environment.scalers import MinMaxScaler
+from environment.trading_env import TradingEnv
+from environment.backtest import backtest
+from environment.metrics import DifferentActions, AccountValue, AccountValueChange, MaxDrawdown, SharpeRatio, AverageWinLossRatio, WinCount, LossCount
+
+def step_env(feeder: PdDataFeeder, actions: np.ndarray) -> dict:
+    """ TradingEnv stepped with every action, returns the start row, account values and metrics """
+    env = TradingEnv(
+        data_feeder=feeder,
+        output_transformer=MinMaxScaler(min=feeder.min, max=feeder.max, incremental=True),
+        initial_balance=10000.0,
+        max_episode_steps=len(actions) + 50,
+        precompute_observations=True,
+        metrics=[DifferentActions(), AccountValue(), AccountValueChange(), MaxDrawdown(), SharpeRatio(), AverageWinLossRatio(), WinCount(), LossCount()],
+        metrics_schedule='episode',
+    )
+    env.reset()
+    start_index = env._index - 1
+    account_values = [env._observations[-1].account_value]
+    for action in actions.tolist():
+        _, _, _, _, info = env.step(action)
+        account_values.append(env._observations[-1].account_value)
+    return {'start_index': start_index, 'account_values': account_values, 'metrics': info['metrics']}
+
+def bench_backtest(feeder: PdDataFeeder, episode_lengths=(1_000, 10_000, 100_000)):
+    close, dates = feeder.column('close'), feeder.dates
+    rng = np.random.default_rng(0)
+    for steps in episode_lengths:
+        actions = rng.integers(0, 3, steps)
+        reference = step_env(feeder, actions)
+
+        env_time = timeit(lambda: step_env(feeder, actions), repeat=1)
+        backtest_time = timeit(lambda: backtest(close, actions, 10000.0, reference['start_index'], dates=dates))
+        print(f"{steps:>7} steps: TradingEnv {env_time * 1e3:9.1f} ms, backtest {backtest_time * 1e3:7.2f} ms ({env_time / backtest_time:6.0f}x)")
+
+if __name__ == '__main__':
+    feeder = PdDataFeeder(make_ohlc(200_000), indicators=[RSI, MACD, BollingerBands, ATR], use_arrays=True)
+    bench_backtest(feeder)
\ No newline at end of file
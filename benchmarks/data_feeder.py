@@ -0,0 +1,30 @@
+""" Per-step cost of PdDataFeeder row access: DataFrame.iloc path against the array-backed path.
+
+Run from the repository root: python -m benchmarks.data_feeder
+Both paths return the same states, see tests/test_data_feeder.py.
+"""
+from benchmarks import make_ohlc, timeit
+from environment.data_feeder import PdDataFeeder
+from environment.indicators import RSI, MACD, BollingerBands, ATR
+
+rows = 100_000
+steps = 20_000
+
+iloc_feeder = PdDataFeeder(make_ohlc(rows), indicators=[RSI, MACD, BollingerBands, ATR])
+array_feeder = PdDataFeeder(make_ohlc(rows), indicators=[RSI, MACD, BollingerBands, ATR], use_arrays=True)
+
+def read_rows(feeder):
+    for index in range(steps):
+        feeder[index]
+
+def read_slices(feeder, window=50):
+    for index in range(steps):
+        feeder.slice(index, index + window)
+
+iloc_time = timeit(lambda: read_rows(iloc_feeder))
+array_time = timeit(lambda: read_rows(array_feeder))
+slice_time = timeit(lambda: read_slices(array_feeder))
+
+print(f"iloc   __getitem__: {iloc_time / steps * 1e6:8.2f} us/step")
+print(f"arrays __getitem__: {array_time / steps * 1e6:8.2f} us/step ({iloc_time / array_time:.1f}x)")
+print(f"arrays slice(50)  : {slice_time / steps * 1e6:8.2f} us/step")
@@ -0,0 +1,72 @@
+""" Indicator benchmarks.
+
+Run from the repository root: python -m benchmarks.indicators
+"""
+import sys
+import tracemalloc
+from benchmarks import make_ohlc, timeit
+from environment.data_feeder import PdDataFeeder
+from environment.indicators import RSI, MACD, BollingerBands, ATR, LondonAsiaSession
+from environment.indicator_engine import rsi_sweep, bollinger_sweep, macd_sweep
+
+def session_loop(data):
+    """ Row by row LondonAsiaSession implementation the vectorized one replaced, see tests/test_indicators.py """
+    data['session'] = 0
+    for index, row in data.iterrows():
+        if not row['date'].dayofweek >= 5:
+            if 2 <= row['date'].hour < 5:
+                data.at[index, 'session'] = 2 # London open session
+            elif 20 <= row['date'].hour < 24 or 0 <= row['date'].hour < 2:
+                data.at[index, 'session'] = 1 # Asia session
+    return data
+
+def bench_sessions(rows: int = 2_000_000, loop_rows: int = 100_000):
+    df = make_ohlc(rows)
+    loop_df = df[:loop_rows].copy()
+
+    loop_time = timeit(lambda: session_loop(loop_df.copy()), repeat=1)
+    vectorized_time = timeit(lambda: LondonAsiaSession(df.copy()).calculate())
+    print(f"LondonAsiaSession loop      : {loop_time:8.3f} s for {loop_rows} rows ({loop_time / loop_rows * rows:.1f} s extrapolated to {rows} rows)")
+    print(f"LondonAsiaSession vectorized: {vectorized_time:8.3f} s for {rows} rows")
+
+def bench_engine(rows: int = 10_000_000):
+    """ Wall time and peak traced memory of PdDataFeeder.add_indicator, indicator classes against IndicatorEngine """
+    df = make_ohlc(rows)
+    for fused in (False, True):
+        # tracemalloc slows down the many small allocations, so time and memory are measured in separate runs
+        elapsed = timeit(lambda: PdDataFeeder(df.copy(), indicators=[RSI, MACD, BollingerBands, ATR], fused_indicators=fused), repeat=1)
+        data = df.copy()
+        tracemalloc.start()
+        PdDataFeeder(data, indicators=[RSI, MACD, BollingerBands, ATR], fused_indicators=fused)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del data
+        name = 'IndicatorEngine  ' if fused else 'indicator classes'
+        print(f"{name}: {elapsed:8.3f} s, peak {peak / 1024**2:8.1f} MB for {rows} rows")
+
+def bench_sweep(rows: int = 1_000_000):
+    """ Parameter grids computed with the sweep functions against one indicator class run per parameter set """
+    df = make_ohlc(rows)
+    close = df['close'].to_numpy()
+    grids = {
+        'RSI': (list(range(5, 35)), lambda window: RSI(df.copy(), window=window).calculate(), rsi_sweep),
+        'BollingerBands': (
+            [(window, num_std) for window in range(10, 40, 5) for num_std in (1.5, 2, 2.5)],
+            lambda params: BollingerBands(df.copy(), *params).calculate(),
+            bollinger_sweep,
+        ),
+        'MACD': (
+            [(short, long, signal) for short in (8, 12, 16) for long in (21, 26, 30) for signal in (7, 9)],
+            lambda params: MACD(df.copy(), *params).calculate(),
+            macd_sweep,
+        ),
+    }
+    for name, (params, single, sweep) in grids.items():
+        loop_time = timeit(lambda: [single(param) for param in params], repeat=1)
+        sweep_time = timeit(lambda: sweep(close, params))
+        print(f"{name:15s} {len(params):3d} parameter sets: per-set loop {loop_time:7.3f} s, sweep {sweep_time:7.3f} s")
+
+if __name__ == '__main__':
+    bench_sessions()
+    bench_engine(*map(int, sys.argv[1:2]))
+    bench_sweep()
@@ -0,0 +1,105 @@
+""" Metrics of many recorded episodes: Metric objects updated state by state against one MetricSuite call, and
+the list keeping SharpeRatio against the constant memory one on a long episode.
+
+Run from the repository root: python -m benchmarks.metrics
+Both give the same results, see tests/test_metrics.py.
+"""
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from environment.state import State
+from environment.metrics import MetricSuite, DifferentActions, AccountValue, AccountValueChange, MaxDrawdown, SharpeRatio, AverageWinLossRatio, WinCount, LossCount
+
+class ListSharpeRatio(SharpeRatio):
+    """ Reference, the SharpeRatio that keeps every daily return and recalculates the mean and std on every result """
+    def update(self, state: State):
+        time_difference_days = (state.date - self.prev_state.date).days
+        if time_difference_days >= 1:
+            self.daily_returns.append((state.account_value - self.prev_state.account_value) / self.prev_state.account_value)
+            self.prev_state = state
+
+    @property
+    def result(self):
+        if len(self.daily_returns) == 0:
+            return 0.0
+
+        std = np.std(self.daily_returns)
+        return 0.0 if std == 0 else np.mean(self.daily_returns) / std * np.sqrt(self.ratio_days)
+
+    def reset(self, prev_state: State = None):
+        self.prev_state = prev_state
+        self.daily_returns = []
+
+def make_episodes(episodes: int, steps: int, freq: str = '5min', seed: int = 0):
+    """ Random equity curves of episodes with lengths between steps / 2 and steps, padded to steps """
+    rng = np.random.default_rng(seed)
+    dates = np.broadcast_to(pd.date_range('2020-01-01', periods=steps, freq=freq).to_numpy(), (episodes, steps))
+    allocations = (rng.random((episodes, steps)) < 0.5).astype(np.float64)
+    returns = 1.0 + rng.normal(0.0, 0.001, (episodes, steps)) * allocations
+    returns[:, 0] = 1.0
+    account_values = 10000.0 * np.cumprod(returns, axis=1)
+    lengths = rng.integers(steps // 2, steps + 1, episodes)
+    return dates, account_values, allocations, lengths
+
+def metrics_loop(dates, account_values, allocations, length) -> dict:
+    """ Reference, the Metric classes updated with one State per step """
+    metrics = [DifferentActions(), AccountValue(), AccountValueChange(), MaxDrawdown(), SharpeRatio(), AverageWinLossRatio(), WinCount(), LossCount()]
+    states = []
+    for date, account_value, allocation in zip(pd.DatetimeIndex(dates[:length]), account_values[:length].tolist(), allocations[:length].tolist()):
+        state = State(date=date, open=1.0, high=1.0, low=1.0, close=1.0)
+        state.balance = account_value
+        state.allocation_percentage = allocation
+        states.append(state)
+
+    for metric in metrics:
+        metric.reset(states[0])
+    for state in states[1:]:
+        for metric in metrics:
+            metric.update(state)
+    return {metric.name: metric.result for metric in metrics}
+
+def bench_metric_suite(episodes: int = 256, steps: int = 5_000):
+    dates, account_values, allocations, lengths = make_episodes(episodes, steps)
+
+    start = time.perf_counter()
+    MetricSuite().compute(dates, account_values, allocations, lengths=lengths)
+    suite_time = time.perf_counter() - start
+
+    loop_episodes = 16
+    start = time.perf_counter()
+    for episode in range(loop_episodes):
+        metrics_loop(dates[episode], account_values[episode], allocations[episode], lengths[episode])
+    loop_time = (time.perf_counter() - start) / loop_episodes * episodes
+
+    print(f"{episodes} episodes of up to {steps} steps: Metric objects {loop_time:7.2f}s (extrapolated), MetricSuite {suite_time:6.3f}s")
+
+def bench_sharpe(steps: int = 200_000, freq: str = '1min'):
+    dates, account_values, _, _ = make_episodes(1, steps, freq=freq)
+    states = []
+    for date, account_value in zip(pd.DatetimeIndex(dates[0]), account_values[0].tolist()):
+        state = State(date=date, open=1.0, high=1.0, low=1.0, close=1.0)
+        state.balance = account_value
+        states.append(state)
+
+    def run(metric):
+        metric.reset(states[0])
+        # the result is read on every step, like TradingEnv does
+        for state in states[1:]:
+            metric.update(state)
+            metric.result
+
+    for metric in (ListSharpeRatio(), SharpeRatio()):
+        start = time.perf_counter()
+        run(metric)
+        elapsed = time.perf_counter() - start
+        # memory is measured in a second run, tracemalloc slows down the loop
+        tracemalloc.start()
+        run(metric)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{metric.__class__.__name__:>20}: {elapsed / steps * 1e6:6.2f} us/step, {size / 1024:8.1f} KB retained, result {metric.result:.6f}")
+
+if __name__ == '__main__':
+    bench_metric_suite()
+    bench_sharpe()
@@ -0,0 +1,90 @@
+""" StandartDeviationReward: the window rebuilding implementation against the incremental one, and the single
+environment protocol (one call per environment) against the batched protocol (one RewardBatch call) for N envs.
+
+Run from the repository root: python -m benchmarks.reward
+"""
+import time
+import numpy as np
+from benchmarks import make_ohlc
+from environment.data_feeder import PdDataFeeder
+from environment.indicators import RSI, MACD, BollingerBands, ATR
+from environment.reward import RewardBatch, AccountValueChangeReward, StandartDeviationReward
+from environment.state import Observations
+
+class WindowStandartDeviationReward(StandartDeviationReward):
+    """ The implementation that rebuilds the close differences of the whole window on every call, see tests/test_reward.py """
+    def __call__(self, observations: Observations) -> float:
+        rt = np.diff([state.close for state in observations])
+        sigma_t_minus_1 = self._calculate_sigma(np.std(rt))
+        volatility_scaling = (self.sigma_tgt / sigma_t_minus_1) * (observations[-1].account_value / observations[-2].account_value)
+        transaction_cost = self.bp * observations[-2].close
+        return float(np.mean(self.mu * volatility_scaling * (rt - transaction_cost)))
+
+def bench_standart_deviation_reward(feeder: PdDataFeeder, window_sizes=(50, 200, 1000), steps: int = 20_000):
+    states = [feeder[index] for index in range(steps)]
+    for state in states:
+        state.balance = 10000.0
+
+    for window_size in window_sizes:
+        line = f"window_size {window_size:>5}:"
+        for reward_function in (WindowStandartDeviationReward(), StandartDeviationReward()):
+            observations = Observations(window_size)
+            for state in states[:window_size]:
+                observations.append(state)
+            start = time.perf_counter()
+            for state in states[window_size:]:
+                observations.append(state)
+                reward_function(observations)
+            elapsed = time.perf_counter() - start
+            line += f"  {reward_function.__name__} {elapsed / (steps - window_size) * 1e6:7.2f} us/call"
+        print(line)
+
+def bench_batch(feeder: PdDataFeeder, num_envs=(1, 16, 256), window_size: int = 50, steps: int = 500):
+    close = feeder.column('close')
+    rng = np.random.default_rng(0)
+    for reward_cls in (AccountValueChangeReward, StandartDeviationReward):
+        for n in num_envs:
+            start_index = rng.integers(0, len(feeder) - window_size - steps, n)
+            account_values = 10000.0 * np.cumprod(1.0 + rng.normal(0.0, 0.001, (window_size + steps, n)), axis=0)
+
+            # one Observations and one reward instance per environment
+            states = [[feeder[start + i] for i in range(window_size + steps)] for start in start_index.tolist()]
+            for env in range(n):
+                for i, state in enumerate(states[env]):
+                    state.balance = account_values[i, env]
+            observations = [Observations(window_size) for _ in range(n)]
+            for env in range(n):
+                for state in states[env][:window_size]:
+                    observations[env].append(state)
+            reward_functions = [reward_cls() for _ in range(n)]
+            single, single_time = [], 0.0
+            for i in range(window_size, window_size + steps):
+                for env in range(n):
+                    observations[env].append(states[env][i])
+                start = time.perf_counter()
+                single.append([reward_functions[env](observations[env]) for env in range(n)])
+                single_time += time.perf_counter() - start
+
+            reward_function = reward_cls()
+            batch, batch_time = [], 0.0
+            for i in range(window_size, window_size + steps):
+                start = time.perf_counter()
+                batch.append(reward_function(RewardBatch(
+                    last_account_value=account_values[i - 1],
+                    account_value=account_values[i],
+                    close_data=close,
+                    index=start_index + i,
+                    window_size=window_size,
+                    new_episode=np.full(n, i == window_size),
+                )))
+                batch_time += time.perf_counter() - start
+
+            print(
+                f"{reward_cls.__name__:>25} N={n:>3}: single {single_time / steps / n * 1e6:7.2f} us/env, "
+                f"batch {batch_time / steps / n * 1e6:7.3f} us/env"
+            )
+
+if __name__ == '__main__':
+    feeder = PdDataFeeder(make_ohlc(50_000), indicators=[RSI, MACD, BollingerBands, ATR], use_arrays=True)
+    bench_standart_deviation_reward(feeder)
+    bench_batch(feeder)
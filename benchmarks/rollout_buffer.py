@@ -0,0 +1,65 @@
+""" PPO rollout storage: the RolloutBuffer of window observations against IndexRolloutBuffer, which stores the row
+index and the newest allocation of every step and rebuilds the windows of a minibatch when it is sampled.
+
+Run from the repository root: python -m benchmarks.rollout_buffer
+"""
+import torch
+from stable_baselines3 import PPO
+from benchmarks import make_ohlc, timeit
+from environment.data_feeder import PdDataFeeder
+from environment.indicators import RSI, MACD, BollingerBands, ATR
+from environment.scalers import MinMaxScaler
+from environment.reward import StandartDeviationReward
+from environment.vec_trading_env import VecTradingEnv
+from environment.index_observations import IndexRolloutBuffer, WindowFeaturesExtractor, set_policy_features
+
+def make_model(feeder: PdDataFeeder, index_observations: bool, n_steps: int, num_envs: int, window_size: int) -> PPO:
+    env = VecTradingEnv(
+        feeder,
+        num_envs=num_envs,
+        output_transformer=MinMaxScaler().fit(feeder),
+        initial_balance=10000.0,
+        max_episode_steps=n_steps // 2,
+        window_size=window_size,
+        reward_function=StandartDeviationReward(),
+        seed=0,
+        index_observations=index_observations,
+    )
+    if not index_observations:
+        return PPO('MlpPolicy', env, n_steps=n_steps, batch_size=64, n_epochs=1, seed=0, device='cpu')
+
+    model = PPO(
+        'MlpPolicy',
+        env,
+        n_steps=n_steps,
+        batch_size=64,
+        n_epochs=1,
+        seed=0,
+        device='cpu',
+        policy_kwargs=dict(features_extractor_class=WindowFeaturesExtractor),
+        rollout_buffer_class=IndexRolloutBuffer,
+    )
+    set_policy_features(model.policy, env.features)
+    return model
+
+def bench_rollout_buffer(feeder: PdDataFeeder, n_steps: int = 2048, num_envs: int = 4, window_sizes=(10, 50, 100)):
+    torch.set_num_threads(1)
+    for window_size in window_sizes:
+        # the rebuilt observations are checked by tests/test_index_observations.py
+        window_model = make_model(feeder, False, n_steps, num_envs, window_size)
+        index_model = make_model(feeder, True, n_steps, num_envs, window_size)
+        window_model.learn(n_steps * num_envs)
+        index_model.learn(n_steps * num_envs)
+
+        window_bytes = window_model.rollout_buffer.observations.nbytes
+        index_bytes = index_model.rollout_buffer.indexes.nbytes + index_model.rollout_buffer.allocations.nbytes
+        window_time = timeit(lambda: window_model.learn(n_steps * num_envs), repeat=1)
+        index_time = timeit(lambda: index_model.learn(n_steps * num_envs), repeat=1)
+        print(
+            f"window {window_size:>3}: observations {window_bytes / 2**20:7.2f} MiB vs {index_bytes / 2**20:5.2f} MiB "
+            f"({window_bytes / index_bytes:5.0f}x), learn {window_time:5.2f} s vs {index_time:5.2f} s"
+        )
+
+if __name__ == '__main__':
+    feeder = PdDataFeeder(make_ohlc(20_000, freq='4h'), indicators=[RSI, MACD, BollingerBands, ATR], use_arrays=True)
+    bench_rollout_buffer(feeder)
\ No newline at end of file
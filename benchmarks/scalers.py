@@ -0,0 +1,43 @@
+""" MinMaxScaler.transform: per-state Python loop against the vectorized and incremental transforms.
+
+Run from the repository root: python -m benchmarks.scalers
+"""
+import numpy as np
+from benchmarks import make_ohlc, timeit
+from environment.data_feeder import PdDataFeeder
+from environment.indicators import RSI, MACD, BollingerBands, ATR
+from environment.scalers import MinMaxScaler
+from environment.state import Observations, OBSERVATION_FEATURES
+
+def transform_loop(observations: Observations, min: float, max: float) -> np.ndarray:
+    """ Reference implementation, the per-state loop MinMaxScaler.transform used before """
+    transformed_data = []
+    for state in observations:
+        row = [(getattr(state, name) - min) / (max - min) for name in OBSERVATION_FEATURES[:-2]]
+        transformed_data.append(row + [state.session, state.allocation_percentage])
+    return np.array(transformed_data)
+
+def bench_transform(feeder: PdDataFeeder, window_size: int = 50, steps: int = 5_000):
+    states = [feeder[index] for index in range(window_size + steps)]
+
+    def run(transform):
+        observations = Observations(window_size)
+        def steps_loop():
+            for state in states:
+                observations.append(state)
+                transform(observations)
+        return steps_loop
+
+    vectorized = MinMaxScaler(feeder.min, feeder.max)
+    incremental = MinMaxScaler(feeder.min, feeder.max, incremental=True)
+    for name, transform in (
+        ('loop', lambda observations: transform_loop(observations, feeder.min, feeder.max)),
+        ('vectorized', vectorized.transform),
+        ('incremental', incremental.transform),
+    ):
+        elapsed = timeit(run(transform))
+        print(f"{name:>12}: {elapsed / len(states) * 1e6:8.2f} us/step")
+
+if __name__ == '__main__':
+    feeder = PdDataFeeder(make_ohlc(20_000), indicators=[RSI, MACD, BollingerBands, ATR], use_arrays=True)
+    bench_transform(feeder)
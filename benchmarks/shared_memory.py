@@ -0,0 +1,65 @@
+""" Memory of SubprocVecEnv workers with a copied and with a shared memory data feeder.
+
+Every worker steps a TradingEnv over the whole dataset. The proportional set size (Pss, shared pages are divided
+between the processes that map them) of the parent and all workers is summed, with shared_memory=True it should stay
+roughly flat as the number of workers grows. Linux only, Pss is read from /proc/<pid>/smaps_rollup.
+
+Run from the repository root: python -m benchmarks.shared_memory
+"""
+import os
+import numpy as np
+from stable_baselines3.common.vec_env import SubprocVecEnv
+from benchmarks import make_ohlc
+from environment.data_feeder import PdDataFeeder
+from environment.indicators import RSI, MACD, BollingerBands, ATR
+from environment.scalers import MinMaxScaler
+from environment.trading_env import TradingEnv
+
+def pss(pid: int) -> int:
+    """ Proportional set size of a process in bytes """
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            if line.startswith('Pss:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+class EnvFactory:
+    """ Picklable env constructor, the feeder is sent to the worker with it """
+    def __init__(self, feeder: PdDataFeeder):
+        self.feeder = feeder
+
+    def __call__(self) -> TradingEnv:
+        return TradingEnv(
+            data_feeder=self.feeder,
+            output_transformer=MinMaxScaler(min=self.feeder.min, max=self.feeder.max, incremental=True),
+            initial_balance=10000.0,
+            max_episode_steps=len(self.feeder),
+        )
+
+def workers_memory(feeder: PdDataFeeder, num_workers: int, steps: int = 200) -> int:
+    vec_env = SubprocVecEnv([EnvFactory(feeder) for _ in range(num_workers)], start_method='spawn')
+    try:
+        vec_env.reset()
+        for action in np.random.default_rng(0).integers(0, 3, (steps, num_workers)):
+            vec_env.step(action)
+        return sum(pss(process.pid) for process in vec_env.processes) + pss(os.getpid())
+    finally:
+        vec_env.close()
+
+def bench_shared_memory(df, workers=(1, 2, 4, 8)):
+    # memory of the interpreters, torch and stable-baselines3 without a dataset worth mentioning
+    small_feeder = PdDataFeeder(df[:1_000].copy(), indicators=[RSI, MACD, BollingerBands, ATR], use_arrays=True)
+    baseline = {num_workers: workers_memory(small_feeder, num_workers) for num_workers in workers}
+
+    for shared_memory in (False, True):
+        feeder = PdDataFeeder(df.copy(), indicators=[RSI, MACD, BollingerBands, ATR], use_arrays=True, shared_memory=shared_memory)
+        for num_workers in workers:
+            total = workers_memory(feeder, num_workers)
+            print(
+                f"shared_memory={shared_memory!s:5} {num_workers} workers: {total / 1024**2:8.1f} MB total Pss, "
+                f"{(total - baseline[num_workers]) / 1024**2:7.1f} MB for the dataset ({feeder.data.nbytes / 1024**2:.1f} MB feature array)"
+            )
+        feeder.close()
+
+if __name__ == '__main__':
+    bench_shared_memory(make_ohlc(1_000_000))
\ No newline at end of file
@@ -0,0 +1,49 @@
+""" Memory and allocations per State, and TradingEnv step throughput.
+
+Run from the repository root: python -m benchmarks.state
+"""
+import time
+import tracemalloc
+import numpy as np
+from benchmarks import make_ohlc
+from environment.data_feeder import PdDataFeeder
+from environment.indicators import RSI, MACD, BollingerBands, ATR
+from environment.scalers import MinMaxScaler
+from environment.reward import AccountValueChangeReward
+from environment.trading_env import TradingEnv
+
+def bench_state_allocation(feeder: PdDataFeeder, count: int = 100_000):
+    states = [None] * count
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for index in range(count):
+        states[index] = feeder[index % len(feeder)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, 'filename')
+    size = sum(stat.size_diff for stat in stats)
+    blocks = sum(stat.count_diff for stat in stats)
+    print(f"State: {size / count:7.1f} bytes and {blocks / count:5.2f} allocations per state")
+
+def bench_steps(feeder: PdDataFeeder, steps: int = 20_000):
+    env = TradingEnv(
+        data_feeder=feeder,
+        output_transformer=MinMaxScaler(min=feeder.min, max=feeder.max),
+        initial_balance=10000.0,
+        max_episode_steps=len(feeder),
+        window_size=50,
+        reward_function=AccountValueChangeReward(),
+    )
+    actions = np.random.default_rng(0).integers(0, 3, steps)
+    env.reset()
+    start = time.perf_counter()
+    for action in actions:
+        env.step(action)
+    elapsed = time.perf_counter() - start
+    print(f"TradingEnv: {steps / elapsed:9.0f} steps/s")
+
+if __name__ == '__main__':
+    feeder = PdDataFeeder(make_ohlc(50_000), indicators=[RSI, MACD, BollingerBands, ATR], use_arrays=True)
+    bench_state_allocation(feeder)
+    bench_steps(feeder)
@@ -0,0 +1,34 @@
+""" London breakout signals: SupportResistanceDetector called row by row against SupportResistanceStrategy.signals.
+
+Run from the repository root: python -m benchmarks.strategies
+Both give the same signals, see tests/test_strategies.py.
+"""
+import numpy as np
+from benchmarks import make_ohlc, timeit
+from environment.data_feeder import PdDataFeeder
+from environment.indicators import RSI, MACD, BollingerBands, ATR, LondonAsiaSession
+from environment.scalers import MinMaxScaler
+from environment.strategies import SupportResistanceDetector, SupportResistanceStrategy
+
+def detector_loop(features: np.ndarray) -> np.ndarray:
+    """ The detector gets every row as the oldest row of a window and is reset after a buy """
+    detector = SupportResistanceDetector()
+    signals = np.zeros(len(features), dtype=np.int64)
+    for row in range(len(features)):
+        signals[row] = detector.detect(features[row:row + 1])
+        if signals[row] == 2:
+            detector.reset()
+    return signals
+
+def bench_signals(rows=(10_000, 100_000, 1_000_000)):
+    for size in rows:
+        feeder = PdDataFeeder(make_ohlc(size), indicators=[RSI, MACD, BollingerBands, ATR, LondonAsiaSession], use_arrays=True)
+        features = MinMaxScaler(min=feeder.min, max=feeder.max).transform_array(feeder.data)
+        strategy = SupportResistanceStrategy()
+
+        loop_time = timeit(lambda: detector_loop(features), repeat=1)
+        strategy_time = timeit(lambda: strategy.signals(features))
+        print(f"{size:>8} rows: detector {loop_time * 1e3:8.1f} ms, strategy {strategy_time * 1e3:6.2f} ms ({loop_time / strategy_time:5.0f}x)")
+
+if __name__ == '__main__':
+    bench_signals()
\ No newline at end of file
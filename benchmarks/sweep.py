@@ -0,0 +1,31 @@
+""" Sweep throughput: backtests per second for a growing number of worker processes sharing one copy of the data.
+
+Scaling is only close to linear up to the number of physical cores, which is printed with the results.
+
+Run from the repository root: python -m benchmarks.sweep
+"""
+import os
+import time
+from benchmarks import make_ohlc
+from environment.data_feeder import PdDataFeeder
+from environment.indicators import RSI, MACD, BollingerBands, ATR, LondonAsiaSession
+from environment.sweep import Sweep
+
+def bench_sweep(feeder: PdDataFeeder, workers=(1, 2, 4, 8)):
+    grid = {
+        'asia_hours': [(start, 2) for start in (19, 20, 21, 22)],
+        'london_hours': [(2, end) for end in (3, 4, 5, 6)] + [(3, 5), (3, 6)],
+    }
+    date_ranges = [(f'{year}-01-01', f'{year}-12-31') for year in (2020, 2021, 2022, 2023)]
+    print(f"{os.cpu_count()} cpus")
+    for max_workers in workers:
+        sweep = Sweep(feeder, grid, date_ranges, max_workers=max_workers)
+        start = time.perf_counter()
+        table = sweep.run()
+        elapsed = time.perf_counter() - start
+        print(f"{max_workers} workers: {len(table)} backtests in {elapsed:6.2f} s, {len(table) / elapsed:7.1f} backtests/s")
+
+if __name__ == '__main__':
+    feeder = PdDataFeeder(make_ohlc(420_000), indicators=[RSI, MACD, BollingerBands, ATR, LondonAsiaSession], use_arrays=True, shared_memory=True)
+    bench_sweep(feeder)
+    feeder.close()
\ No newline at end of file
@@ -0,0 +1,58 @@
+""" Agent evaluation: test.py's loop (TradingEnv, one policy call per observation) for every window against
+evaluate_agent, which steps all windows together with one batched policy call per step.
+
+Run from the repository root: python -m benchmarks.tournament
+Both give the same results, see tests/test_tournament.py.
+"""
+import os
+import tempfile
+import torch
+from stable_baselines3 import PPO
+from benchmarks import make_ohlc, timeit
+from environment.data_feeder import PdDataFeeder
+from environment.indicators import RSI, MACD, BollingerBands, ATR
+from environment.scalers import MinMaxScaler
+from environment.trading_env import TradingEnv
+from environment.tournament import evaluate_agent
+
+def test_loop(feeder: PdDataFeeder, model: PPO, windows) -> list:
+    """ One TradingEnv episode per window stepped like test.py """
+    account_values = []
+    for start, end in windows:
+        start_row, stop_row = feeder.date_rows(start, end)
+        window_feeder = PdDataFeeder(feeder._df.iloc[start_row:stop_row].copy(), use_arrays=True)
+        env = TradingEnv(
+            data_feeder=window_feeder,
+            output_transformer=MinMaxScaler(min=window_feeder.min, max=window_feeder.max, incremental=True),
+            initial_balance=10000.0,
+            max_episode_steps=len(window_feeder),
+            precompute_observations=True,
+            info=(),
+        )
+        obs, info = env.reset()
+        while True:
+            action, _ = model.predict(obs, deterministic=True)
+            obs, reward, terminated, truncated, info = env.step(action)
+            if terminated or truncated:
+                break
+        account_values.append(env._observations[-1].account_value)
+    return account_values
+
+def bench_tournament(feeder: PdDataFeeder, num_windows=(1, 4, 16)):
+    torch.set_num_threads(1)
+    with tempfile.TemporaryDirectory() as runs_path:
+        run_path = os.path.join(runs_path, '1')
+        env = TradingEnv(feeder, MinMaxScaler(min=feeder.min, max=feeder.max), max_episode_steps=100)
+        PPO('MlpPolicy', env, seed=0, device='cpu').save(os.path.join(run_path, 'best_model'))
+        model = PPO.load(os.path.join(run_path, 'best_model'), device='cpu')
+
+        for count in num_windows:
+            windows = [(f'{year}-01-01', f'{year}-06-30') for year in range(2020, 2020 + count)]
+
+            loop_time = timeit(lambda: test_loop(feeder, model, windows), repeat=1)
+            batch_time = timeit(lambda: evaluate_agent(feeder, run_path, windows), repeat=1)
+            print(f"{count:>2} windows: test.py loop {loop_time:6.2f} s, evaluate_agent {batch_time:6.2f} s ({loop_time / batch_time:4.1f}x)")
+
+if __name__ == '__main__':
+    feeder = PdDataFeeder(make_ohlc(40_000, freq='4h'), indicators=[RSI, MACD, BollingerBands, ATR], use_arrays=True)
+    bench_tournament(feeder)
\ No newline at end of file
@@ -0,0 +1,85 @@
+""" TradingEnv step throughput: per-step scaling against precomputed sliding-window observations, the cost of a
+step for growing episode lengths with and without info contents, and the metrics schedules.
+
+Run from the repository root: python -m benchmarks.trading_env
+"""
+import time
+import numpy as np
+from benchmarks import make_ohlc
+from environment.data_feeder import PdDataFeeder
+from environment.indicators import RSI, MACD, BollingerBands, ATR
+from environment.scalers import MinMaxScaler
+from environment.trading_env import TradingEnv
+from environment.metrics import DifferentActions, AccountValue, AccountValueChange, MaxDrawdown, SharpeRatio, AverageWinLossRatio, WinCount, LossCount
+
+def steps_per_second(env: TradingEnv, steps: int) -> float:
+    actions = np.random.default_rng(0).integers(0, 3, steps)
+    env.reset()
+    start = time.perf_counter()
+    for action in actions:
+        env.step(action)
+    return steps / (time.perf_counter() - start)
+
+def bench_window_size(feeder: PdDataFeeder, window_sizes=(10, 50, 200, 1000), steps: int = 10_000):
+    for window_size in window_sizes:
+        line = f"window_size {window_size:>5}:"
+        for name, incremental, precompute_observations in (
+            ('scaler', False, False),
+            ('incremental scaler', True, False),
+            ('precomputed', False, True),
+        ):
+            env = TradingEnv(
+                data_feeder=feeder,
+                output_transformer=MinMaxScaler(min=feeder.min, max=feeder.max, incremental=incremental),
+                initial_balance=10000.0,
+                max_episode_steps=steps + window_size,
+                window_size=window_size,
+                precompute_observations=precompute_observations,
+            )
+            line += f"  {name} {steps_per_second(env, steps):7.0f} steps/s"
+        print(line)
+
+def bench_episode_length(feeder: PdDataFeeder, episode_lengths=(1_000, 10_000, 100_000), steps: int = 20_000):
+    for max_episode_steps in episode_lengths:
+        max_episode_steps = min(max_episode_steps, len(feeder))
+        line = f"max_episode_steps {max_episode_steps:>7}:"
+        for name, info in (('full info', ('states', 'metrics')), ('no info', ())):
+            env = TradingEnv(
+                data_feeder=feeder,
+                output_transformer=MinMaxScaler(min=feeder.min, max=feeder.max, incremental=True),
+                initial_balance=10000.0,
+                max_episode_steps=max_episode_steps,
+                precompute_observations=True,
+                info=info,
+            )
+            line += f"  {name} {steps_per_second(env, min(steps, max_episode_steps - 50)):7.0f} steps/s"
+        print(line)
+
+def bench_metrics_schedule(feeder: PdDataFeeder, schedules=('step', 100, 'episode'), steps: int = 50_000):
+    for metrics_schedule in schedules:
+        env = TradingEnv(
+            data_feeder=feeder,
+            output_transformer=MinMaxScaler(min=feeder.min, max=feeder.max, incremental=True),
+            initial_balance=10000.0,
+            max_episode_steps=steps + 50,
+            precompute_observations=True,
+            info=('metrics',),
+            metrics_schedule=metrics_schedule,
+            metrics=[
+                DifferentActions(),
+                AccountValue(),
+                AccountValueChange(),
+                MaxDrawdown(),
+                SharpeRatio(),
+                AverageWinLossRatio(),
+                WinCount(),
+                LossCount()
+            ]
+        )
+        print(f"metrics_schedule {metrics_schedule!s:>7}: {steps_per_second(env, steps):7.0f} steps/s")
+
+if __name__ == '__main__':
+    feeder = PdDataFeeder(make_ohlc(100_000), indicators=[RSI, MACD, BollingerBands, ATR], use_arrays=True)
+    bench_window_size(feeder)
+    bench_episode_length(feeder)
+    bench_metrics_schedule(feeder)
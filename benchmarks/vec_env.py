@@ -0,0 +1,42 @@
+""" Throughput of VecTradingEnv against DummyVecEnv of TradingEnvs for a growing number of environments.
+
+Run from the repository root: python -m benchmarks.vec_env
+"""
+import time
+import numpy as np
+from stable_baselines3.common.vec_env import DummyVecEnv
+from benchmarks import make_ohlc
+from environment.data_feeder import PdDataFeeder
+from environment.indicators import RSI, MACD, BollingerBands, ATR
+from environment.scalers import MinMaxScaler
+from environment.trading_env import TradingEnv
+from environment.vec_trading_env import VecTradingEnv
+
+def steps_per_second(vec_env, steps: int) -> float:
+    actions = np.random.default_rng(0).integers(0, 3, (steps, vec_env.num_envs))
+    vec_env.reset()
+    start = time.perf_counter()
+    for action in actions:
+        vec_env.step(action)
+    return steps * vec_env.num_envs / (time.perf_counter() - start)
+
+def bench_vec_env(feeder: PdDataFeeder, num_envs=(1, 4, 16, 64, 256), steps: int = 2_000, max_episode_steps: int = 1_000):
+    def make_env():
+        return TradingEnv(
+            data_feeder=feeder,
+            output_transformer=MinMaxScaler(min=feeder.min, max=feeder.max, incremental=True),
+            initial_balance=10000.0,
+            max_episode_steps=max_episode_steps,
+        )
+
+    for n in num_envs:
+        vectorized = steps_per_second(VecTradingEnv(feeder, num_envs=n, initial_balance=10000.0, max_episode_steps=max_episode_steps), steps)
+        line = f"{n:>4} envs: VecTradingEnv {vectorized:10.0f} steps/s"
+        if n <= 16:
+            dummy = steps_per_second(DummyVecEnv([make_env] * n), steps // n)
+            line += f"   DummyVecEnv {dummy:8.0f} steps/s"
+        print(line)
+
+if __name__ == '__main__':
+    feeder = PdDataFeeder(make_ohlc(50_000), indicators=[RSI, MACD, BollingerBands, ATR], use_arrays=True)
+    bench_vec_env(feeder)
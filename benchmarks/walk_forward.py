@@ -0,0 +1,36 @@
+""" Walk-forward wall time for different splits of the cores between concurrent fold trainings and torch threads.
+
+Run from the repository root: python -m benchmarks.walk_forward
+"""
+import os
+import time
+import tempfile
+from benchmarks import make_ohlc
+from environment.data_feeder import PdDataFeeder
+from environment.indicators import RSI, MACD, BollingerBands, ATR
+from environment.walk_forward import WalkForward
+
+def bench_walk_forward(feeder: PdDataFeeder):
+    cpus = os.cpu_count()
+    budgets = sorted({(workers, max(1, cpus // workers)) for workers in (1, 2, 4, 8) if workers <= max(cpus, 1)} | {(1, cpus)})
+    print(f"{cpus} cpus")
+    for max_workers, torch_threads in budgets:
+        walk_forward = WalkForward(
+            feeder,
+            train_size=4_000,
+            test_size=720,
+            ppo_kwargs=dict(n_steps=512),
+            torch_threads=torch_threads,
+            max_workers=max_workers,
+            seed=0,
+        )
+        with tempfile.TemporaryDirectory() as path:
+            start = time.perf_counter()
+            table = walk_forward.run(path)
+            elapsed = time.perf_counter() - start
+        print(f"{max_workers} jobs x {torch_threads} threads: {len(table)} folds in {elapsed:6.1f} s")
+
+if __name__ == '__main__':
+    feeder = PdDataFeeder(make_ohlc(10_000, freq='4h'), indicators=[RSI, MACD, BollingerBands, ATR], use_arrays=True, shared_memory=True)
+    bench_walk_forward(feeder)
+    feeder.close()
\ No newline at end of file
@@ -0,0 +1,91 @@
+import typing
+import numpy as np
+
+from .metrics import MetricSuite
+
+
+class BacktestResult:
+    """
+    Arrays of one backtested episode, the first entry of every array is the reset state and entry i is the state
+    after the action i - 1. actions holds the actions as TradingEnv executes them, with forced holds set to 0.
+    metrics is the MetricSuite result, or None when no dates were given.
+    """
+    def __init__(
+            self,
+            actions: np.ndarray,
+            balance: np.ndarray,
+            assets: np.ndarray,
+            allocation: np.ndarray,
+            account_value: np.ndarray,
+            metrics: dict = None,
+        ) -> None:
+        self.actions = actions
+        self.balance = balance
+        self.assets = assets
+        self.allocation = allocation
+        self.account_value = account_value
+        self.metrics = metrics
+
+    def __len__(self) -> int:
+        return len(self.account_value)
+
+
+def backtest(
+        close: np.ndarray,
+        actions: typing.Iterable[int],
+        initial_balance: float = 1000.0,
+        start_index: int = 0,
+        dates: np.ndarray = None,
+        metric_suite: MetricSuite = None,
+    ) -> BacktestResult:
+    """
+    Run the buy, sell and hold accounting of TradingEnv._take_action for a known action sequence without stepping
+    the environment. close (and dates) are arrays of the whole data feeder, start_index is the row of the reset state
+    (the newest row of the first window) and the action i is taken on the row start_index + i + 1.
+
+    Since buying is forced to hold at allocation 1.0 and selling at allocation 0.0, the executed trades are the
+    actions that differ from the previous buy or sell, which is found with array operations. Only the trades are
+    looped over, the account of every state is then filled in from the last trade before it. The results equal
+    the states of TradingEnv bit for bit.
+    """
+    actions = np.asarray(actions, dtype=np.int64).reshape(-1)
+    steps = len(actions)
+    close = np.asarray(close, dtype=np.float64)[start_index:start_index + steps + 1]
+    assert len(close) == steps + 1, "close must have a row for the reset state and every action after start_index"
+    assert np.all((actions >= 0) & (actions <= 2)), "actions must be 0 (hold), 1 (sell) or 2 (buy)"
+
+    # a buy or sell repeating the previous one is a forced hold, the episode starts out of assets (as after a sell)
+    orders = np.flatnonzero(actions)
+    previous = np.concatenate(([1], actions[orders[:-1]]))
+    trades = orders[actions[orders] != previous]
+
+    # account after every trade, index 0 is the reset state; the operations are the ones of _take_action
+    balances = np.empty(len(trades) + 1, dtype=np.float64)
+    assets = np.empty(len(trades) + 1, dtype=np.float64)
+    balance, asset = float(initial_balance), 0.0
+    balances[0], assets[0] = balance, asset
+    order_size = 1.0
+    for trade, (step, last_close) in enumerate(zip(trades.tolist(), close[trades].tolist()), start=1):
+        if trade % 2: # buy
+            asset = balance * order_size / last_close
+            balance = balance - (balance * order_size)
+        else: # sell
+            balance = asset * order_size * last_close
+            asset = 0.0
+        balances[trade], assets[trade] = balance, asset
+
+    # number of trades executed up to each state, the trade of action i is part of the states from i + 1 on
+    executed = np.searchsorted(trades, np.arange(-1, steps), side='right')
+    balance, asset = balances[executed], assets[executed]
+    allocation = np.where(executed % 2 == 1, order_size, 0.0)
+    account_value = balance + asset * close
+
+    executed_actions = np.zeros(steps, dtype=np.int64)
+    executed_actions[trades] = actions[trades]
+
+    metrics = None
+    if dates is not None:
+        dates = np.asarray(dates)[start_index:start_index + steps + 1]
+        metrics = (metric_suite if metric_suite is not None else MetricSuite()).compute(dates, account_value, allocation)
+
+    return BacktestResult(executed_actions, balance, asset, allocation, account_value, metrics)
\ No newline at end of file
@@ -1,10 +1,24 @@
+import typing
 from typing import Generator
+import numpy as np
 import pandas as pd
-from environment.state import State
+from environment.state import State, OBSERVATION_FEATURES
+from environment.indicator_engine import IndicatorEngine
+from environment.shared_array import SharedArray
+
+# Order of the feature columns in the array representation, the observation features without the allocation
+FEATURE_COLUMNS = OBSERVATION_FEATURES[:-1]
 
 class PdDataFeeder:
     """
     PdDataFeeder class gets a Pandas Dataframe and calculates the states for the feeding environment.
+
+    With fused_indicators=True the indicators known by IndicatorEngine are calculated in one pass over NumPy arrays.
+    With use_arrays=True the indicator-enriched frame is converted once into a contiguous 2-D float array
+    (FEATURE_COLUMNS order) plus a datetime64 column, and rows are read by plain array indexing instead of iloc.
+    With shared_memory=True (implies use_arrays) these arrays are put into shared memory and pickling the feeder
+    only sends their names, so SubprocVecEnv workers attach to the same arrays instead of copying the DataFrame.
+    The creating process owns the shared memory, call close to release it.
     """
     def __init__(
             self, 
@@ -12,10 +26,14 @@ class PdDataFeeder:
             min: float = None,
             max: float = None,
             indicators: list = [],
+            use_arrays: bool = False,
+            fused_indicators: bool = False,
+            shared_memory: bool = False,
             ) -> None:
         self._min = min
         self._max = max
         self._indicators = indicators
+        self._fused_indicators = fused_indicators
         self._df = self.add_indicator(df)
 
         assert isinstance(self._df, pd.DataFrame) == True, "df must be a pandas.DataFrame"
@@ -25,6 +43,15 @@ class PdDataFeeder:
         assert 'low' in self._df.columns, "df must have 'low' column"
         assert 'close' in self._df.columns, "df must have 'close' column"
 
+        self._use_arrays = use_arrays or shared_memory
+        self._dates = None
+        self._data = None
+        self._shared = None
+        if self._use_arrays:
+            self._build_arrays()
+        if shared_memory:
+            self._share()
+
     @property
     def min(self) -> float:
         return self._min or self._df['low'].min()
@@ -33,8 +60,94 @@ class PdDataFeeder:
     def max(self) -> float:
         return self._max or self._df['high'].max()
 
+    @property
+    def columns(self) -> typing.Tuple[str, ...]:
+        return FEATURE_COLUMNS
+
+    @property
+    def dates(self) -> np.ndarray:
+        """ datetime64 array of the dates of all rows """
+        if self._dates is None:
+            self._build_arrays()
+        return self._dates
+
+    @property
+    def data(self) -> np.ndarray:
+        """ 2-D float array (rows x FEATURE_COLUMNS) of all rows """
+        if self._data is None:
+            self._build_arrays()
+        return self._data
+
+    def column(self, name: str) -> np.ndarray:
+        return self.data[:, FEATURE_COLUMNS.index(name)]
+
+    def _build_arrays(self) -> None:
+        self._dates = self._df['date'].to_numpy(dtype='datetime64[ns]')
+        data = np.empty((len(self._df), len(FEATURE_COLUMNS)), dtype=np.float64)
+        for i, name in enumerate(FEATURE_COLUMNS):
+            if name in self._df.columns:
+                data[:, i] = self._df[name].to_numpy(dtype=np.float64)
+            elif name in ('volume', 'session'):
+                data[:, i] = 0.0
+            else:
+                raise KeyError(f"df must have '{name}' column")
+        self._data = data
+
+    def _share(self) -> None:
+        self._min, self._max = self.min, self.max
+        self._shared = (SharedArray(self._dates.view(np.int64)), SharedArray(self._data))
+        self._dates = self._shared[0].array.view('datetime64[ns]')
+        self._data = self._shared[1].array
+
+    def close(self) -> None:
+        """ Release the shared memory of the arrays """
+        if self._shared is not None:
+            for shared in self._shared:
+                shared.close()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        if self._shared is not None:
+            # workers only get the shared arrays, the DataFrame and the array views are rebuilt from them
+            state.update(_df=None, _dates=None, _data=None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        if self._shared is not None:
+            self._dates = self._shared[0].array.view('datetime64[ns]')
+            self._data = self._shared[1].array
+
+    def slice(self, start: int, stop: int) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """ Return (dates, data) views of the rows between start and stop """
+        return self.dates[start:stop], self.data[start:stop]
+
+    def subset(self, start: int, stop: int) -> 'PdDataFeeder':
+        """
+        Return a feeder of the rows between start and stop whose arrays are views of this feeder's arrays, without
+        a DataFrame and without recalculating the indicators (e.g. the folds of a walk-forward run). min and max
+        are the price range of the rows.
+        """
+        feeder = object.__new__(PdDataFeeder)
+        feeder.__dict__.update(self.__dict__)
+        feeder._dates, feeder._data = self.slice(start, stop)
+        feeder._df = None
+        feeder._shared = None
+        feeder._use_arrays = True
+        feeder._min = float(feeder._data[:, FEATURE_COLUMNS.index('low')].min())
+        feeder._max = float(feeder._data[:, FEATURE_COLUMNS.index('high')].max())
+        return feeder
+
+    def date_rows(self, start, end) -> typing.Tuple[int, int]:
+        """ Return the (start, stop) rows of the dates from start to end, both included like df['date'] filters """
+        dates = self.dates
+        return int(np.searchsorted(dates, np.datetime64(start), side='left')), int(np.searchsorted(dates, np.datetime64(end), side='right'))
+
     def add_indicator(self, df, **kwargs) -> pd.DataFrame:
         df['date'] = pd.to_datetime(df['date'])
+        if self._fused_indicators:
+            return IndicatorEngine(self._indicators, **kwargs).calculate(df, dropna=True)
+
         for indicator_cls in self._indicators:
             indicator = indicator_cls(df, **kwargs)
             df = indicator.calculate()
@@ -42,9 +155,12 @@ class PdDataFeeder:
         return df
 
     def __len__(self) -> int:
-        return len(self._df)
+        return len(self._df) if self._df is not None else len(self._data)
     
     def __getitem__(self, idx: int, args=None) -> State:
+        if self._use_arrays:
+            return self._get_array_state(idx)
+
         data = self._df.iloc[idx]
 
         state = State(
@@ -63,10 +179,35 @@ class PdDataFeeder:
             rsi=data['rsi'],
             macd=data['macd'],
             signal=data['signal'],
+            session=data.get('session', 0),
         )
 
         return state
     
+    def _get_array_state(self, idx: int) -> State:
+        open, high, low, close, volume, rsi, macd, signal, ma, bb_upper, bb_lower, atr, short_ema, long_ema, session = self._data[idx].tolist()
+
+        state = State(
+            date=pd.Timestamp(self._dates[idx]),
+            open=open,
+            high=high,
+            low=low,
+            close=close,
+            volume=volume,
+            ma=ma,
+            bb_upper=bb_upper,
+            bb_lower=bb_lower,
+            atr=atr,
+            short_ema=short_ema,
+            long_ema=long_ema,
+            rsi=rsi,
+            macd=macd,
+            signal=signal,
+            session=int(session),
+        )
+
+        return state
+
     def __iter__(self) -> Generator[State, None, None]:
         """ Create a generator that iterate over the Sequence."""
         for index in range(len(self)):
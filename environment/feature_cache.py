@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import time
+import shutil
+import typing
+import hashlib
+import inspect
+import argparse
+import numpy as np
+import pandas as pd
+
+
+class FeatureCache:
+    """
+    FeatureCache stores indicator-enriched datasets on disk as one .npy file per column plus a manifest.json,
+    so later runs can load them through mmap instead of reading the csv and recalculating the indicators.
+
+    Entries are keyed by the content hash of the source file and the indicator classes (name, source code and
+    parameters). The cache is bounded by max_bytes, the least recently used entries are evicted first.
+    """
+    def __init__(self, cache_dir: str = 'cache/features', max_bytes: int = 2 * 1024**3) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _file_hash(self, path: str) -> str:
+        """ sha256 of the file content, memoized by path, size and modification time in hashes.json """
+        stat = os.stat(path)
+        hashes_path = os.path.join(self.cache_dir, 'hashes.json')
+        hashes = {}
+        if os.path.exists(hashes_path):
+            with open(hashes_path) as f:
+                hashes = json.load(f)
+
+        signature = [stat.st_size, stat.st_mtime_ns]
+        memo = hashes.get(os.path.abspath(path))
+        if memo is not None and memo['signature'] == signature:
+            return memo['sha256']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+
+        hashes[os.path.abspath(path)] = {'signature': signature, 'sha256': digest.hexdigest()}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(hashes_path, 'w') as f:
+            json.dump(hashes, f, indent=2)
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def _indicator_kwargs(indicator_cls, **kwargs) -> dict:
+        """ The subset of kwargs that are parameters of the indicator class """
+        parameters = inspect.signature(indicator_cls).parameters
+        return {name: value for name, value in kwargs.items() if name in parameters and name != 'data'}
+
+    @staticmethod
+    def _indicator_config(indicator_cls, **kwargs) -> dict:
+        """ Name, source hash and resolved parameters of an indicator class """
+        parameters = {}
+        for name, parameter in inspect.signature(indicator_cls).parameters.items():
+            if name == 'data' or parameter.kind in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD):
+                continue
+            value = kwargs.get(name, parameter.default)
+            parameters[name] = None if value is parameter.empty else repr(value)
+
+        source = ''
+        for cls in inspect.getmro(indicator_cls):
+            try:
+                source += inspect.getsource(cls)
+            except (OSError, TypeError):
+                pass
+
+        return {
+            'name': f'{indicator_cls.__module__}.{indicator_cls.__qualname__}',
+            'source': hashlib.sha256(source.encode()).hexdigest(),
+            'parameters': parameters,
+        }
+
+    def key(self, path: str, indicators: list, **kwargs) -> str:
+        """ Cache key of the dataset in path enriched with indicators """
+        config = {
+            'source': self._file_hash(path),
+            'indicators': [self._indicator_config(indicator_cls, **kwargs) for indicator_cls in indicators],
+        }
+        return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:32]
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def _manifest_path(self, key: str) -> str:
+        return os.path.join(self._entry_dir(key), 'manifest.json')
+
+    def load(self, key: str) -> typing.Optional[pd.DataFrame]:
+        """ Load the cached frame of key through mmap, returns None if there is no such entry """
+        manifest_path = self._manifest_path(key)
+        if not os.path.exists(manifest_path):
+            return None
+
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+        columns = {}
+        for column in manifest['columns']:
+            array = np.load(os.path.join(self._entry_dir(key), f"{column['file']}.npy"), mmap_mode='r')
+            if column['dtype'].startswith('datetime64'):
+                array = array.view(column['dtype'])
+            columns[column['name']] = array
+
+        # touch the manifest, its modification time is the last access time used by the LRU eviction
+        os.utime(manifest_path)
+
+        return pd.DataFrame(columns, copy=False)
+
+    def store(self, key: str, df: pd.DataFrame, source: str = None, indicators: list = []) -> None:
+        """ Write df under key and evict the least recently used entries above max_bytes """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_dir = os.path.join(self.cache_dir, f'.{key}.{os.getpid()}.tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        columns = []
+        for i, name in enumerate(df.columns):
+            array = df[name].to_numpy()
+            dtype = str(array.dtype)
+            if dtype.startswith('datetime64'):
+                array = array.view(np.int64)
+            elif array.dtype == object:
+                raise TypeError(f"column '{name}' has object dtype and can't be cached")
+            np.save(os.path.join(tmp_dir, f'{i}.npy'), np.ascontiguousarray(array))
+            columns.append({'name': name, 'file': str(i), 'dtype': dtype})
+
+        manifest = {
+            'source': source,
+            'indicators': [f'{cls.__module__}.{cls.__qualname__}' for cls in indicators],
+            'rows': len(df),
+            'columns': columns,
+            'created': time.time(),
+        }
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        entry_dir = self._entry_dir(key)
+        if os.path.exists(entry_dir):
+            shutil.rmtree(entry_dir)
+        os.replace(tmp_dir, entry_dir)
+
+        self.evict(keep=key)
+
+    def get(self, path: str, indicators: list = [], **kwargs) -> pd.DataFrame:
+        """
+        Return the dataset in path enriched with indicators, calculating and storing it on a cache miss.
+        kwargs are passed to every indicator class that has a parameter of that name, e.g. window=20.
+        """
+        unused = set(kwargs) - {name for cls in indicators for name in self._indicator_kwargs(cls, **kwargs)}
+        assert not unused, f"parameters {sorted(unused)} don't match any of the indicators"
+
+        key = self.key(path, indicators, **kwargs)
+        df = self.load(key)
+        if df is None:
+            df = pd.read_csv(path)
+            df['date'] = pd.to_datetime(df['date'])
+            for indicator_cls in indicators:
+                df = indicator_cls(df, **self._indicator_kwargs(indicator_cls, **kwargs)).calculate()
+            df = df.dropna().reset_index(drop=True)
+            self.store(key, df, source=os.path.abspath(path), indicators=indicators)
+            df = self.load(key)
+
+        return df
+
+    def entries(self) -> typing.List[dict]:
+        """ Manifests of all entries with their key, size and last access time, least recently used first """
+        if not os.path.isdir(self.cache_dir):
+            return []
+
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            manifest_path = self._manifest_path(key)
+            if key.startswith('.') or not os.path.exists(manifest_path):
+                continue
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            entry_dir = self._entry_dir(key)
+            manifest['key'] = key
+            manifest['size'] = sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+            manifest['last_access'] = os.path.getmtime(manifest_path)
+            entries.append(manifest)
+
+        return sorted(entries, key=lambda entry: entry['last_access'])
+
+    def evict(self, keep: str = None) -> int:
+        """ Remove least recently used entries until the cache fits in max_bytes, returns the removed count """
+        entries = self.entries()
+        total = sum(entry['size'] for entry in entries)
+        removed = 0
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry['key'] == keep:
+                continue
+            shutil.rmtree(self._entry_dir(entry['key']))
+            total -= entry['size']
+            removed += 1
+
+        return removed
+
+    def invalidate(self, key: str = None, source: str = None) -> int:
+        """ Remove the entry of key, all entries built from the source file, or every entry if neither is given """
+        removed = 0
+        for entry in self.entries():
+            if key is not None and entry['key'] != key:
+                continue
+            if source is not None and entry['source'] != os.path.abspath(source):
+                continue
+            shutil.rmtree(self._entry_dir(entry['key']))
+            removed += 1
+
+        return removed
+
+
+def main(argv: typing.List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description='Manage the on-disk indicator feature cache')
+    parser.add_argument('--cache-dir', default='cache/features')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='list the cached datasets')
+    invalidate = commands.add_parser('invalidate', help='remove cached datasets')
+    invalidate.add_argument('source', nargs='?', help='only remove the datasets built from this csv file')
+    invalidate.add_argument('--key', help='only remove the dataset with this key')
+    args = parser.parse_args(argv)
+
+    cache = FeatureCache(args.cache_dir)
+    if args.command == 'list':
+        for entry in cache.entries():
+            last_access = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['last_access']))
+            print(f"{entry['key']}  {entry['size'] / 1024**2:9.1f} MB  {entry['rows']:>9} rows  {last_access}  {entry['source']}")
+    else:
+        removed = cache.invalidate(key=args.key, source=args.source)
+        print(f'Removed {removed} cached dataset(s)')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,153 @@
+import typing
+import numpy as np
+import torch as th
+from gymnasium import spaces
+from stable_baselines3.common.buffers import RolloutBuffer
+from stable_baselines3.common.policies import BasePolicy
+from stable_baselines3.common.torch_layers import BaseFeaturesExtractor
+from stable_baselines3.common.type_aliases import RolloutBufferSamples
+
+from .state import OBSERVATION_FEATURES
+
+
+class WindowFeaturesExtractor(BaseFeaturesExtractor):
+    """
+    Features extractor of index observations (TradingEnv and VecTradingEnv with index_observations=True): the row
+    index of the newest state followed by the allocation_percentage column of the window. The market features of
+    the window are gathered from the scaled feature matrix with one batched index operation and the allocation
+    column is appended, the output is the flattened (window_size, OBSERVATION_FEATURES) window, the same input the
+    FlattenExtractor of MlpPolicy gives the networks for window observations.
+
+    The feature matrix is not saved with the model, set it with set_policy_features after creating or loading one.
+    """
+    def __init__(self, observation_space: spaces.Box) -> None:
+        window_size = observation_space.shape[0] - 1
+        super().__init__(observation_space, window_size * len(OBSERVATION_FEATURES))
+        self.register_buffer('_window_offsets', th.arange(1 - window_size, 1), persistent=False)
+        self.register_buffer('_features', None, persistent=False)
+
+    def set_features(self, features: np.ndarray) -> None:
+        """
+        Use features (rows x FEATURE_COLUMNS, e.g. the scaled features of the env) for the gathers. On the cpu the
+        tensor shares the memory of a float32 array, on another device it is a copy.
+        """
+        self._features = th.as_tensor(np.asarray(features, dtype=np.float32), device=self._window_offsets.device)
+
+    def forward(self, observations: th.Tensor) -> th.Tensor:
+        assert self._features is not None, "set the feature matrix with set_policy_features first"
+        rows = observations[:, 0].long()[:, None] + self._window_offsets
+        windows = th.cat((self._features[rows], observations[:, 1:, None]), dim=2)
+        return windows.flatten(start_dim=1)
+
+
+def set_policy_features(policy: BasePolicy, features: np.ndarray) -> None:
+    """ Set the feature matrix of every WindowFeaturesExtractor of policy (shared or separate actor and critic ones) """
+    extractors = [module for module in policy.modules() if isinstance(module, WindowFeaturesExtractor)]
+    assert len(extractors) > 0, "the policy has no WindowFeaturesExtractor"
+    for extractor in extractors:
+        extractor.set_features(features)
+
+
+class IndexRolloutBuffer(RolloutBuffer):
+    """
+    RolloutBuffer for index observations that stores, per step and env, only the row index (int64) and the newest
+    allocation_percentage (float32) instead of the observation, e.g. 12 bytes instead of the 3200 bytes of a float32
+    (50, 16) window. The window's allocation column repeats the allocations of the previous steps of the episode,
+    so _get_samples rebuilds the observations of a minibatch from the stored allocations: the window_size - 1
+    allocations before the first step are kept from the first observation, the states before the start of an
+    episode (episode_starts) are reset states with allocation 0. The market features are gathered by the policy's
+    WindowFeaturesExtractor.
+    """
+    def reset(self) -> None:
+        window_size = self.obs_shape[0] - 1
+        self.indexes = np.zeros((self.buffer_size, self.n_envs), dtype=np.int64)
+        # allocations[window_size - 1 + step] is the newest allocation of step, the rows before come from the first observation
+        self.allocations = np.zeros((window_size - 1 + self.buffer_size, self.n_envs), dtype=np.float32)
+        self.actions = np.zeros((self.buffer_size, self.n_envs, self.action_dim), dtype=self.action_space.dtype)
+        self.rewards = np.zeros((self.buffer_size, self.n_envs), dtype=np.float32)
+        self.returns = np.zeros((self.buffer_size, self.n_envs), dtype=np.float32)
+        self.episode_starts = np.zeros((self.buffer_size, self.n_envs), dtype=np.float32)
+        self.values = np.zeros((self.buffer_size, self.n_envs), dtype=np.float32)
+        self.log_probs = np.zeros((self.buffer_size, self.n_envs), dtype=np.float32)
+        self.advantages = np.zeros((self.buffer_size, self.n_envs), dtype=np.float32)
+        self.episode_start_steps = None
+        self.generator_ready = False
+        # BaseBuffer.reset, RolloutBuffer.reset would allocate the full observations
+        super(RolloutBuffer, self).reset()
+
+    def add(
+            self,
+            obs: np.ndarray,
+            action: np.ndarray,
+            reward: np.ndarray,
+            episode_start: np.ndarray,
+            value: th.Tensor,
+            log_prob: th.Tensor,
+        ) -> None:
+        obs = np.asarray(obs).reshape((self.n_envs, *self.obs_shape))
+        window_size = self.obs_shape[0] - 1
+        if self.pos == 0:
+            self.allocations[:window_size - 1] = obs[:, 1:-1].T
+        self.indexes[self.pos] = obs[:, 0]
+        self.allocations[window_size - 1 + self.pos] = obs[:, -1]
+
+        if len(log_prob.shape) == 0:
+            log_prob = log_prob.reshape(-1, 1)
+        self.actions[self.pos] = np.array(action).reshape((self.n_envs, self.action_dim))
+        self.rewards[self.pos] = np.array(reward)
+        self.episode_starts[self.pos] = np.array(episode_start)
+        self.values[self.pos] = value.clone().cpu().numpy().flatten()
+        self.log_probs[self.pos] = log_prob.clone().cpu().numpy()
+        self.pos += 1
+        if self.pos == self.buffer_size:
+            self.full = True
+
+    def get(self, batch_size: typing.Optional[int] = None) -> typing.Generator[RolloutBufferSamples, None, None]:
+        assert self.full, ""
+        indices = np.random.permutation(self.buffer_size * self.n_envs)
+        if not self.generator_ready:
+            # the indexes and allocations stay (steps, envs), _get_samples maps the flat indices back
+            for tensor in ('actions', 'values', 'log_probs', 'advantages', 'returns'):
+                self.__dict__[tensor] = self.swap_and_flatten(self.__dict__[tensor])
+            # step of the latest episode start at or before every step. Episodes that began before the buffer get
+            # -window_size, which no window position reaches: the allocations before the first step come from the
+            # first observation, which already has the states before its episode start zeroed
+            window_size = self.obs_shape[0] - 1
+            steps = np.arange(self.buffer_size)[:, None]
+            self.episode_start_steps = np.maximum.accumulate(np.where(self.episode_starts > 0, steps, -window_size), axis=0)
+            self.generator_ready = True
+
+        if batch_size is None:
+            batch_size = self.buffer_size * self.n_envs
+
+        start_idx = 0
+        while start_idx < self.buffer_size * self.n_envs:
+            yield self._get_samples(indices[start_idx : start_idx + batch_size])
+            start_idx += batch_size
+
+    def observations_of(self, steps: np.ndarray, envs: np.ndarray) -> np.ndarray:
+        """ Rebuild the index observations of the given steps and envs """
+        window_size = self.obs_shape[0] - 1
+        positions = np.arange(window_size)
+        allocations = self.allocations[steps[:, None] + positions, envs[:, None]]
+        # window position p holds the state of step - window_size + 1 + p, states before the episode start are zeros
+        before_start = steps[:, None] - (window_size - 1) + positions < self.episode_start_steps[steps, envs][:, None]
+        allocations[before_start] = 0.0
+
+        observations = np.empty((len(steps), window_size + 1), dtype=np.float32)
+        observations[:, 0] = self.indexes[steps, envs]
+        observations[:, 1:] = allocations
+        return observations
+
+    def _get_samples(self, batch_inds: np.ndarray, env=None) -> RolloutBufferSamples:
+        # swap_and_flatten orders the samples env by env
+        steps, envs = batch_inds % self.buffer_size, batch_inds // self.buffer_size
+        data = (
+            self.observations_of(steps, envs),
+            self.actions[batch_inds].astype(np.float32, copy=False),
+            self.values[batch_inds].flatten(),
+            self.log_probs[batch_inds].flatten(),
+            self.advantages[batch_inds].flatten(),
+            self.returns[batch_inds].flatten(),
+        )
+        return RolloutBufferSamples(*tuple(map(self.to_torch, data)))
\ No newline at end of file
@@ -0,0 +1,378 @@
+import math
+import inspect
+import numpy as np
+import pandas as pd
+
+from environment.indicators import RSI, MACD, BollingerBands, ATR
+
+
+def rolling_mean(x: np.ndarray, window: int, out: np.ndarray, std_out: np.ndarray = None, center: bool = True) -> np.ndarray:
+    """
+    Mean (and sample standard deviation if std_out is given) of every window of x from running sums, x holds the
+    window - 1 rows before the first output row. With center=True x is shifted by its first value before summing,
+    which keeps the cancellation error of the variance small for price like series. Like pandas rolling, windows of
+    one repeated value get exactly that value as mean and zero standard deviation.
+    """
+    reference = x[0] if center else 0.0
+    y = x - reference
+    sums = np.empty(len(y) + 1)
+    sums[0] = 0.0
+    np.cumsum(y, out=sums[1:])
+    window_sum = sums[window:] - sums[:-window]
+    np.divide(window_sum, window, out=out)
+    out += reference
+
+    if std_out is not None:
+        np.square(y, out=y)
+        np.cumsum(y, out=sums[1:])
+        np.subtract(sums[window:], sums[:-window], out=std_out)
+        np.square(window_sum, out=window_sum)
+        window_sum /= window
+        std_out -= window_sum
+        np.maximum(std_out, 0.0, out=std_out)
+        std_out /= window - 1
+        np.sqrt(std_out, out=std_out)
+
+    # windows without any change between consecutive values
+    changes = np.empty(len(x), dtype=np.int64)
+    changes[0] = 0
+    np.cumsum(x[1:] != x[:-1], out=changes[1:])
+    constant = changes[window - 1:] == changes[:len(changes) - window + 1]
+    if constant.any():
+        out[constant] = x[window - 1:][constant]
+        if std_out is not None:
+            std_out[constant] = 0.0
+
+    return out
+
+
+class EWMState:
+    """ Carried state of an adjusted exponentially weighted mean between chunks """
+    def __init__(self, span: int):
+        self.decay = 1.0 - 2.0 / (span + 1.0)
+        self.numerator = 0.0
+        self.denominator = 0.0
+        # block size keeps decay ** -block_size far from overflowing
+        self.block_size = int(min(256, max(1, 600 / -math.log(self.decay)))) if self.decay > 0.0 else 1
+
+
+def ewm_mean(x: np.ndarray, state: EWMState, out: np.ndarray) -> np.ndarray:
+    """
+    pandas ewm(span, min_periods=1, adjust=True).mean() of x continuing from state, written to out. Values are
+    computed in blocks with the closed form decay ** i * cumsum(x * decay ** -i), only the carry between blocks
+    is sequential.
+    """
+    decay, block_size, n = state.decay, state.block_size, len(x)
+    if decay <= 0.0:
+        out[:] = x
+        state.numerator, state.denominator = float(x[-1]), 1.0
+        return out
+
+    blocks = -(-n // block_size)
+    padded = np.zeros(blocks * block_size)
+    padded[:n] = x
+    padded = padded.reshape(blocks, block_size)
+
+    powers = decay ** np.arange(block_size + 1)
+    local = np.cumsum(padded / powers[:-1], axis=1) * powers[:-1]
+    local_denominator = np.cumsum(powers[:-1])
+
+    # numerator and denominator carried into every block
+    carry = np.empty((blocks, 2))
+    numerator, denominator = state.numerator, state.denominator
+    block_decay = powers[-1]
+    for j in range(blocks):
+        carry[j] = numerator, denominator
+        numerator = block_decay * numerator + local[j, -1]
+        denominator = block_decay * denominator + local_denominator[-1]
+
+    numerators = local + carry[:, :1] * powers[1:]
+    denominators = local_denominator + carry[:, 1:] * powers[1:]
+    np.divide(numerators.reshape(-1)[:n], denominators.reshape(-1)[:n], out=out)
+
+    # the carry after the last real value, the padding must not decay it
+    last = (n - 1) % block_size
+    state.numerator = float(numerators[-1, last])
+    state.denominator = float(denominators[-1, last])
+    return out
+
+
+def rolling_mean_grid(
+        x: np.ndarray,
+        windows: np.ndarray,
+        out: np.ndarray,
+        std_out: np.ndarray = None,
+        center: bool = True,
+        chunk_size: int = 8192,
+        ) -> np.ndarray:
+    """
+    rolling_mean for several windows at once, column j of out (rows x windows) holds the rolling mean of x over
+    windows[j] rows and NaN for the warm-up rows. The running sums are computed once per chunk of rows and every
+    window is a gather of two cumulative sums, so temporaries are bounded by chunk_size x len(windows).
+    """
+    windows = np.asarray(windows, dtype=np.int64)
+    n, max_window = len(x), int(windows.max())
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        begin = max(start - max_window + 1, 0)
+        chunk = x[begin:stop]
+        reference = chunk[0] if center else 0.0
+        y = chunk - reference
+
+        sums = np.zeros(len(y) + 1)
+        np.cumsum(y, out=sums[1:])
+        changes = np.zeros(len(y), dtype=np.int64)
+        np.cumsum(chunk[1:] != chunk[:-1], out=changes[1:])
+
+        # window of row t covers chunk rows [low, high), low < 0 for the warm-up rows
+        high = np.arange(start - begin + 1, stop - begin + 1)[:, None]
+        low = high - windows[None, :]
+        warmup = low < 0
+        low = np.maximum(low, 0)
+
+        window_sum = sums[high] - sums[low]
+        mean = np.divide(window_sum, windows, out=out[start:stop])
+        mean += reference
+        constant = changes[high - 1] == changes[low]
+        np.copyto(mean, np.broadcast_to(chunk[high - 1], mean.shape), where=constant)
+        mean[warmup] = np.nan
+
+        if std_out is not None:
+            np.square(y, out=y)
+            np.cumsum(y, out=sums[1:])
+            std = np.subtract(sums[high], sums[low], out=std_out[start:stop])
+            np.square(window_sum, out=window_sum)
+            window_sum /= windows
+            std -= window_sum
+            np.maximum(std, 0.0, out=std)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                std /= windows - 1
+            np.sqrt(std, out=std)
+            std[constant] = 0.0
+            std[warmup | (windows < 2)] = np.nan
+
+    return out
+
+
+def ewm_mean_grid(x: np.ndarray, spans: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """
+    ewm_mean for several spans at once, x is one series or one column per span (rows x spans). Uses the same
+    blocked closed form as ewm_mean with a decay per column.
+    """
+    spans = np.asarray(spans, dtype=np.float64)
+    n = len(x)
+    x = np.broadcast_to(x.reshape(n, -1), (n, len(spans)))
+    decay = 1.0 - 2.0 / (spans + 1.0)
+
+    # a span of 1 has no memory
+    memoryless = decay <= 0.0
+    out[:, memoryless] = x[:, memoryless]
+    if memoryless.all():
+        return out
+    decay = np.where(memoryless, 0.5, decay)
+
+    block_size = int(min(256, max(1, 600 / -np.log(decay).min())))
+    powers = decay[None, :] ** np.arange(block_size + 1)[:, None]
+    local_denominator = np.cumsum(powers[:-1], axis=0)
+    numerator, denominator = np.zeros(len(spans)), np.zeros(len(spans))
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        rows = stop - start
+        local = np.cumsum(x[start:stop] / powers[:rows], axis=0) * powers[:rows]
+        numerators = local + numerator * powers[1:rows + 1]
+        denominators = local_denominator[:rows] + denominator * powers[1:rows + 1]
+        np.divide(numerators, denominators, out=out[start:stop], where=~memoryless)
+        numerator, denominator = numerators[-1], denominators[-1]
+
+    return out
+
+
+def rsi_sweep(close: np.ndarray, windows: list, param_chunk: int = 32) -> np.ndarray:
+    """ RSI of close for every window, rows x windows """
+    delta = np.diff(close, prepend=close[0])
+    gain, loss = np.maximum(delta, 0.0), np.maximum(-delta, 0.0)
+    windows = np.asarray(windows, dtype=np.int64)
+    out = np.empty((len(close), len(windows)))
+    for start in range(0, len(windows), param_chunk):
+        group = slice(start, start + param_chunk)
+        rsi = rolling_mean_grid(gain, windows[group], out[:, group], center=False)
+        loss_mean = rolling_mean_grid(loss, windows[group], np.empty_like(rsi), center=False)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(rsi, loss_mean, out=rsi)
+        np.subtract(100, 100 / (1 + rsi), out=rsi)
+    return out
+
+
+def bollinger_sweep(close: np.ndarray, params: list, param_chunk: int = 32) -> dict:
+    """ Bollinger Bands of close for every (window, num_std) in params, dict of rows x params arrays """
+    windows = np.array([window for window, _ in params], dtype=np.int64)
+    num_std = np.array([num_std for _, num_std in params], dtype=np.float64)
+    ma, upper, lower = (np.empty((len(close), len(params))) for _ in range(3))
+    for start in range(0, len(params), param_chunk):
+        group = slice(start, start + param_chunk)
+        rolling_mean_grid(close, windows[group], ma[:, group], std_out=upper[:, group])
+        upper[:, group] *= num_std[group]
+        np.subtract(ma[:, group], upper[:, group], out=lower[:, group])
+        upper[:, group] += ma[:, group]
+    return {'ma': ma, 'bb_upper': upper, 'bb_lower': lower}
+
+
+def macd_sweep(close: np.ndarray, params: list, param_chunk: int = 32) -> dict:
+    """ MACD of close for every (short_window, long_window, signal_window) in params, dict of rows x params arrays """
+    params = np.asarray(params, dtype=np.float64).reshape(-1, 3)
+    short_ema, long_ema, macd, signal = (np.empty((len(close), len(params))) for _ in range(4))
+    for start in range(0, len(params), param_chunk):
+        group = slice(start, start + param_chunk)
+        # every distinct short and long span of the group is calculated once
+        spans, columns = np.unique(params[group, :2], return_inverse=True)
+        emas = ewm_mean_grid(close, spans, np.empty((len(close), len(spans))))
+        columns = columns.reshape(-1, 2)
+        np.take(emas, columns[:, 0], axis=1, out=short_ema[:, group])
+        np.take(emas, columns[:, 1], axis=1, out=long_ema[:, group])
+        np.subtract(short_ema[:, group], long_ema[:, group], out=macd[:, group])
+        ewm_mean_grid(macd[:, group], params[group, 2], signal[:, group])
+    return {'short_ema': short_ema, 'long_ema': long_ema, 'macd': macd, 'signal': signal}
+
+
+class IndicatorEngine:
+    """
+    IndicatorEngine calculates RSI, MACD, BollingerBands and ATR in one chunked pass over the close, high and low
+    arrays and writes them into one preallocated output block (rows x columns), without the intermediate Series
+    and frame copies of the indicator classes. Values are the same as the indicator classes up to float rounding.
+    Indicators the engine doesn't know are calculated afterwards with their own calculate method.
+    """
+    COLUMNS = {
+        RSI: ('rsi',),
+        MACD: ('short_ema', 'long_ema', 'macd', 'signal'),
+        BollingerBands: ('ma', 'bb_upper', 'bb_lower'),
+        ATR: ('atr',),
+    }
+
+    def __init__(self, indicators: list, chunk_size: int = 8192, **kwargs) -> None:
+        self.chunk_size = chunk_size
+        self.kwargs = kwargs
+        self.fused = [cls for cls in indicators if cls in self.COLUMNS]
+        self.others = [cls for cls in indicators if cls not in self.COLUMNS]
+        self.params = {cls: self._params(cls, **kwargs) for cls in self.fused}
+
+    @staticmethod
+    def _params(indicator_cls, **kwargs) -> dict:
+        return {
+            name: kwargs.get(name, parameter.default)
+            for name, parameter in inspect.signature(indicator_cls).parameters.items() if name != 'data'
+        }
+
+    @property
+    def columns(self) -> tuple:
+        return tuple(column for cls in self.fused for column in self.COLUMNS[cls])
+
+    def compute(self, close: np.ndarray, high: np.ndarray, low: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """ Fill out (rows x columns, float64) with the fused indicators, rows without enough history are NaN """
+        n = len(close)
+        if out is None:
+            out = np.empty((n, len(self.columns)), dtype=np.float64, order='F')
+        assert out.shape == (n, len(self.columns)), f'out must have shape {(n, len(self.columns))}, received: {out.shape}'
+
+        index = {column: i for i, column in enumerate(self.columns)}
+        ewm_states = {}
+        if MACD in self.fused:
+            params = self.params[MACD]
+            ewm_states = {
+                'short_ema': EWMState(params['short_window']),
+                'long_ema': EWMState(params['long_window']),
+                'signal': EWMState(params['signal_window']),
+            }
+
+        for start in range(0, n, self.chunk_size):
+            stop = min(start + self.chunk_size, n)
+
+            if RSI in self.fused:
+                self._rsi(close, start, stop, self.params[RSI]['window'], out[:, index['rsi']])
+
+            if MACD in self.fused:
+                short_ema = ewm_mean(close[start:stop], ewm_states['short_ema'], out[start:stop, index['short_ema']])
+                long_ema = ewm_mean(close[start:stop], ewm_states['long_ema'], out[start:stop, index['long_ema']])
+                macd = np.subtract(short_ema, long_ema, out=out[start:stop, index['macd']])
+                ewm_mean(macd, ewm_states['signal'], out[start:stop, index['signal']])
+
+            if BollingerBands in self.fused:
+                params = self.params[BollingerBands]
+                self._bollinger(close, start, stop, params['window'], params['num_std'], out, index)
+
+            if ATR in self.fused:
+                self._atr(close, high, low, start, stop, self.params[ATR]['window'], out[:, index['atr']])
+
+        return out
+
+    @staticmethod
+    def _rsi(close, start, stop, window, out):
+        first = max(start, window - 1)
+        out[start:first] = np.nan
+        if first >= stop:
+            return
+
+        # deltas of the windows ending in [first, stop), the first row has no previous close and counts as 0
+        begin = first - window + 1
+        delta = np.diff(close[:stop], prepend=close[0]) if begin == 0 else np.diff(close[begin - 1:stop])
+        gain = rolling_mean(np.maximum(delta, 0.0), window, np.empty(stop - first), center=False)
+        loss = rolling_mean(np.maximum(-delta, 0.0), window, np.empty(stop - first), center=False)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(gain, loss, out=gain)
+        np.subtract(100, 100 / (1 + gain), out=out[first:stop])
+
+    @staticmethod
+    def _bollinger(close, start, stop, window, num_std, out, index):
+        first = max(start, window - 1)
+        for column in ('ma', 'bb_upper', 'bb_lower'):
+            out[start:first, index[column]] = np.nan
+        if first >= stop:
+            return
+
+        x = close[first - window + 1:stop]
+        std = np.empty(stop - first)
+        ma = rolling_mean(x, window, out[first:stop, index['ma']], std_out=std)
+        std *= num_std
+        np.add(ma, std, out=out[first:stop, index['bb_upper']])
+        np.subtract(ma, std, out=out[first:stop, index['bb_lower']])
+
+    @staticmethod
+    def _atr(close, high, low, start, stop, window, out):
+        first = max(start, window - 1)
+        out[start:first] = np.nan
+        if first >= stop:
+            return
+
+        begin = first - window + 1
+        true_range = np.subtract(high[begin:stop], low[begin:stop])
+        prev_close = close[max(begin - 1, 0):stop - 1]
+        # the first row has no previous close, its true range is high - low
+        offset = 1 if begin == 0 else 0
+        np.maximum(true_range[offset:], np.abs(high[begin + offset:stop] - prev_close), out=true_range[offset:])
+        np.maximum(true_range[offset:], np.abs(low[begin + offset:stop] - prev_close), out=true_range[offset:])
+        rolling_mean(true_range, window, out[first:stop], center=False)
+
+    def calculate(self, df: pd.DataFrame, dropna: bool = False) -> pd.DataFrame:
+        """
+        Return df with the indicator columns, the fused ones are column views of one output block. With dropna=True
+        rows with missing values are removed, as a view when they are only the indicator warm-up rows.
+        """
+        close = df['close'].to_numpy(dtype=np.float64)
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        block = self.compute(close, high, low)
+
+        columns = {name: df[name].to_numpy() for name in df.columns if name not in self.columns}
+        columns.update({name: block[:, i] for i, name in enumerate(self.columns)})
+        df = pd.DataFrame(columns, index=df.index, copy=False)
+
+        for indicator_cls in self.others:
+            df = indicator_cls(df, **self.kwargs).calculate()
+
+        if dropna:
+            valid = np.ones(len(df), dtype=bool)
+            for name in df.columns:
+                valid &= df[name].notna().to_numpy()
+            first = int(np.argmax(valid)) if valid.any() else len(df)
+            df = df.iloc[first:] if valid[first:].all() else df[valid]
+
+        return df
\ No newline at end of file
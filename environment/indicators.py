@@ -35,9 +35,11 @@ class BollingerBands:
         self.num_std = num_std
     
     def calculate(self):
-        self.data['ma'] = self.data['close'].rolling(window=self.window).mean()
-        self.data['bb_upper'] = self.data['ma'] + 2 * self.data['close'].rolling(window=self.window).std()
-        self.data['bb_lower'] = self.data['ma'] - 2 * self.data['close'].rolling(window=self.window).std()
+        rolling = self.data['close'].rolling(window=self.window)
+        self.data['ma'] = rolling.mean()
+        std = rolling.std()
+        self.data['bb_upper'] = self.data['ma'] + self.num_std * std
+        self.data['bb_lower'] = self.data['ma'] - self.num_std * std
         return self.data
 
 class ATR:
@@ -46,30 +48,62 @@ class ATR:
         self.window = window
     
     def calculate(self):
+        prev_close = self.data['close'].shift()
         high_low = self.data['high'] - self.data['low']
-        high_close = np.abs(self.data['high'] - self.data['close'].shift())
-        low_close = np.abs(self.data['low'] - self.data['close'].shift())
-        ranges = pd.concat([high_low, high_close, low_close], axis=1)
-        true_range = np.max(ranges, axis=1)
+        high_close = np.abs(self.data['high'] - prev_close)
+        low_close = np.abs(self.data['low'] - prev_close)
+        # fmax skips the missing previous close of the first row like the max of the ranges frame did
+        true_range = np.fmax(np.fmax(high_low, high_close), low_close)
         self.data['atr'] = true_range.rolling(window=self.window).mean()
         return self.data
 
-class LondonAsiaSession:
-    def __init__(self, data, window=14):
+def session_labels(dates, sessions, tz=None, weekends=False) -> np.ndarray:
+    """ Session label of every date, see SessionIndicator """
+    dates = pd.DatetimeIndex(dates)
+    if tz is not None:
+        dates = (dates.tz_localize('UTC') if dates.tz is None else dates).tz_convert(tz)
+
+    hours = dates.hour.to_numpy() + dates.minute.to_numpy() / 60
+    session = np.zeros(len(dates), dtype=np.int64)
+    # assign in reverse order so the first matching session wins
+    for label, start, end in reversed(tuple(sessions)):
+        if start <= end:
+            in_session = (hours >= start) & (hours < end)
+        else:
+            in_session = (hours >= start) | (hours < end)
+        session[in_session] = label
+
+    if not weekends:
+        session[dates.dayofweek.to_numpy() >= 5] = 0
+
+    return session
+
+class SessionIndicator:
+    """
+    Labels every row with the trading session its date falls in. Sessions are (label, start hour, end hour) tuples,
+    the end hour is exclusive, hours can be fractional and a session can wrap around midnight (e.g. (1, 20, 2)).
+    When sessions overlap the first one wins. Weekend rows are labelled 0 unless weekends=True.
+    If tz is given, naive dates are assumed to be UTC and the hours are taken in the tz timezone.
+    """
+    SESSIONS = ()
+
+    def __init__(self, data, window=14, sessions=None, tz=None, weekends=False):
         self.data = data
         self.window = window
+        self.sessions = tuple(self.SESSIONS if sessions is None else sessions)
+        self.tz = tz
+        self.weekends = weekends
         self.data['session'] = 0
-    
+
     def is_weekend(self, date):
         return date.dayofweek >= 5
 
     def calculate(self):
-        for index, row in self.data.iterrows():
-            if not self.is_weekend(row['date']):
-                if 2 <= row['date'].hour < 5:
-                    self.data.at[index, 'session'] = 2 # London open session
-                elif 20 <= row['date'].hour < 24 or 0 <= row['date'].hour < 2:
-                    self.data.at[index, 'session'] = 1 # Asia session
-
+        self.data['session'] = session_labels(self.data['date'], self.sessions, tz=self.tz, weekends=self.weekends)
+        return self.data
 
-        return self.data
\ No newline at end of file
+class LondonAsiaSession(SessionIndicator):
+    SESSIONS = (
+        (2, 2, 5), # London open session
+        (1, 20, 2), # Asia session
+    )
\ No newline at end of file
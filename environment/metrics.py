@@ -1,5 +1,36 @@
 from .state import State
 import numpy as np
+import pandas as pd
+
+# one day in nanoseconds, the unit of SharpeRatio._time
+_DAY = 86_400 * 10**9
+
+# Vectorized metric calculations over the last axis of recorded episodes, used by Metric.extend and MetricSuite
+
+def _different_actions(allocations: np.ndarray) -> np.ndarray:
+    return np.count_nonzero(allocations[..., 1:] != allocations[..., :-1], axis=-1)
+
+def _max_drawdown(account_values: np.ndarray) -> np.ndarray:
+    if account_values.shape[-1] < 2:
+        return np.zeros(account_values.shape[:-1])
+    max_account_values = np.maximum.accumulate(account_values, axis=-1)[..., 1:]
+    drawdowns = (account_values[..., 1:] - max_account_values) / max_account_values
+    return np.minimum(drawdowns.min(axis=-1), 0.0)
+
+def _extend_drawdown(account_values: np.ndarray, max_account_value: float, max_drawdown: float) -> tuple:
+    """ Running maximum account value and maximum drawdown after the states account_values[1:] """
+    if len(account_values) < 2:
+        return max_account_value, max_drawdown
+    max_account_values = np.maximum(np.maximum.accumulate(account_values[1:]), max_account_value)
+    drawdowns = (account_values[1:] - max_account_values) / max_account_values
+    return float(max_account_values[-1]), min(max_drawdown, float(drawdowns.min()))
+
+def _win_count(account_values: np.ndarray) -> np.ndarray:
+    return np.count_nonzero(account_values[..., 1:] > account_values[..., :-1], axis=-1)
+
+def _loss_count(account_values: np.ndarray) -> np.ndarray:
+    return np.count_nonzero(account_values[..., 1:] < account_values[..., :-1], axis=-1)
+
 
 class Metric:
     """
@@ -22,6 +53,14 @@ class Metric:
         assert prev_state is None or isinstance(prev_state, State), f'prev_state must be None or State, received: {type(prev_state)}'
 
         return prev_state
+
+    def extend(self, dates: np.ndarray, account_values: np.ndarray, allocations: np.ndarray):
+        """ Update the metric with a recorded chunk of states in one vectorized pass, instead of calling update for
+        each of them. The first entry of the datetime64, account value and allocation_percentage arrays is the last
+        state the metric was reset, updated or extended with, the others are the new states. An episode is either
+        updated or extended.
+        """
+        raise NotImplementedError
     
 
 class DifferentActions(Metric):
@@ -43,6 +82,9 @@ class DifferentActions(Metric):
     @property
     def result(self):
         return self.different_actions
+
+    def extend(self, dates: np.ndarray, account_values: np.ndarray, allocations: np.ndarray):
+        self.different_actions += int(_different_actions(allocations))
     
     def reset(self, prev_state: State=None):
         super().reset(prev_state)
@@ -64,6 +106,9 @@ class AccountValue(Metric):
     @property
     def result(self):
         return self.account_value
+
+    def extend(self, dates: np.ndarray, account_values: np.ndarray, allocations: np.ndarray):
+        self.account_value = float(account_values[-1])
     
     def reset(self, prev_state: State=None):
         super().reset(prev_state)
@@ -83,6 +128,9 @@ class AccountValueChange(Metric):
     @property
     def result(self):
         return ((self.account_value - 10000) / 10000) * 100
+
+    def extend(self, dates: np.ndarray, account_values: np.ndarray, allocations: np.ndarray):
+        self.account_value = float(account_values[-1])
     
     def reset(self, prev_state: State=None):
         super().reset(prev_state)
@@ -116,6 +164,9 @@ class MaxDrawdown(Metric):
     @property
     def result(self):
         return self.max_drawdown
+
+    def extend(self, dates: np.ndarray, account_values: np.ndarray, allocations: np.ndarray):
+        self.max_account_value, self.max_drawdown = _extend_drawdown(account_values, self.max_account_value, self.max_drawdown)
     
     def reset(self, prev_state: State=None):
         super().reset(prev_state)
@@ -131,36 +182,111 @@ class SharpeRatio(Metric):
     A higher Sharpe Ratio indicates a better risk-adjusted performance. Investors and portfolio managers 
     often use the Sharpe Ratio to compare the risk-adjusted returns of different investments or portfolios. 
     It allows them to assess whether the additional return earned by taking on additional risk is justified.
+
+    A daily return is taken at the first state at least one day after the state the previous one was taken at,
+    starting with the reset state. The mean and variance of the daily returns are accumulated with Welford's
+    algorithm, so the memory is constant and result costs O(1). SortinoRatio and CalmarRatio use the same accumulator.
     """
     def __init__(self, ratio_days=365.25, name: str='sharpe_ratio'):
         self.ratio_days = ratio_days
         super().__init__(name=name)
 
+    @staticmethod
+    def _time(state: State) -> int:
+        """ Nanoseconds since the epoch of the state's date """
+        date = state.date
+        return date.value if isinstance(date, pd.Timestamp) else pd.Timestamp(date).value
+
+    def _ratio(self) -> float:
+        """ The ratio of the daily returns accumulated so far, there is at least one """
+        variance = max(self.m2, 0.0) / self.count
+        if variance == 0:
+            return 0.0
+
+        return self.mean / np.sqrt(variance) * np.sqrt(self.ratio_days)
+
     def update(self, state: State):
         super().update(state)
-        time_difference_days = (state.date - self.prev_state.date).days
-        if time_difference_days >= 1:
-            self.daily_returns.append((state.account_value - self.prev_state.account_value) / self.prev_state.account_value)
-            self.prev_state = state
-        
+        account_value = state.account_value
+        time = self._time(state)
+        if self.prev_time is None:
+            self.prev_time, self.prev_account_value = time, account_value
+        elif time - self.prev_time >= _DAY:
+            self._add_daily_return(time, account_value)
+
+    def _add_daily_return(self, time: int, account_value: float) -> None:
+        daily_return = (account_value - self.prev_account_value) / self.prev_account_value
+        self.count += 1
+        delta = daily_return - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (daily_return - self.mean)
+        self.downside_m2 += min(daily_return, 0.0) ** 2
+        self.prev_time, self.prev_account_value = time, account_value
+
     @property
     def result(self):
-        if len(self.daily_returns) == 0:
+        if self.count == 0:
+            return 0.0
+
+        return self._ratio()
+
+    def extend(self, dates: np.ndarray, account_values: np.ndarray, allocations: np.ndarray):
+        times = dates.astype('datetime64[ns]').astype(np.int64)
+        if self.prev_time is None:
+            self.prev_time, self.prev_account_value = int(times[0]), float(account_values[0])
+        # the daily returns are few against the states, only their anchors are found one by one
+        while True:
+            anchor = np.searchsorted(times, self.prev_time + _DAY, side='left')
+            if anchor >= len(times):
+                break
+            self._add_daily_return(int(times[anchor]), float(account_values[anchor]))
+
+    def reset(self, prev_state: State=None):
+        super().reset(prev_state)
+        self.prev_time = self._time(prev_state) if prev_state else None
+        self.prev_account_value = prev_state.account_value if prev_state else None
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.downside_m2 = 0.0
+
+class SortinoRatio(SharpeRatio):
+    """ The Sortino Ratio only counts the volatility of negative daily returns (downside deviation) as risk """
+    def __init__(self, ratio_days=365.25, name: str='sortino_ratio'):
+        super().__init__(ratio_days=ratio_days, name=name)
+
+    def _ratio(self) -> float:
+        downside_variance = self.downside_m2 / self.count
+        if downside_variance == 0:
             return 0.0
 
-        mean = np.mean(self.daily_returns)
-        std = np.std(self.daily_returns)
-        if std == 0:
+        return self.mean / np.sqrt(downside_variance) * np.sqrt(self.ratio_days)
+
+class CalmarRatio(SharpeRatio):
+    """ The Calmar Ratio is the annualized mean daily return relative to the maximum drawdown """
+    def __init__(self, ratio_days=365.25, name: str='calmar_ratio'):
+        super().__init__(ratio_days=ratio_days, name=name)
+
+    def _ratio(self) -> float:
+        if self.max_drawdown == 0:
             return 0.0
-        
-        sharpe_ratio = mean / std * np.sqrt(self.ratio_days)
-        
-        return sharpe_ratio
-    
+
+        return self.mean * self.ratio_days / abs(self.max_drawdown)
+
+    def update(self, state: State):
+        super().update(state)
+        account_value = state.account_value
+        self.max_account_value = max(self.max_account_value, account_value)
+        self.max_drawdown = min(self.max_drawdown, (account_value - self.max_account_value) / self.max_account_value)
+
+    def extend(self, dates: np.ndarray, account_values: np.ndarray, allocations: np.ndarray):
+        super().extend(dates, account_values, allocations)
+        self.max_account_value, self.max_drawdown = _extend_drawdown(account_values, self.max_account_value, self.max_drawdown)
+
     def reset(self, prev_state: State=None):
         super().reset(prev_state)
-        self.prev_state = prev_state
-        self.daily_returns = []
+        self.max_account_value = prev_state.account_value if prev_state else -np.inf
+        self.max_drawdown = 0.0
 
 class AverageWinLossRatio(Metric):
     """The Average Win/Loss Ratio is a measure of the average gain on profitable trades
@@ -199,6 +325,13 @@ class AverageWinLossRatio(Metric):
 
         return average_win_loss_ratio
 
+    def extend(self, dates: np.ndarray, account_values: np.ndarray, allocations: np.ndarray):
+        changes = np.diff(account_values)
+        self.total_wins += int(_win_count(account_values))
+        self.total_losses += int(_loss_count(account_values))
+        self.total_win_amount += float(changes[changes > 0].sum())
+        self.total_loss_amount -= float(changes[changes < 0].sum())
+
     def reset(self, prev_state: State=None):
         super().reset(prev_state)
         self.prev_state = prev_state
@@ -239,6 +372,12 @@ class WinCount(Metric):
 
         return self.total_wins
 
+    def extend(self, dates: np.ndarray, account_values: np.ndarray, allocations: np.ndarray):
+        changes = np.diff(account_values)
+        self.total_wins += int(_win_count(account_values))
+        self.total_win_amount += float(changes[changes > 0].sum())
+        self.total_trade += len(changes)
+
     def reset(self, prev_state: State=None):
         super().reset(prev_state)
         self.prev_state = prev_state
@@ -278,9 +417,107 @@ class LossCount(Metric):
         """
         return self.total_losses
 
+    def extend(self, dates: np.ndarray, account_values: np.ndarray, allocations: np.ndarray):
+        changes = np.diff(account_values)
+        self.total_losses += int(_loss_count(account_values))
+        self.total_loss_amount -= float(changes[changes < 0].sum())
+        self.total_trade += len(changes)
+
     def reset(self, prev_state: State=None):
         super().reset(prev_state)
         self.prev_state = prev_state
         self.total_trade = 0
         self.total_losses = 0
-        self.total_loss_amount = 0
\ No newline at end of file
+        self.total_loss_amount = 0
+
+
+class MetricSuite:
+    """
+    MetricSuite calculates all metrics of this module for one or many recorded episodes with NumPy instead of
+    updating Metric objects state by state. dates (datetime64), account_values and allocations have the shape
+    (steps,) for one episode or (episodes, steps) for a batch, the first entry of every episode is its reset state.
+    Episodes shorter than the batch are given by lengths, their remaining entries are ignored (forward filled).
+
+    compute returns a dict of metric name to result, scalars for one episode and (episodes,) arrays for a batch.
+    The results equal the ones of the Metric classes, up to floating point rounding of the Sharpe Ratio.
+    """
+    def __init__(self, ratio_days=365.25, initial_account_value: float = 10000.0) -> None:
+        self.ratio_days = ratio_days
+        self.initial_account_value = initial_account_value
+
+    @staticmethod
+    def _forward_fill(array: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        positions = np.minimum(np.arange(array.shape[1]), lengths[:, None] - 1)
+        return np.take_along_axis(array, positions, axis=1)
+
+    def _sharpe_ratio(self, dates: np.ndarray, account_values: np.ndarray) -> np.ndarray:
+        episodes, steps = account_values.shape
+        rows = np.arange(episodes)
+        dates = dates.astype('datetime64[ns]')
+
+        # first state at least one day after every state, the anchors of SharpeRatio follow this chain from index 0
+        next_day = np.empty((episodes, steps), dtype=np.int64)
+        for row in rows:
+            next_day[row] = np.searchsorted(dates[row], dates[row] + np.timedelta64(1, 'D'), side='left')
+
+        count = np.zeros(episodes, dtype=np.int64)
+        total = np.zeros(episodes)
+        daily_returns = []
+        anchor = np.zeros(episodes, dtype=np.int64)
+        active = np.ones(episodes, dtype=bool)
+        while True:
+            next_anchor = next_day[rows, anchor]
+            active &= next_anchor < steps
+            if not active.any():
+                break
+            next_anchor = np.where(active, next_anchor, anchor)
+            returns = np.where(active, (account_values[rows, next_anchor] - account_values[rows, anchor]) / account_values[rows, anchor], 0.0)
+            daily_returns.append((returns, active.copy()))
+            total += returns
+            count += active
+            anchor = next_anchor
+
+        mean = np.divide(total, count, out=np.zeros(episodes), where=count > 0)
+        variance = np.zeros(episodes)
+        for returns, mask in daily_returns:
+            variance += np.where(mask, (returns - mean) ** 2, 0.0)
+        std = np.sqrt(np.divide(variance, count, out=np.zeros(episodes), where=count > 0))
+
+        return np.divide(mean, std, out=np.zeros(episodes), where=std != 0) * np.sqrt(self.ratio_days)
+
+    def compute(
+            self,
+            dates: np.ndarray,
+            account_values: np.ndarray,
+            allocations: np.ndarray,
+            lengths: np.ndarray = None,
+        ) -> dict:
+        dates, account_values, allocations = np.asarray(dates), np.asarray(account_values, dtype=np.float64), np.asarray(allocations)
+        single = account_values.ndim == 1
+        if single:
+            dates, account_values, allocations = dates[None], account_values[None], allocations[None]
+        assert dates.shape == account_values.shape == allocations.shape, "dates, account_values and allocations must have the same shape"
+
+        if lengths is not None:
+            lengths = np.asarray(lengths, dtype=np.int64).reshape(-1)
+            assert np.all((lengths >= 1) & (lengths <= account_values.shape[1])), "lengths must be between 1 and the number of steps"
+            dates = self._forward_fill(dates, lengths)
+            account_values = self._forward_fill(account_values, lengths)
+            allocations = self._forward_fill(allocations, lengths)
+
+        win_count = _win_count(account_values)
+        loss_count = _loss_count(account_values)
+        results = {
+            'different_actions': _different_actions(allocations),
+            'account_value': account_values[:, -1],
+            'account_value_changement': ((account_values[:, -1] - self.initial_account_value) / self.initial_account_value) * 100,
+            'max_drawdown': _max_drawdown(account_values),
+            'sharpe_ratio': self._sharpe_ratio(dates, account_values),
+            'average_win_loss_ratio': np.divide(win_count, loss_count, out=np.zeros(len(win_count)), where=loss_count > 0),
+            'win_count': win_count,
+            'loss_count': loss_count,
+        }
+
+        if single:
+            return {name: result[0].item() for name, result in results.items()}
+        return results
\ No newline at end of file
@@ -1,15 +1,98 @@
-from .state import Observations
+import math
+import typing
+from .state import Observations, OBSERVATION_FEATURES
+from .streaming_indicators import RollingWindow
 import numpy as np
 
+class RewardBatch:
+    """
+    Input of the batched reward protocol, the last step of N environments as arrays. close_data holds the closes
+    the rows of index (the newest row of every environment) point into, e.g. the close column of the whole data
+    feeder. new_episode marks the environments whose window was refilled since the previous call, rewards with
+    running state per environment rebuild it for these rows.
+    """
+    def __init__(
+            self,
+            last_account_value: np.ndarray,
+            account_value: np.ndarray,
+            close_data: np.ndarray,
+            index: np.ndarray,
+            window_size: int,
+            new_episode: np.ndarray,
+        ) -> None:
+        self.last_account_value = last_account_value
+        self.account_value = account_value
+        self.close_data = close_data
+        self.index = index
+        self.window_size = window_size
+        self.new_episode = new_episode
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.close_data[self.index]
+
+    @property
+    def last_close(self) -> np.ndarray:
+        return self.close_data[self.index - 1]
+
+    def closes(self, rows=slice(None)) -> np.ndarray:
+        """ Closes of the windows of rows (rows x window_size), oldest first """
+        return self.close_data[self.index[rows, None] + np.arange(1 - self.window_size, 1)]
+
+    @classmethod
+    def from_observations(cls, observations: Observations, new_episode: bool) -> 'RewardBatch':
+        """ Batch of one environment from its Observations """
+        return cls(
+            last_account_value=np.array([observations[-2].account_value]),
+            account_value=np.array([observations[-1].account_value]),
+            close_data=observations.as_array()[:, OBSERVATION_FEATURES.index('close')],
+            index=np.array([len(observations) - 1]),
+            window_size=len(observations),
+            new_episode=np.array([new_episode]),
+        )
+
+
 class Reward:
+    """
+    Rewards support two protocols. Called with the Observations of one environment they return a float, called with
+    a RewardBatch of N environments (see VecTradingEnv) they return an (N,) array. Subclasses implement the batched
+    protocol in _batch and may override _single with a faster one environment version, by default the Observations
+    are adapted into a batch of one.
+    """
     def __init__(self) -> None:
-        pass
+        self._last_observations = None
+        self._last_appended = None
 
     @property
     def __name__(self) -> str:
         return self.__class__.__name__
     
-    def __call__(self, observations: Observations) -> float:
+    def __call__(self, observations: typing.Union[Observations, RewardBatch]) -> typing.Union[float, np.ndarray]:
+        if isinstance(observations, RewardBatch):
+            return self._batch(observations)
+
+        assert isinstance(observations, Observations) == True, "observations must be an instance of Observations"
+        return self._single(observations)
+
+    def _next_step(self, observations: Observations) -> bool:
+        """ Whether exactly one state was appended to observations since the previous call """
+        next_step = (
+            observations is self._last_observations
+            and observations.appended == self._last_appended + 1
+            and observations.full
+        )
+        self._last_observations = observations
+        self._last_appended = observations.appended
+        return next_step
+
+    def _single(self, observations: Observations) -> float:
+        new_episode = not self._next_step(observations)
+        return float(self._batch(RewardBatch.from_observations(observations, new_episode))[0])
+
+    def _batch(self, batch: RewardBatch) -> np.ndarray:
         raise NotImplementedError
     
     def reset(self, observations: Observations):
@@ -24,43 +107,66 @@ class AccountValueChangeReward(Reward):
         super().reset(observations)
         self.returns = []
     
-    def __call__(self, observations: Observations) -> float:
-        assert isinstance(observations, Observations) == True, "observations must be an instance of Observations"
-
-        last_state, next_state = observations[-2:]
+    def _single(self, observations: Observations) -> float:
+        last_state, next_state = observations[-2], observations[-1]
         reward = (next_state.account_value - last_state.account_value) / last_state.account_value
 
         return reward
+
+    def _batch(self, batch: RewardBatch) -> np.ndarray:
+        return (batch.account_value - batch.last_account_value) / batch.last_account_value
     
 class StandartDeviationReward(Reward):
+    """
+    The standard deviation of the window's close differences is kept in a RollingWindow, which is updated with the
+    newest difference when exactly one state was appended since the previous call, so a call costs O(1) instead of
+    rebuilding the window. Only the last two sigma estimates are kept.
+
+    The batched protocol keeps the same running state per environment in arrays: a ring of the window's close
+    differences with their mean and sum of squared deviations, and the latest sigma estimate.
+    """
     def __init__(self, sigma_tgt=0.2, bp=0.0001, mu=1) -> None:
         super().__init__()
         self.sigma_tgt = sigma_tgt
         self.bp = bp
         self.mu = mu
         self.sigma_estimate = []
+        self._returns = None
+        self._ring = None
       
     def reset(self, observations: Observations):
         super().reset(observations)
         self.sigma_estimate = []
+        self._last_observations = None
 
-    def _calculate_sigma(self, rt):
+    def _calculate_sigma(self, std):
         # Calculate exponentially weighted moving standard deviation with a 60-day window
         if len(self.sigma_estimate) == 0:
-            sigma_t_minus_1 = np.std(rt)  # Initial estimate
+            sigma_t_minus_1 = std  # Initial estimate
         else:
-            sigma_t_minus_1 = np.sqrt(0.9 * self.sigma_estimate[-1]**2 + 0.1 * np.std(rt)**2)  # Exponentially weighted moving standard deviation
-        self.sigma_estimate.append(sigma_t_minus_1)
+            sigma_t_minus_1 = math.sqrt(0.9 * self.sigma_estimate[-1]**2 + 0.1 * std**2)  # Exponentially weighted moving standard deviation
+        self.sigma_estimate = self.sigma_estimate[-1:] + [sigma_t_minus_1]
         return sigma_t_minus_1
 
-    def __call__(self, observations: Observations) -> float:
-        assert isinstance(observations, Observations) == True, "observations must be an instance of Observations"
+    def _update_returns(self, observations: Observations) -> RollingWindow:
+        """ Rolling moments of the additive profits (rt), the differences of the closes in the window """
+        if self._next_step(observations) and self._returns is not None:
+            self._returns.update(observations[-1].close - observations[-2].close)
+        else:
+            rt = np.diff(observations.as_array()[:, OBSERVATION_FEATURES.index('close')])
+            self._returns = RollingWindow(max(len(rt), 1))
+            for value in rt.tolist():
+                self._returns.update(value)
 
-        # Calculate additive profit (rt)
-        rt = np.diff([state.close for state in observations])
+        return self._returns
+
+    def _single(self, observations: Observations) -> float:
+        # Calculate additive profit (rt) moments, np.std(rt) is the population standard deviation
+        returns = self._update_returns(observations)
+        std = math.sqrt(returns.var * (returns.count - 1) / returns.count) if returns.count >= 2 else 0.0
 
         # Calculate current, previous and two steps ago standard deviations
-        sigma_t_minus_1 = self._calculate_sigma(rt)
+        sigma_t_minus_1 = self._calculate_sigma(std)
         if len(self.sigma_estimate) >= 2:
             sigma_t_minus_2 = self.sigma_estimate[-2]
         else:
@@ -69,13 +175,51 @@ class StandartDeviationReward(Reward):
         # Calculate volatility scaling
         At_minus_1 = observations[-1].account_value
         At_minus_2 = observations[-2].account_value if len(observations) >= 2 else 0
-        volatility_scaling = (self.sigma_tgt / sigma_t_minus_1) * (At_minus_1 / At_minus_2)
+        # a window without variation (one close difference or a flat market) has sigma 0, the scaling is then
+        # infinite like the float64 division of the window implementation and of _batch
+        sigma_scaling = self.sigma_tgt / sigma_t_minus_1 if sigma_t_minus_1 != 0 else self.sigma_tgt * math.inf
+        volatility_scaling = sigma_scaling * (At_minus_1 / At_minus_2)
 
         # Calculate transaction cost
         pt_minus_1 = observations[-2].close
         transaction_cost = self.bp * pt_minus_1
 
-        # Calculate reward
-        reward = self.mu * volatility_scaling * (rt - transaction_cost)
-        avg_reward = np.mean(reward)
-        return float(avg_reward)
\ No newline at end of file
+        # Calculate reward, the mean of mu * volatility_scaling * (rt - transaction_cost) over the window
+        avg_reward = self.mu * volatility_scaling * (returns.mean - transaction_cost)
+        return float(avg_reward)
+
+    def _batch(self, batch: RewardBatch) -> np.ndarray:
+        size = batch.window_size - 1
+        rebuild = batch.new_episode
+        if self._ring is None or self._ring.shape != (len(batch), size):
+            self._ring = np.zeros((len(batch), size))
+            self._ring_position = 0
+            self._ring_mean = np.zeros(len(batch))
+            self._ring_m2 = np.zeros(len(batch))
+            self._batch_sigma = np.full(len(batch), np.nan)
+            rebuild = np.ones(len(batch), dtype=bool)
+
+        # replace the oldest close difference of the window by the newest one
+        last_close = batch.last_close
+        rt = batch.close - last_close
+        oldest = self._ring[:, self._ring_position]
+        mean = self._ring_mean + (rt - oldest) / size
+        self._ring_m2 += (rt - oldest) * (rt - mean + oldest - self._ring_mean)
+        self._ring_mean = mean
+        self._ring[:, self._ring_position] = rt
+        self._ring_position = (self._ring_position + 1) % size
+
+        rows = np.flatnonzero(rebuild)
+        if len(rows):
+            window_rt = np.diff(batch.closes(rows), axis=1)
+            self._ring[rows] = np.roll(window_rt, self._ring_position, axis=1)
+            self._ring_mean[rows] = window_rt.mean(axis=1)
+            self._ring_m2[rows] = ((window_rt - self._ring_mean[rows, None]) ** 2).sum(axis=1)
+
+        std = np.sqrt(np.maximum(self._ring_m2, 0.0) / size)
+        sigma = self._batch_sigma
+        self._batch_sigma = np.where(np.isnan(sigma), std, np.sqrt(0.9 * sigma**2 + 0.1 * std**2))
+
+        volatility_scaling = (self.sigma_tgt / self._batch_sigma) * (batch.account_value / batch.last_account_value)
+        transaction_cost = self.bp * last_close
+        return self.mu * volatility_scaling * (self._ring_mean - transaction_cost)
\ No newline at end of file
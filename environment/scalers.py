@@ -1,38 +1,195 @@
+import os
+import typing
 import numpy as np
-from .state import Observations
+from .state import Observations, OBSERVATION_FEATURES
+from .data_feeder import PdDataFeeder
 
-class MinMaxScaler:
+# Columns the scalers normalize, session and allocation_percentage are passed through unscaled
+SCALED_FEATURES = OBSERVATION_FEATURES[:-2]
+
+class Scaler:
     """
-    This class normalizes the state data between 0 and 1
+    Base class of the scalers. A scaler holds one offset and one divisor per SCALED_FEATURES column and computes
+    (features - offset) / divisor, the remaining columns are passed through. fit calculates the statistics in one
+    vectorized pass over the data feeder's arrays, save and load persist them (e.g. next to a trained model) so
+    evaluation reuses the training statistics.
+
+    transform scales the window's feature array (see Observations.as_array) with one broadcast operation and writes
+    it into reused float32 buffers. Two buffers are used in turn, so a returned observation stays valid until the
+    second next transform call. With incremental=True, when exactly one state was appended since the previous call
+    the previous output is shifted by one row and only the newest row is scaled.
     """
-    def __init__(self, min: float, max: float):
-        self._min = min
-        self._max = max
-    
+    def __init__(self, incremental: bool = False):
+        self._offset = None
+        self._divisor = None
+        self._incremental = incremental
+        self._buffers = None
+        self._scratch = None
+        self._current = 0
+        self._last_observations = None
+        self._last_appended = None
+
+    @property
+    def __name__(self) -> str:
+        return self.__class__.__name__
+
+    @property
+    def fitted(self) -> bool:
+        return self._offset is not None
+
+    def _statistics(self, data: np.ndarray) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """ offset and divisor of every column of data (rows x SCALED_FEATURES) """
+        raise NotImplementedError
+
+    def _parameters(self) -> dict:
+        """ Constructor parameters stored by save """
+        return {}
+
+    def _set_statistics(self, offset, divisor) -> None:
+        offset = np.broadcast_to(np.asarray(offset, dtype=np.float64), len(SCALED_FEATURES)).copy()
+        divisor = np.broadcast_to(np.asarray(divisor, dtype=np.float64), len(SCALED_FEATURES)).copy()
+        # constant columns (e.g. a missing volume) would be divided by zero, leave them centered but unscaled
+        divisor[divisor == 0.0] = 1.0
+        self._offset, self._divisor = offset, divisor
+        self._last_observations = None
+
+    def fit(self, data) -> 'Scaler':
+        """ Fit the statistics on a PdDataFeeder or a 2-D array whose first columns are SCALED_FEATURES """
+        data = data.data if isinstance(data, PdDataFeeder) else np.asarray(data, dtype=np.float64)
+        assert data.ndim == 2 and data.shape[1] >= len(SCALED_FEATURES), f"data must have at least {len(SCALED_FEATURES)} columns"
+
+        self._set_statistics(*self._statistics(data[:, :len(SCALED_FEATURES)]))
+        return self
+
+    def _scale(self, features: np.ndarray, out: np.ndarray, scratch: np.ndarray) -> None:
+        columns = len(SCALED_FEATURES)
+        np.subtract(features[..., :columns], self._offset, out=scratch)
+        scratch /= self._divisor
+        out[..., :columns] = scratch
+        out[..., columns:] = features[..., columns:]
+
+    def transform_array(self, features: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """ Scale an array of shape (..., columns) whose first columns are SCALED_FEATURES into float32 """
+        assert self.fitted, f"{self.__name__} must be fitted before transform"
+
+        if out is None:
+            out = np.empty(features.shape, dtype=np.float32)
+        self._scale(features, out, np.empty(features.shape[:-1] + (len(SCALED_FEATURES),), dtype=np.float64))
+
+        return out
+
     def transform(self, observations: Observations) -> np.ndarray:
 
         assert isinstance(observations, Observations) == True, "observations must be an instance of Observations"
+        assert self.fitted, f"{self.__name__} must be fitted before transform"
+
+        features = observations.as_array()
+        if self._buffers is None or self._buffers[0].shape != features.shape:
+            self._buffers = [np.empty(features.shape, dtype=np.float32) for _ in range(2)]
+            self._scratch = np.empty((features.shape[0], len(SCALED_FEATURES)), dtype=np.float64)
+            self._last_observations = None
+
+        previous = self._buffers[self._current]
+        self._current = 1 - self._current
+        transformed_data = self._buffers[self._current]
+
+        if (
+            self._incremental
+            and observations is self._last_observations
+            and observations.appended == self._last_appended + 1
+            and observations.full
+        ):
+            transformed_data[:-1] = previous[1:]
+            self._scale(features[-1:], transformed_data[-1:], self._scratch[-1:])
+        else:
+            self._scale(features, transformed_data, self._scratch)
+
+        self._last_observations = observations
+        self._last_appended = observations.appended
+
+        return transformed_data
 
-        transformed_data = []
-        for state in observations:
-            open = (state.open - self._min) / (self._max - self._min)
-            high = (state.high - self._min) / (self._max - self._min)
-            low = (state.low - self._min) / (self._max - self._min)
-            close = (state.close - self._min) / (self._max - self._min)
-            volume = (state.volume - self._min) / (self._max - self._min)
-            rsi = (state.rsi - self._min) / (self._max - self._min)
-            macd = (state.macd - self._min) / (self._max - self._min)
-            signal = (state.signal - self._min) / (self._max - self._min)
-            ma = (state.ma - self._min) / (self._max - self._min)
-            bb_upper = (state.bb_upper - self._min) / (self._max - self._min)
-            bb_lower = (state.bb_lower - self._min) / (self._max - self._min)
-            atr = (state.atr - self._min) / (self._max - self._min)
-            short_ema = (state.short_ema - self._min) / (self._max - self._min)
-            long_ema = (state.long_ema - self._min) / (self._max - self._min)
-            session = state.session
-            transformed_data.append([open, high, low, close, volume, rsi, macd, signal, ma, bb_upper, bb_lower, atr, short_ema, long_ema, session, state.allocation_percentage])
-
-        return np.array(transformed_data)
-    
     def __call__(self, observations) -> np.ndarray:
-        return self.transform(observations)
\ No newline at end of file
+        return self.transform(observations)
+
+    def save(self, path: str) -> None:
+        """ Write the fitted statistics to an .npz file """
+        assert self.fitted, f"{self.__name__} must be fitted before save"
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(
+            path,
+            scaler=self.__name__,
+            columns=np.array(SCALED_FEATURES),
+            offset=self._offset,
+            divisor=self._divisor,
+            **{f'parameter_{name}': value for name, value in self._parameters().items()},
+        )
+
+    @staticmethod
+    def load(path: str, incremental: bool = False) -> 'Scaler':
+        """ Create the scaler saved in path with its statistics, no refitting needed """
+        with np.load(path) as saved:
+            name = str(saved['scaler'])
+            assert name in SCALERS, f"unknown scaler '{name}'"
+            assert tuple(saved['columns'].tolist()) == SCALED_FEATURES, "saved columns don't match SCALED_FEATURES"
+
+            parameters = {key[len('parameter_'):]: saved[key].tolist() for key in saved.files if key.startswith('parameter_')}
+            scaler = SCALERS[name](incremental=incremental, **parameters)
+            scaler._set_statistics(saved['offset'], saved['divisor'])
+
+        return scaler
+
+    @staticmethod
+    def load_run(run_path: str, data_feeder: PdDataFeeder = None, incremental: bool = False) -> typing.Optional['Scaler']:
+        """
+        Load the scaler.npz of a training run. Runs saved before the scalers were stored were scaled with the price
+        range of the evaluated data, for them the MinMaxScaler of data_feeder's range is returned (None without one).
+        """
+        scaler_path = os.path.join(run_path, 'scaler.npz')
+        if os.path.exists(scaler_path):
+            return Scaler.load(scaler_path, incremental=incremental)
+        if data_feeder is None:
+            return None
+        return MinMaxScaler(min=data_feeder.min, max=data_feeder.max, incremental=incremental)
+
+
+class MinMaxScaler(Scaler):
+    """
+    This class normalizes the state data between 0 and 1
+
+    With min and max every column is scaled by the same global range (e.g. the price range of the data feeder),
+    otherwise fit calculates the minimum and maximum of each column.
+    """
+    def __init__(self, min: float = None, max: float = None, incremental: bool = False):
+        super().__init__(incremental=incremental)
+        if min is not None and max is not None:
+            self._set_statistics(min, max - min)
+
+    def _statistics(self, data: np.ndarray) -> typing.Tuple[np.ndarray, np.ndarray]:
+        min = data.min(axis=0)
+        return min, data.max(axis=0) - min
+
+
+class StandardScaler(Scaler):
+    """ Z-score scaling, every column is centered on its mean and divided by its standard deviation """
+    def _statistics(self, data: np.ndarray) -> typing.Tuple[np.ndarray, np.ndarray]:
+        return data.mean(axis=0), data.std(axis=0)
+
+
+class RobustScaler(Scaler):
+    """ Every column is centered on its median and divided by its interquartile range, so outliers have little effect """
+    def __init__(self, quantile_range: typing.Tuple[float, float] = (25.0, 75.0), incremental: bool = False):
+        super().__init__(incremental=incremental)
+        self.quantile_range = tuple(quantile_range)
+
+    def _parameters(self) -> dict:
+        return {'quantile_range': self.quantile_range}
+
+    def _statistics(self, data: np.ndarray) -> typing.Tuple[np.ndarray, np.ndarray]:
+        low, median, high = np.percentile(data, [self.quantile_range[0], 50.0, self.quantile_range[1]], axis=0)
+        return median, high - low
+
+
+SCALERS = {scaler.__name__: scaler for scaler in (MinMaxScaler, StandardScaler, RobustScaler)}
\ No newline at end of file
@@ -0,0 +1,57 @@
+import weakref
+import numpy as np
+from multiprocessing import shared_memory
+
+
+def _release(shm: shared_memory.SharedMemory, owner: bool) -> None:
+    try:
+        shm.close()
+    except BufferError:
+        # views of the block are still alive (e.g. at interpreter exit), the mapping goes away with the process
+        pass
+    if owner:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedArray:
+    """
+    SharedArray copies a NumPy array into a multiprocessing.shared_memory block. Pickling only sends the block name,
+    shape and dtype, so unpickled copies (e.g. the data feeder of SubprocVecEnv workers) attach zero-copy views of
+    the same memory instead of holding their own copy.
+
+    The process that created the block owns it and unlinks it in close, or when the SharedArray is garbage collected
+    or the process exits. Attached copies only close their mapping.
+    """
+    def __init__(self, array: np.ndarray) -> None:
+        array = np.ascontiguousarray(array)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self._owner = True
+        self._attach(array.shape, array.dtype)
+        self.array[...] = array
+        self.array.flags.writeable = False
+
+    def _attach(self, shape: tuple, dtype: np.dtype) -> None:
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self._shm.buf)
+        self._finalizer = weakref.finalize(self, _release, self._shm, self._owner)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def close(self) -> None:
+        """ Drop the view and release the block, unlinking it if this process owns it """
+        self.array = None
+        self._finalizer()
+
+    def __getstate__(self) -> dict:
+        assert self.array is not None, "SharedArray is closed"
+        return {'name': self._shm.name, 'shape': self.array.shape, 'dtype': self.array.dtype.str}
+
+    def __setstate__(self, state: dict) -> None:
+        self._shm = shared_memory.SharedMemory(name=state['name'])
+        self._owner = False
+        self._attach(state['shape'], np.dtype(state['dtype']))
+        self.array.flags.writeable = False
\ No newline at end of file
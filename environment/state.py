@@ -1,10 +1,25 @@
 import typing
+import operator
+import numpy as np
 from datetime import datetime
 
+# Order of the features in Observations.as_array and in the scaled observations
+OBSERVATION_FEATURES = (
+    'open', 'high', 'low', 'close', 'volume', 'rsi', 'macd', 'signal', 'ma',
+    'bb_upper', 'bb_lower', 'atr', 'short_ema', 'long_ema', 'session', 'allocation_percentage',
+)
+_get_features = operator.attrgetter(*OBSERVATION_FEATURES)
+
 class State:
     """
     The State class represents the candlestick data, indicator data and other relevant information for a given time period.
+    One State is created per bar, so it uses __slots__ to avoid a per-instance __dict__.
     """
+    __slots__ = (
+        'date', 'open', 'high', 'low', 'close', 'volume', 'rsi', 'macd', 'signal', 'ma', 'bb_upper', 'bb_lower',
+        'atr', 'short_ema', 'long_ema', 'session', 'balance', 'assets', '_allocation_percentage',
+    )
+
     def __init__(
             self, 
             date: str, 
@@ -41,25 +56,9 @@ class State:
         self.long_ema = long_ema
         self.session = session
         
-        self._balance = 0.0 # balance in cash
-        self._assets = 0.0 # balance in assets
+        self.balance = 0.0 # balance in cash
+        self.assets = 0.0 # balance in assets
         self._allocation_percentage = 0.0 # percentage of assets allocated to this state
-        
-    @property
-    def balance(self):
-        return self._balance
-    
-    @balance.setter
-    def balance(self, value: float):
-        self._balance = value
-
-    @property
-    def assets(self):
-        return self._assets
-    
-    @assets.setter
-    def assets(self, value: float):
-        self._assets = value
 
     @property
     def account_value(self):
@@ -76,38 +75,58 @@ class State:
     
 
 class Observations:
+    """
+    Observations holds the last window_size States in a fixed-capacity circular buffer, appending is O(1).
+    Next to the States it keeps their OBSERVATION_FEATURES rows in a buffer where every row is written twice,
+    window_size rows apart, so the window in chronological order is always one contiguous slice (see as_array).
+    """
     def __init__(
             self, 
             window_size: int,
-            observations: typing.List[State]=[],
+            observations: typing.List[State]=None,
         ):
-        self._observations = observations
+        observations = [] if observations is None else observations
         self._window_size = window_size
 
-        assert isinstance(self._observations, list) == True, "observations must be a list"
-        assert len(self._observations) <= self._window_size, f'observations length must be <= window_size, received: {len(self._observations)}'
-        assert all(isinstance(observation, State) for observation in self._observations) == True, "observations must be a list of State objects"
+        assert isinstance(observations, list) == True, "observations must be a list"
+        assert len(observations) <= self._window_size, f'observations length must be <= window_size, received: {len(observations)}'
+        assert all(isinstance(observation, State) for observation in observations) == True, "observations must be a list of State objects"
+
+        self._states = [None] * window_size
+        self._features = np.zeros((2 * window_size, len(OBSERVATION_FEATURES)), dtype=np.float64)
+        self._start = 0 # position of the oldest state
+        self._length = 0
+        self._appended = 0 # total number of appends, lets consumers detect a single new state
+
+        for observation in observations:
+            self.append(observation)
 
     def __len__(self) -> int:
-        return len(self._observations)
+        return self._length
     
     @property
     def window_size(self) -> int:
         return self._window_size
+
+    @property
+    def appended(self) -> int:
+        return self._appended
     
     @property
     def observations(self) -> typing.List[State]:
-        return self._observations
+        return [self._states[(self._start + index) % self._window_size] for index in range(self._length)]
     
     @property
     def full(self) -> bool:
-        return len(self._observations) == self._window_size
+        return self._length == self._window_size
     
-    def __getitem__(self, idx: int) -> State:
-        try:
-            return self._observations[idx]
-        except IndexError:
-            raise IndexError(f'index out of range: {idx}, observations length: {len(self._observations)}')
+    def __getitem__(self, idx: typing.Union[int, slice]) -> typing.Union[State, typing.List[State]]:
+        if isinstance(idx, slice):
+            return [self._states[(self._start + index) % self._window_size] for index in range(*idx.indices(self._length))]
+
+        if not -self._length <= idx < self._length:
+            raise IndexError(f'index out of range: {idx}, observations length: {self._length}')
+        return self._states[(self._start + idx % self._length) % self._window_size]
         
     def __iter__(self) -> State: # type: ignore
         """ Create a generator that iterate over the Sequence."""
@@ -115,11 +134,32 @@ class Observations:
             yield self[index]
 
     def reset(self) -> None:
-        self._observations = []
+        self._start = 0
+        self._length = 0
     
     def append(self, state: State) -> None:
         assert isinstance(state, State) == True, "state must be a State object"
-        self._observations.append(state)
 
-        if len(self._observations) > self._window_size:
-            self._observations.pop(0)
\ No newline at end of file
+        if self._length == self._window_size:
+            position = self._start
+            self._start = (self._start + 1) % self._window_size
+        else:
+            position = (self._start + self._length) % self._window_size
+            self._length += 1
+
+        self._states[position] = state
+        self._write_features(position, state)
+        self._appended += 1
+
+    def _write_features(self, position: int, state: State) -> None:
+        self._features[position] = self._features[position + self._window_size] = _get_features(state)
+
+    def as_array(self) -> np.ndarray:
+        """
+        OBSERVATION_FEATURES of the window in chronological order (len x features). This is a view into the buffer
+        that is only valid until the next append. The newest state can still be changed after its append (the env
+        sets its balance and allocation), so its row is refreshed on every call.
+        """
+        if self._length:
+            self._write_features((self._start + self._length - 1) % self._window_size, self[-1])
+        return self._features[self._start:self._start + self._length]
\ No newline at end of file
@@ -1,4 +1,11 @@
+import typing
 import pandas as pd
+import numpy as np
+
+from .data_feeder import PdDataFeeder, FEATURE_COLUMNS
+from .backtest import backtest, BacktestResult
+from .metrics import MetricSuite
+from .indicators import LondonAsiaSession, session_labels
 
 class SupportResistanceDetector:
     """
@@ -30,4 +37,115 @@ class SupportResistanceDetector:
     
     def reset(self):
         self.support = None
-        self.resistance = None
\ No newline at end of file
+        self.resistance = None
+
+
+class Strategy:
+    """
+    Base class of the vectorized strategies. signals computes the action (0 hold, 1 sell, 2 buy) of every row from a
+    feature array in FEATURE_COLUMNS order, e.g. the data feeder's data or the output of a scaler's transform_array,
+    in one pass instead of one call per step. dates are the datetime64 dates of the rows, for strategies that need them.
+
+    Like a detector called with the observations of a TradingEnv, the signal of a row is acted on when the row is the
+    oldest of the observation window, window_size rows later. actions returns these actions for an episode over the
+    whole feature array, backtest runs them through environment.backtest.
+    """
+    def signals(self, features: np.ndarray, dates: np.ndarray = None) -> np.ndarray:
+        raise NotImplementedError
+
+    def actions(self, features: np.ndarray, window_size: int = 2, dates: np.ndarray = None) -> np.ndarray:
+        return self.signals(features, dates)[:len(features) - window_size]
+
+    def backtest(
+            self,
+            data_feeder: PdDataFeeder,
+            features: np.ndarray = None,
+            initial_balance: float = 1000.0,
+            window_size: int = 2,
+            metric_suite: MetricSuite = None,
+        ) -> BacktestResult:
+        """ Backtest the strategy over the whole data feeder, on its raw data unless features are given """
+        features = data_feeder.data if features is None else features
+        return backtest(
+            data_feeder.column('close'),
+            self.actions(features, window_size, data_feeder.dates),
+            initial_balance=initial_balance,
+            start_index=window_size - 1,
+            dates=data_feeder.dates,
+            metric_suite=metric_suite,
+        )
+
+
+class SupportResistanceStrategy(Strategy):
+    """
+    Vectorized SupportResistanceDetector, reset after every buy signal as in rule_based.py. The support is the lowest
+    close and the resistance the highest high of the Asia session rows since the last reset, a London open row closing
+    below the support is a sell and one closing at or above the resistance a buy.
+
+    The support and resistance only depend on the rows since the last buy, so signals scans the rows in chunks with
+    running minimums and maximums and restarts at the row after the first buy of a chunk. The chunk doubles while no
+    buy is found. The signals equal the detector's bar for bar when both get the same features.
+
+    The sessions are read from the session column, unless asia_hours or london_hours ((start hour, end hour) like
+    the sessions of LondonAsiaSession) are given. Then the rows are labelled from the dates with these hours, so
+    session windows can be tuned without recalculating the features.
+    """
+    def __init__(
+            self,
+            asia_session: int = 1,
+            london_session: int = 2,
+            asia_hours: typing.Tuple[float, float] = None,
+            london_hours: typing.Tuple[float, float] = None,
+            chunk_size: int = 256,
+        ):
+        self.asia_session = asia_session
+        self.london_session = london_session
+        self.sessions = None
+        if asia_hours is not None or london_hours is not None:
+            default_hours = {label: (start, end) for label, start, end in LondonAsiaSession.SESSIONS}
+            self.sessions = (
+                (london_session, *(london_hours if london_hours is not None else default_hours[2])),
+                (asia_session, *(asia_hours if asia_hours is not None else default_hours[1])),
+            )
+        self.chunk_size = chunk_size
+
+    def signals(self, features: np.ndarray, dates: np.ndarray = None) -> np.ndarray:
+        features = np.asarray(features)
+        close = features[:, FEATURE_COLUMNS.index('close')]
+        if self.sessions is not None:
+            assert dates is not None, "dates are needed to label the sessions from asia_hours and london_hours"
+            session = session_labels(dates, self.sessions)
+        else:
+            session = features[:, FEATURE_COLUMNS.index('session')]
+        asia = session == self.asia_session
+        london = session == self.london_session
+        asia_close = np.where(asia, close, np.inf)
+        asia_high = np.where(asia, features[:, FEATURE_COLUMNS.index('high')], -np.inf)
+
+        signals = np.zeros(len(features), dtype=np.int64)
+        start, chunk_size = 0, self.chunk_size
+        support, resistance = np.inf, -np.inf
+        while start < len(features):
+            end = min(start + chunk_size, len(features))
+            supports = np.minimum(np.minimum.accumulate(asia_close[start:end]), support)
+            resistances = np.maximum(np.maximum.accumulate(asia_high[start:end]), resistance)
+
+            # rows without an Asia row since the reset have no support (None in the detector)
+            london_rows = london[start:end] & (supports < np.inf)
+            below_support = close[start:end] < supports
+            sell = london_rows & below_support
+            buys = np.flatnonzero(london_rows & ~below_support & (close[start:end] >= resistances))
+
+            if len(buys):
+                end = start + buys[0] + 1
+                signals[start:end][sell[:buys[0] + 1]] = 1
+                signals[end - 1] = 2
+                support, resistance = np.inf, -np.inf
+                chunk_size = self.chunk_size
+            else:
+                signals[start:end][sell] = 1
+                support, resistance = supports[-1], resistances[-1]
+                chunk_size *= 2
+            start = end
+
+        return signals
\ No newline at end of file
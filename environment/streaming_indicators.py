@@ -0,0 +1,198 @@
+import math
+
+class RollingWindow:
+    """
+    Fixed size window over a stream of values with O(1) updates of the running mean and sample variance
+    (Welford's algorithm with removal of the value that leaves the window). Memory is bounded by the window size.
+    Like pandas rolling, a window of repeated values has exactly that value as mean and zero variance.
+    """
+    def __init__(self, window: int):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self._values = [0.0] * self.window
+        self._position = 0
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._last = None
+        self._repeated = 0
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.window
+
+    @property
+    def var(self) -> float:
+        if self.count < 2:
+            return math.nan
+        if self._repeated >= self.count:
+            return 0.0
+        return max(self._m2, 0.0) / (self.count - 1)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.var)
+
+    def update(self, value: float) -> None:
+        if self.full:
+            old = self._values[self._position]
+            self.count -= 1
+            if self.count == 0:
+                self.mean, self._m2 = 0.0, 0.0
+            else:
+                delta = old - self.mean
+                self.mean -= delta / self.count
+                self._m2 -= delta * (old - self.mean)
+
+        self._values[self._position] = value
+        self._position = (self._position + 1) % self.window
+
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+        self._repeated = self._repeated + 1 if value == self._last else 1
+        self._last = value
+        if self._repeated >= self.count:
+            self.mean = value
+
+
+class EWMA:
+    """ Recursive exponentially weighted mean, same as pandas ewm(span=span, min_periods=1, adjust=True).mean() """
+    def __init__(self, span: int):
+        self.span = span
+        self.reset()
+
+    def reset(self):
+        self.value = math.nan
+        self._old_weight = 0.0
+
+    def update(self, value: float) -> float:
+        if self._old_weight == 0.0:
+            self.value = value
+        else:
+            self._old_weight *= 1.0 - 2.0 / (self.span + 1.0)
+            if self.value != value:
+                self.value = (self._old_weight * self.value + value) / (self._old_weight + 1.0)
+        self._old_weight += 1.0
+        return self.value
+
+
+def _ratio(numerator: float, denominator: float) -> float:
+    """ numerator / denominator with numpy semantics for a zero denominator """
+    if denominator == 0.0:
+        if numerator == 0.0 or math.isnan(numerator):
+            return math.nan
+        return math.copysign(math.inf, numerator)
+    return numerator / denominator
+
+
+class StreamingIndicator:
+    """
+    Base class of the streaming counterparts of the indicators in environment/indicators.py. update takes one bar
+    (any mapping with 'close', 'high', 'low' keys, e.g. a dict or a DataFrame row) and returns the indicator
+    values of that bar in constant time and memory. Feeding a dataset bar by bar gives the same values as the
+    batch calculate, NaN while the window is not filled yet.
+    """
+    def reset(self):
+        raise NotImplementedError
+
+    def update(self, bar) -> dict:
+        raise NotImplementedError
+
+
+class StreamingRSI(StreamingIndicator):
+    def __init__(self, window=14):
+        self.window = window
+        self._gain = RollingWindow(window)
+        self._loss = RollingWindow(window)
+        self.reset()
+
+    def reset(self):
+        self._gain.reset()
+        self._loss.reset()
+        self._prev_close = None
+
+    def update(self, bar) -> dict:
+        close = float(bar['close'])
+        # the first bar has no previous close, batch RSI counts it as no change
+        delta = 0.0 if self._prev_close is None else close - self._prev_close
+        self._prev_close = close
+
+        self._gain.update(delta if delta > 0 else 0.0)
+        self._loss.update(-delta if delta < 0 else 0.0)
+        if not self._gain.full:
+            return {'rsi': math.nan}
+
+        RS = _ratio(self._gain.mean, self._loss.mean)
+        return {'rsi': 100 - (100 / (1 + RS))}
+
+
+class StreamingMACD(StreamingIndicator):
+    def __init__(self, short_window=12, long_window=26, signal_window=9):
+        self.short_window = short_window
+        self.long_window = long_window
+        self.signal_window = signal_window
+        self._short_ema = EWMA(short_window)
+        self._long_ema = EWMA(long_window)
+        self._signal = EWMA(signal_window)
+
+    def reset(self):
+        self._short_ema.reset()
+        self._long_ema.reset()
+        self._signal.reset()
+
+    def update(self, bar) -> dict:
+        close = float(bar['close'])
+        short_ema = self._short_ema.update(close)
+        long_ema = self._long_ema.update(close)
+        macd = short_ema - long_ema
+        return {
+            'short_ema': short_ema,
+            'long_ema': long_ema,
+            'macd': macd,
+            'signal': self._signal.update(macd),
+        }
+
+
+class StreamingBollingerBands(StreamingIndicator):
+    def __init__(self, window=20, num_std=2):
+        self.window = window
+        self.num_std = num_std
+        self._close = RollingWindow(window)
+
+    def reset(self):
+        self._close.reset()
+
+    def update(self, bar) -> dict:
+        self._close.update(float(bar['close']))
+        if not self._close.full:
+            return {'ma': math.nan, 'bb_upper': math.nan, 'bb_lower': math.nan}
+
+        ma = self._close.mean
+        std = self._close.std
+        return {'ma': ma, 'bb_upper': ma + self.num_std * std, 'bb_lower': ma - self.num_std * std}
+
+
+class StreamingATR(StreamingIndicator):
+    def __init__(self, window=14):
+        self.window = window
+        self._true_range = RollingWindow(window)
+        self.reset()
+
+    def reset(self):
+        self._true_range.reset()
+        self._prev_close = None
+
+    def update(self, bar) -> dict:
+        high, low, close = float(bar['high']), float(bar['low']), float(bar['close'])
+        true_range = high - low
+        if self._prev_close is not None:
+            true_range = max(true_range, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+
+        self._true_range.update(true_range)
+        return {'atr': self._true_range.mean if self._true_range.full else math.nan}
@@ -0,0 +1,90 @@
+import os
+import typing
+import itertools
+import pandas as pd
+
+from .data_feeder import PdDataFeeder
+from .backtest import backtest
+from .metrics import MetricSuite
+from .strategies import Strategy, SupportResistanceStrategy
+from .worker_pool import map_tasks, rank_table
+
+def _run(data_feeder: PdDataFeeder, strategy_class, parameters, date_range, rows, ratio_days, initial_balance, window_size) -> dict:
+    start, stop = rows
+    # slices of the shared arrays are views, the worker never copies the data
+    features = data_feeder.data[start:stop]
+    dates = data_feeder.dates[start:stop]
+
+    strategy = strategy_class(**parameters)
+    result = backtest(
+        data_feeder.column('close')[start:stop],
+        strategy.actions(features, window_size, dates),
+        initial_balance=initial_balance,
+        start_index=window_size - 1,
+        dates=dates,
+        metric_suite=MetricSuite(ratio_days=ratio_days, initial_account_value=initial_balance),
+    )
+    return {**parameters, 'start': date_range[0], 'end': date_range[1], **result.metrics}
+
+
+class Sweep:
+    """
+    Sweep backtests a Strategy for every combination of a parameter grid (parameter name to list of values) on every
+    date range ((start, end) date strings, both included like the date filters of test.py and rule_based.py).
+
+    The backtests run in a ProcessPoolExecutor. Every worker gets the data feeder once, through the pool initializer,
+    and slices the date ranges out of its arrays. With a shared_memory=True data feeder the workers attach to one
+    read-only copy of the feature arrays, so memory stays flat as workers are added. Tasks are sent in chunks to keep
+    the dispatch overhead small against the backtests, which take a few milliseconds each.
+
+    run returns the results table, one row per parameter combination and date range with the MetricSuite metrics,
+    ranked by the rank_by metric (descending), and writes it to path as csv if given.
+    """
+    def __init__(
+            self,
+            data_feeder: PdDataFeeder,
+            grid: typing.Dict[str, typing.List[typing.Any]],
+            date_ranges: typing.List[typing.Tuple[str, str]],
+            strategy_class: typing.Type[Strategy] = SupportResistanceStrategy,
+            initial_balance: float = 1000.0,
+            window_size: int = 2,
+            max_workers: int = None,
+            rank_by: str = 'sharpe_ratio',
+        ) -> None:
+        self._data_feeder = data_feeder
+        self._grid = {name: [tuple(value) if isinstance(value, list) else value for value in values] for name, values in grid.items()}
+        self._date_ranges = [tuple(date_range) for date_range in date_ranges]
+        self._strategy_class = strategy_class
+        self._initial_balance = initial_balance
+        self._window_size = window_size
+        self._max_workers = max_workers
+        self._rank_by = rank_by
+
+    @property
+    def parameters(self) -> typing.List[dict]:
+        names = list(self._grid)
+        return [dict(zip(names, values)) for values in itertools.product(*self._grid.values())]
+
+    def _rows(self, start: str, end: str) -> typing.Tuple[int, int]:
+        rows = self._data_feeder.date_rows(start, end)
+        assert rows[1] - rows[0] > self._window_size, f"date range {start} - {end} has fewer than {self._window_size + 1} rows"
+        return rows
+
+    def _tasks(self) -> typing.List[tuple]:
+        ranges = []
+        for start, end in self._date_ranges:
+            ratio_days = (pd.Timestamp(end) - pd.Timestamp(start)).days
+            ranges.append(((start, end), self._rows(start, end), ratio_days))
+
+        return [
+            (self._strategy_class, parameters, date_range, rows, ratio_days, self._initial_balance, self._window_size)
+            for parameters in self.parameters
+            for date_range, rows, ratio_days in ranges
+        ]
+
+    def run(self, path: str = None) -> pd.DataFrame:
+        tasks = self._tasks()
+        max_workers = self._max_workers if self._max_workers is not None else os.cpu_count()
+        chunksize = max(1, len(tasks) // (4 * max_workers))
+        results = map_tasks(_run, tasks, self._data_feeder, max_workers, chunksize=chunksize)
+        return rank_table(results, self._rank_by, path)
\ No newline at end of file
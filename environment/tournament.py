@@ -0,0 +1,167 @@
+import os
+import glob
+import typing
+import numpy as np
+import pandas as pd
+from stable_baselines3 import PPO
+
+from .data_feeder import PdDataFeeder, FEATURE_COLUMNS
+from .backtest import backtest, BacktestResult
+from .metrics import MetricSuite
+from .scalers import Scaler, MinMaxScaler
+from .index_observations import set_policy_features
+from .worker_pool import map_tasks, rank_table
+
+def evaluate_policy(
+        data_feeder: PdDataFeeder,
+        model: PPO,
+        rows: typing.List[typing.Tuple[int, int]],
+        ratio_days: typing.List[float],
+        scaler: Scaler = None,
+        initial_balance: float = 10000.0,
+        deterministic: bool = True,
+    ) -> typing.List[BacktestResult]:
+    """
+    Evaluate model on every (start, stop) row range like test.py, one episode over the whole range, with the
+    scaler or, without one, the price range of each range. The episodes of all ranges are stepped together, every
+    step is one policy call on the observations of all of them. The policy only sees the allocation of its account,
+    which follows from the actions, so the loop keeps the allocations and the accounts and metrics are calculated
+    from the actions afterwards by backtest.
+    """
+    # models trained on index observations gather the windows from the features themselves
+    index_observations = len(model.observation_space.shape) == 1
+    if index_observations:
+        window_size, columns = model.observation_space.shape[0] - 1, len(FEATURE_COLUMNS) + 1
+    else:
+        window_size, columns = model.observation_space.shape
+    assert columns == len(FEATURE_COLUMNS) + 1, f"the model was trained on observations with {columns} features"
+    assert all(stop - start > window_size for start, stop in rows), f"every range needs more than {window_size} rows"
+
+    # scaled features of all ranges one after another, offsets[k] is the first row of range k in them
+    blocks = []
+    for start, stop in rows:
+        data = data_feeder.data[start:stop]
+        if scaler is None:
+            block_scaler = MinMaxScaler(min=data[:, FEATURE_COLUMNS.index('low')].min(), max=data[:, FEATURE_COLUMNS.index('high')].max())
+            blocks.append(block_scaler.transform_array(data))
+        else:
+            blocks.append(scaler.transform_array(data))
+    features = np.concatenate(blocks)
+    offsets = np.cumsum([0] + [len(block) for block in blocks[:-1]])
+    steps = np.array([stop - start - window_size for start, stop in rows])
+    if index_observations:
+        set_policy_features(model.policy, features)
+
+    episodes = len(rows)
+    actions = np.zeros((episodes, steps.max()), dtype=np.int64)
+    allocation = np.zeros(episodes, dtype=np.float64)
+    allocations = np.zeros((episodes, window_size), dtype=np.float32)
+    observations = np.empty((episodes, window_size + 1) if index_observations else (episodes, window_size, columns), dtype=np.float32)
+    window_offsets = np.arange(window_size)
+    for step in range(steps.max()):
+        # finished episodes repeat their last observation, their actions are not used
+        first_rows = offsets + np.minimum(step, steps - 1)
+        if index_observations:
+            observations[:, 0] = first_rows + window_size - 1
+            observations[:, 1:] = allocations
+        else:
+            observations[:, :, :-1] = features[first_rows[:, None] + window_offsets]
+            observations[:, :, -1] = allocations
+        action, _ = model.predict(observations, deterministic=deterministic)
+
+        # forced holds of TradingEnv._take_action
+        action = np.where((action == 2) & (allocation == 1.0), 0, action)
+        action = np.where((action == 1) & (allocation == 0.0), 0, action)
+        allocation = np.where(action == 2, 1.0, np.where(action == 1, 0.0, allocation))
+        actions[:, step] = action
+        allocations[:, :-1] = allocations[:, 1:]
+        allocations[:, -1] = allocation
+
+    close, dates = data_feeder.column('close'), data_feeder.dates
+    return [
+        backtest(
+            close,
+            episode_actions[:episode_steps],
+            initial_balance=initial_balance,
+            start_index=start + window_size - 1,
+            dates=dates,
+            metric_suite=MetricSuite(ratio_days=days, initial_account_value=initial_balance),
+        )
+        for (start, stop), days, episode_actions, episode_steps in zip(rows, ratio_days, actions, steps)
+    ]
+
+def evaluate_agent(
+        data_feeder: PdDataFeeder,
+        run_path: str,
+        windows: typing.List[typing.Tuple[str, str]],
+        initial_balance: float = 10000.0,
+        deterministic: bool = True,
+        model_name: str = 'best_model',
+    ) -> typing.List[dict]:
+    """ Evaluate the model_name model of run_path on every date window with evaluate_policy, one result dict per window """
+    model = PPO.load(os.path.join(run_path, model_name), device='cpu')
+
+    # scaling statistics of the training data, older runs were scaled with the price range of the evaluated data
+    scaler = Scaler.load_run(run_path)
+
+    rows = [data_feeder.date_rows(start, end) for start, end in windows]
+    ratio_days = [(pd.Timestamp(end) - pd.Timestamp(start)).days for start, end in windows]
+    results = evaluate_policy(data_feeder, model, rows, ratio_days, scaler, initial_balance, deterministic)
+
+    agent = os.path.basename(os.path.normpath(run_path))
+    return [{'agent': agent, 'start': start, 'end': end, **result.metrics} for (start, end), result in zip(windows, results)]
+
+
+class Tournament:
+    """
+    Tournament evaluates every saved agent (runs/<agent_number>/best_model.zip, or <model_name>.zip e.g. model.zip
+    for the folds of a walk-forward run) on a set of out-of-sample date windows
+    without rendering or prompts. Agents are evaluated in a ProcessPoolExecutor, one task per agent, every worker
+    attaches to the data feeder once (shared memory with shared_memory=True) and runs torch with torch_threads
+    threads so the workers don't oversubscribe the cores. Inference is batched over the windows, see evaluate_agent.
+
+    run returns the comparison table, one row per agent and window with the MetricSuite metrics, ranked by the
+    rank_by metric (descending), and writes it to path as csv if given. summary averages the metrics per agent.
+    """
+    def __init__(
+            self,
+            data_feeder: PdDataFeeder,
+            windows: typing.List[typing.Tuple[str, str]],
+            runs_path: str = 'runs',
+            initial_balance: float = 10000.0,
+            deterministic: bool = True,
+            max_workers: int = None,
+            torch_threads: int = 1,
+            rank_by: str = 'sharpe_ratio',
+            model_name: str = 'best_model',
+        ) -> None:
+        self._data_feeder = data_feeder
+        self._windows = [tuple(window) for window in windows]
+        self._runs_path = runs_path
+        self._initial_balance = initial_balance
+        self._deterministic = deterministic
+        self._max_workers = max_workers
+        self._torch_threads = torch_threads
+        self._rank_by = rank_by
+        self._model_name = model_name
+
+    @property
+    def agents(self) -> typing.List[str]:
+        """ Run folders with a saved model_name model, in agent number order and then by name """
+        paths = [os.path.dirname(path) for path in glob.glob(os.path.join(self._runs_path, '*', f'{self._model_name}.zip'))]
+        names = {path: os.path.basename(path) for path in paths}
+        return sorted(paths, key=lambda path: (int(names[path]), '') if names[path].isdigit() else (float('inf'), names[path]))
+
+    def run(self, path: str = None) -> pd.DataFrame:
+        agents = self.agents
+        assert len(agents) > 0, f"no saved agents found in {self._runs_path}"
+
+        tasks = [(run_path, self._windows, self._initial_balance, self._deterministic, self._model_name) for run_path in agents]
+        max_workers = min(self._max_workers if self._max_workers is not None else os.cpu_count(), len(tasks))
+        results = map_tasks(evaluate_agent, tasks, self._data_feeder, max_workers, self._torch_threads)
+        return rank_table([row for rows in results for row in rows], self._rank_by, path)
+
+    def summary(self, table: pd.DataFrame) -> pd.DataFrame:
+        """ Mean of every metric per agent over the windows, ranked by rank_by """
+        metrics = table.drop(columns=['rank', 'start', 'end'])
+        return metrics.groupby('agent').mean().sort_values(self._rank_by, ascending=False)
\ No newline at end of file
@@ -1,14 +1,36 @@
 import typing
 import numpy as np
 import gymnasium as gym
+from numpy.lib.stride_tricks import sliding_window_view
 from gymnasium import spaces
 
-from .state import State, Observations
+from .state import State, Observations, OBSERVATION_FEATURES
 from .data_feeder import PdDataFeeder
 from .reward import AccountValueChangeReward
 
 
 class TradingEnv(gym.Env):
+    """
+    With precompute_observations=True the data feeder's feature array is scaled once by the output_transformer
+    (a Scaler, see environment/scalers.py) and exposed through sliding_window_view, so the market part of every
+    observation is a view of that array and only the allocation_percentage column is filled in per step.
+
+    info selects the entries of the info dicts returned by step and reset: 'states' (the new states) and 'metrics'
+    (the current metric results). Training can pass info=() to skip building them, the metrics are still updated.
+
+    metrics_schedule selects when the metrics are calculated: 'step' updates them with every new state, an int k or
+    'episode' records the account values of the new states and extends the metrics with them in one vectorized pass
+    (Metric.extend) every k steps and at the end of the episode, or only at the end of the episode. Every state is
+    passed to the metrics once, so the cost of the metrics over an episode does not depend on k. With the latter
+    two, info['metrics'] is only set on the steps the metrics are calculated at.
+
+    With index_observations=True an observation is the index of its newest row followed by its allocation_percentage
+    column (window_size + 1 values) instead of the whole window, the market features are gathered from features by
+    the policy (see environment/index_observations.py).
+
+    features are the scaled features of all rows, computed with the output_transformer when first needed unless
+    given. Pass the same array to every env of a vector env (and to set_policy_features) so they share one copy.
+    """
     def __init__(
             self,
             data_feeder: PdDataFeeder,
@@ -17,7 +39,12 @@ class TradingEnv(gym.Env):
             max_episode_steps: int = None,
             window_size: int = 50,
             reward_function: typing.Callable = AccountValueChangeReward(),
-            metrics: typing.List[typing.Callable] = []
+            metrics: typing.List[typing.Callable] = [],
+            precompute_observations: bool = False,
+            info: typing.Iterable[str] = ('states', 'metrics'),
+            metrics_schedule: typing.Union[str, int] = 'step',
+            index_observations: bool = False,
+            features: np.ndarray = None,
         ) -> None:
         self._data_feeder = data_feeder
         self._output_transformer = output_transformer
@@ -26,11 +53,46 @@ class TradingEnv(gym.Env):
         self._window_size = window_size
         self._reward_function = reward_function
         self._metrics = metrics
+        self._info = tuple(info)
+        assert set(self._info) <= {'states', 'metrics'}, "info can only contain 'states' and 'metrics'"
+        self._info_states = 'states' in self._info
+        self._info_metrics = 'metrics' in self._info
+        assert metrics_schedule in ('step', 'episode') or (isinstance(metrics_schedule, int) and metrics_schedule > 0), \
+            "metrics_schedule must be 'step', 'episode' or a positive int"
+        self._metrics_schedule = metrics_schedule
+
+        # states not yet passed to Metric.extend, the first entry is the last state the metrics were extended with
+        self._record = metrics_schedule != 'step'
+        if self._record:
+            length = self._max_episode_steps - window_size + 1
+            if metrics_schedule != 'episode':
+                length = min(length, metrics_schedule + 1)
+            self._episode_indexes = np.zeros(length, dtype=np.int64)
+            self._episode_account_values = np.zeros(length, dtype=np.float64)
+            self._episode_allocations = np.zeros(length, dtype=np.float64)
+            self._episode_length = 0
 
         self._observations = Observations(window_size=window_size)
 
+        self._index_observations = index_observations
+        self._features = features
+        if features is not None:
+            assert features.shape == data_feeder.data.shape, "features must have a row and column for every feature of the data feeder"
+        if index_observations:
+            # the row index is stored in a float32 observation, which is exact up to 2**24
+            assert len(data_feeder) <= 2**24, "index_observations supports up to 2**24 rows"
+            self._buffers = [np.empty(window_size + 1, dtype=np.float32) for _ in range(2)]
+            self._current = 0
+
+        self._windows = None
+        if precompute_observations and not index_observations:
+            # windows[i] holds the scaled market features of the rows i to i + window_size - 1
+            self._windows = sliding_window_view(self.features, window_size, axis=0).transpose(0, 2, 1)
+            self._buffers = [np.empty((window_size, len(OBSERVATION_FEATURES)), dtype=np.float32) for _ in range(2)]
+            self._current = 0
+
         # Define observation space
-        observation_shape = (window_size, data_feeder._df.shape[1]+1)  # Adjust the shape according to your data
+        observation_shape = (window_size + 1,) if index_observations else (window_size, len(OBSERVATION_FEATURES))
         self._observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=observation_shape, dtype=np.float32)
 
         self.action_space = spaces.Discrete(3)
@@ -39,6 +101,13 @@ class TradingEnv(gym.Env):
     def observation_space(self):
         return self._observation_space
 
+    @property
+    def features(self) -> np.ndarray:
+        """ Scaled features of all rows (rows x FEATURE_COLUMNS), the rows the index observations refer to """
+        if self._features is None:
+            self._features = self._output_transformer.transform_array(self._data_feeder.data)
+        return self._features
+
     def _get_obs(self, index: int, balance: float=None) -> State:
         next_state = self._data_feeder[index]
         if balance is not None:
@@ -46,12 +115,31 @@ class TradingEnv(gym.Env):
 
         return next_state
     
+    def _transform_obs(self, index: int) -> np.ndarray:
+        """ Scaled observation of the window whose newest state is the row index """
+        if self._index_observations:
+            self._current = 1 - self._current
+            transformed_obs = self._buffers[self._current]
+            transformed_obs[0] = index
+            transformed_obs[1:] = self._observations.as_array()[:, -1]
+            return transformed_obs
+
+        if self._windows is None:
+            return self._output_transformer.transform(self._observations)
+
+        # two buffers used in turn, like the scalers, so the previous observation stays valid for one more step
+        self._current = 1 - self._current
+        transformed_obs = self._buffers[self._current]
+        transformed_obs[:, :-1] = self._windows[index - self._window_size + 1]
+        transformed_obs[:, -1] = self._observations.as_array()[:, -1]
+        return transformed_obs
+
     def _get_terminated(self):
         return False
         
     def _take_action(self, action: int, order_size: float) -> typing.Tuple[int, float]:
         # get last state and next state
-        last_state, next_state = self._observations[-2:]
+        last_state, next_state = self._observations[-2], self._observations[-1]
 
         # modify action to hold (0) if we are out of balance
         if action == 2 and last_state.allocation_percentage == 1.0:
@@ -82,18 +170,53 @@ class TradingEnv(gym.Env):
     def metrics(self):
         return self._metrics
 
-    def _metricsHandler(self, observation: State):
-        metrics = {}
-        # Loop through metrics and update
+    def _metricsHandler(self, observation: State, index: int, done: bool = False):
+        if self._metrics_schedule == 'step':
+            # Loop through metrics and update
+            for metric in self._metrics:
+                metric.update(observation)
+
+            if not self._info_metrics:
+                return None
+
+            return {metric.name: metric.result for metric in self._metrics}
+
+        if not self._record:
+            return None
+
+        self._record_state(observation, index)
+        if done or self._episode_length == len(self._episode_indexes):
+            metrics = self._extend_metrics()
+            return metrics if self._info_metrics else None
+
+        return None
+
+    def _record_state(self, state: State, index: int) -> None:
+        self._episode_indexes[self._episode_length] = index
+        self._episode_account_values[self._episode_length] = state.account_value
+        self._episode_allocations[self._episode_length] = state.allocation_percentage
+        self._episode_length += 1
+
+    def _extend_metrics(self) -> dict:
+        length = self._episode_length
+        dates = self._data_feeder.dates[self._episode_indexes[:length]]
+        account_values = self._episode_account_values[:length]
+        allocations = self._episode_allocations[:length]
         for metric in self._metrics:
-            metric.update(observation)
-            metrics[metric.name] = metric.result
+            metric.extend(dates, account_values, allocations)
+
+        # the last state starts the next chunk
+        self._episode_indexes[0] = self._episode_indexes[length - 1]
+        self._episode_account_values[0] = self._episode_account_values[length - 1]
+        self._episode_allocations[0] = self._episode_allocations[length - 1]
+        self._episode_length = 1
 
-        return metrics
+        return {metric.name: metric.result for metric in self._metrics}
 
     def step(self, action: int) -> typing.Tuple[State, float, bool, bool, dict]:
 
-        index = self._env_step_indexes.pop(0)
+        index = self._index
+        self._index += 1
 
         observation = self._get_obs(index)
         # update observations object with new observation
@@ -103,13 +226,15 @@ class TradingEnv(gym.Env):
         action, order_size = self._take_action(action, order_size)
         reward = self._reward_function(self._observations)
         terminated = self._get_terminated()
-        truncated = False if self._env_step_indexes else True
-        info = {
-            "states": [observation],
-            "metrics": self._metricsHandler(observation)
-            }
+        truncated = self._index >= self._end_index
+        metrics = self._metricsHandler(observation, index, terminated or truncated)
+        info = {}
+        if self._info_states:
+            info["states"] = [observation]
+        if metrics is not None:
+            info["metrics"] = metrics
 
-        transformed_obs = self._output_transformer.transform(self._observations)
+        transformed_obs = self._transform_obs(index)
 
         return transformed_obs, reward, terminated, truncated, info
 
@@ -120,23 +245,30 @@ class TradingEnv(gym.Env):
         
         size = len(self._data_feeder) - self._max_episode_steps
         self._env_start_index = np.random.randint(0, size) if size > 0 else 0
-        self._env_step_indexes = list(range(self._env_start_index, self._env_start_index + self._max_episode_steps))
+        # index of the next row to step into and the end of the episode
+        self._index = self._env_start_index
+        self._end_index = self._env_start_index + self._max_episode_steps
 
         # Initial observations are the first states of the window size
         self._observations.reset()
         while not self._observations.full:
-            self._observations.append(self._get_obs(self._env_step_indexes.pop(0), balance=self._initial_balance))
+            self._observations.append(self._get_obs(self._index, balance=self._initial_balance))
+            self._index += 1
 
-        info = {
-            "states": self._observations.observations,
-            "metrics": {}
-            }
+        info = {}
+        if self._info_states:
+            info["states"] = self._observations.observations
+        if self._info_metrics:
+            info["metrics"] = {}
         
         # reset metrics with last state
         for metric in self._metrics:
-            metric.reset(self._observations.observations[-1])
+            metric.reset(self._observations[-1])
+        if self._record:
+            self._episode_length = 0
+            self._record_state(self._observations[-1], self._index - 1)
 
-        transformed_obs = self._output_transformer.transform(self._observations)
+        transformed_obs = self._transform_obs(self._index - 1)
 
         # return state and info
         return transformed_obs, info
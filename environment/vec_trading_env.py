@@ -0,0 +1,201 @@
+import typing
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+from .state import OBSERVATION_FEATURES
+from .data_feeder import PdDataFeeder
+from .scalers import Scaler, MinMaxScaler
+from .reward import Reward, RewardBatch, AccountValueChangeReward
+
+
+class VecTradingEnv(VecEnv):
+    """
+    VecTradingEnv steps num_envs TradingEnv episodes at once, implementing the stable-baselines3 VecEnv interface.
+
+    Balance, assets, allocation and the data index of every episode are kept in arrays, _take_action's buy, sell and
+    hold logic is applied with masked vector operations and the (num_envs, window_size, features) observation is
+    built with one gather from the scaled feature array, which is computed once for the whole data feeder. The
+    reward_function is called with the batched reward protocol (a RewardBatch of all episodes, see reward.py). Like
+    the VecEnvs of stable-baselines3, an episode is reset automatically when it ends and its last observation is
+    returned in info['terminal_observation'].
+
+    The episodes share one object, so set_attr and env_method apply to all of them and do not accept a subset of
+    indices, get_attr returns the shared attribute for every index.
+
+    Observations are written into two buffers used in turn, a returned observation stays valid until the second
+    next step or reset.
+
+    With index_observations=True an observation is the index of its newest row followed by its allocation_percentage
+    column (window_size + 1 values) instead of the whole window, see environment/index_observations.py.
+    """
+    render_mode = None
+
+    def __init__(
+            self,
+            data_feeder: PdDataFeeder,
+            num_envs: int = 1,
+            output_transformer: Scaler = None,
+            initial_balance: float = 1000.0,
+            max_episode_steps: int = None,
+            window_size: int = 50,
+            reward_function: Reward = None,
+            seed: int = None,
+            index_observations: bool = False,
+        ) -> None:
+        self._data_feeder = data_feeder
+        self._output_transformer = output_transformer if output_transformer is not None else MinMaxScaler(min=data_feeder.min, max=data_feeder.max)
+        self._initial_balance = initial_balance
+        self._max_episode_steps = max_episode_steps if max_episode_steps is not None else len(data_feeder)
+        self._window_size = window_size
+        self._reward_function = reward_function if reward_function is not None else AccountValueChangeReward()
+
+        assert window_size < self._max_episode_steps <= len(data_feeder), "max_episode_steps must be between window_size and the data length"
+
+        self._close = np.ascontiguousarray(data_feeder.column('close'))
+        self._features = self._output_transformer.transform_array(data_feeder.data)
+        self._window_offsets = np.arange(1 - window_size, 1)
+        self._index_observations = index_observations
+        # the row index is stored in a float32 observation, which is exact up to 2**24
+        assert not index_observations or len(data_feeder) <= 2**24, "index_observations supports up to 2**24 rows"
+        self._rng = np.random.default_rng(seed)
+
+        # index of the newest row of every episode, its last index and the account of the newest state
+        self._index = np.zeros(num_envs, dtype=np.int64)
+        self._end_index = np.zeros(num_envs, dtype=np.int64)
+        self._balance = np.zeros(num_envs, dtype=np.float64)
+        self._assets = np.zeros(num_envs, dtype=np.float64)
+        self._allocation = np.zeros(num_envs, dtype=np.float64)
+        # allocation_percentage of the states in the window, oldest first
+        self._allocations = np.zeros((num_envs, window_size), dtype=np.float32)
+        self._actions = np.zeros(num_envs, dtype=np.int64)
+        # episodes whose window was refilled since the last reward call
+        self._new_episode = np.ones(num_envs, dtype=bool)
+
+        observation_shape = (window_size + 1,) if index_observations else (window_size, len(OBSERVATION_FEATURES))
+        self._buffers = [np.empty((num_envs,) + observation_shape, dtype=np.float32) for _ in range(2)]
+        self._current = 0
+
+        observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=observation_shape, dtype=np.float32)
+        super().__init__(num_envs, observation_space, spaces.Discrete(3))
+
+    def _reset_envs(self, envs: np.ndarray) -> None:
+        """ Start new episodes in envs (indices), the window is filled with states at the initial balance """
+        size = len(self._data_feeder) - self._max_episode_steps
+        start = self._rng.integers(0, size, len(envs)) if size > 0 else np.zeros(len(envs), dtype=np.int64)
+
+        self._index[envs] = start + self._window_size - 1
+        self._end_index[envs] = start + self._max_episode_steps - 1
+        self._balance[envs] = self._initial_balance
+        self._assets[envs] = 0.0
+        self._allocation[envs] = 0.0
+        self._allocations[envs] = 0.0
+        self._new_episode[envs] = True
+
+    def _get_obs(self, envs=slice(None)) -> np.ndarray:
+        observations = self._buffers[self._current]
+        if self._index_observations:
+            observations[envs, 0] = self._index[envs]
+            observations[envs, 1:] = self._allocations[envs]
+            return observations
+
+        indexes = self._index[envs, None] + self._window_offsets
+        observations[envs, :, :-1] = self._features[indexes]
+        observations[envs, :, -1] = self._allocations[envs]
+        return observations
+
+    def _next_buffer(self) -> np.ndarray:
+        self._current = 1 - self._current
+        return self._get_obs()
+
+    @property
+    def features(self) -> np.ndarray:
+        """ Scaled features of all rows (rows x FEATURE_COLUMNS), the rows the index observations refer to """
+        return self._features
+
+    def reset(self) -> np.ndarray:
+        if self._seeds[0] is not None:
+            self._rng = np.random.default_rng(self._seeds[0])
+        self._reset_seeds()
+        self._reset_options()
+
+        self._reset_envs(np.arange(self.num_envs))
+        self.reset_infos = [{} for _ in range(self.num_envs)]
+        return self._next_buffer()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+    def _take_action(self, actions: np.ndarray, order_size: float) -> np.ndarray:
+        last_close = self._close[self._index - 1]
+
+        # modify action to hold (0) if we are out of balance or out of assets
+        actions = np.where((actions == 2) & (self._allocation == 1.0), 0, actions)
+        actions = np.where((actions == 1) & (self._allocation == 0.0), 0, actions)
+        buy = actions == 2
+        sell = actions == 1
+
+        balance, assets = self._balance, self._assets
+        self._assets = np.where(buy, balance * order_size / last_close, np.where(sell, 0.0, assets))
+        self._balance = np.where(buy, balance - (balance * order_size), np.where(sell, assets * order_size * last_close, balance))
+        self._allocation = np.where(buy, order_size, np.where(sell, 0.0, self._allocation))
+
+        return actions
+
+    def step_wait(self) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray, typing.List[dict]]:
+        last_account_value = self._balance + self._assets * self._close[self._index]
+        self._index += 1
+
+        order_size = 1.0
+        self._take_action(self._actions, order_size)
+        account_value = self._balance + self._assets * self._close[self._index]
+        rewards = self._reward_function(RewardBatch(
+            last_account_value=last_account_value,
+            account_value=account_value,
+            close_data=self._close,
+            index=self._index,
+            window_size=self._window_size,
+            new_episode=self._new_episode,
+        ))
+        self._new_episode = np.zeros(self.num_envs, dtype=bool)
+
+        self._allocations[:, :-1] = self._allocations[:, 1:]
+        self._allocations[:, -1] = self._allocation
+
+        dones = self._index == self._end_index
+        observations = self._next_buffer()
+        infos = [{'account_value': value} for value in account_value.tolist()]
+
+        ended = np.flatnonzero(dones)
+        if len(ended):
+            for env in ended:
+                infos[env]['terminal_observation'] = observations[env].copy()
+                infos[env]['TimeLimit.truncated'] = True
+            self._reset_envs(ended)
+            self._get_obs(ended)
+
+        return observations, rewards.astype(np.float32), dones, infos
+
+    def close(self) -> None:
+        return
+
+    def get_attr(self, attr_name: str, indices=None) -> typing.List[typing.Any]:
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def _all_indices(self, indices) -> typing.List[int]:
+        # the attributes and methods belong to the VecTradingEnv, which holds all episodes
+        indices = list(self._get_indices(indices))
+        assert sorted(indices) == list(range(self.num_envs)), "attributes and methods of VecTradingEnv are shared by all episodes, pass indices=None"
+        return indices
+
+    def set_attr(self, attr_name: str, value: typing.Any, indices=None) -> None:
+        self._all_indices(indices)
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> typing.List[typing.Any]:
+        indices = self._all_indices(indices)
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        return [result for _ in indices]
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> typing.List[bool]:
+        return [False for _ in self._get_indices(indices)]
\ No newline at end of file
@@ -0,0 +1,159 @@
+import os
+import typing
+import pandas as pd
+import torch
+from stable_baselines3 import PPO
+
+from .data_feeder import PdDataFeeder
+from .scalers import MinMaxScaler
+from .reward import StandartDeviationReward
+from .vec_trading_env import VecTradingEnv
+from .tournament import evaluate_policy
+from .index_observations import IndexRolloutBuffer, WindowFeaturesExtractor, set_policy_features
+from .worker_pool import map_tasks
+
+def train_fold(
+        data_feeder: PdDataFeeder,
+        fold: int,
+        train_rows: typing.Tuple[int, int],
+        test_rows: typing.Tuple[int, int],
+        path: str,
+        epochs: int = 1,
+        num_envs: int = 4,
+        window_size: int = 50,
+        initial_balance: float = 10000.0,
+        ppo_kwargs: dict = None,
+        seed: int = None,
+    ) -> dict:
+    """
+    Train a PPO agent on the train rows like train.py and evaluate it on the test rows like test.py. The scaler is
+    fitted on the train rows, the model after the last epoch and the scaler are saved to path/fold_<fold> as model
+    and scaler.npz (there is no validation data to select a best_model on). The first observation window of the
+    evaluation ends at the first test row, its other rows are the last train rows, so it covers every test row.
+    """
+    train_feeder = data_feeder.subset(*train_rows)
+    fold_path = os.path.join(path, f'fold_{fold}')
+    scaler = MinMaxScaler().fit(train_feeder)
+    scaler.save(os.path.join(fold_path, 'scaler.npz'))
+
+    env = VecTradingEnv(
+        data_feeder=train_feeder,
+        num_envs=num_envs,
+        output_transformer=scaler,
+        initial_balance=initial_balance,
+        max_episode_steps=len(train_feeder),
+        window_size=window_size,
+        reward_function=StandartDeviationReward(),
+        seed=seed,
+        index_observations=True,
+    )
+    kwargs = dict(
+        n_steps=len(train_feeder),
+        batch_size=64,
+        learning_rate=0.0001,
+        policy_kwargs=dict(
+            activation_fn=torch.nn.ReLU,
+            net_arch=dict(pi=[128, 128], vf=[128, 128]),
+            features_extractor_class=WindowFeaturesExtractor,
+        ),
+        rollout_buffer_class=IndexRolloutBuffer,
+    )
+    kwargs.update(ppo_kwargs or {})
+    model = PPO('MlpPolicy', env, n_epochs=epochs, seed=seed, device='cpu', **kwargs)
+    set_policy_features(model.policy, env.features)
+    model.learn(total_timesteps=epochs * len(train_feeder))
+    model.save(os.path.join(fold_path, 'model'))
+
+    dates = data_feeder.dates
+    test_start, test_end = pd.Timestamp(dates[test_rows[0]]), pd.Timestamp(dates[test_rows[1] - 1])
+    eval_rows = (test_rows[0] - window_size + 1, test_rows[1])
+    result, = evaluate_policy(data_feeder, model, [eval_rows], [(test_end - test_start).days], scaler, initial_balance)
+    return {
+        'fold': fold,
+        'train_start': pd.Timestamp(dates[train_rows[0]]),
+        'train_end': pd.Timestamp(dates[train_rows[1] - 1]),
+        'test_start': test_start,
+        'test_end': test_end,
+        **result.metrics,
+    }
+
+
+class WalkForward:
+    """
+    WalkForward cuts the data feeder into rolling folds of train_size training rows followed by test_size test
+    rows, moved forward by step rows (test_size by default, so the test rows of the folds follow each other). With
+    anchored=True the training rows of every fold start at the first row instead (expanding window).
+
+    The indicators are calculated once for the whole data feeder, every fold trains and tests on views of its
+    arrays (PdDataFeeder.subset). Folds are trained concurrently in a ProcessPoolExecutor, each job with
+    torch_threads threads, so by default cpu_count // torch_threads jobs run at the same time. Pass a
+    shared_memory=True data feeder so the jobs attach to one copy of the arrays. Training runs on the cpu.
+
+    run returns one row per fold with the out-of-sample metrics of MetricSuite and writes it to path/folds.csv,
+    summary aggregates the metrics across the folds.
+    """
+    def __init__(
+            self,
+            data_feeder: PdDataFeeder,
+            train_size: int,
+            test_size: int = 720,
+            step: int = None,
+            anchored: bool = False,
+            epochs: int = 1,
+            num_envs: int = 4,
+            window_size: int = 50,
+            initial_balance: float = 10000.0,
+            ppo_kwargs: dict = None,
+            torch_threads: int = 1,
+            max_workers: int = None,
+            seed: int = None,
+        ) -> None:
+        assert train_size > window_size, "train_size must be greater than window_size"
+        assert test_size > 1, "test_size must be at least 2"
+        self._data_feeder = data_feeder
+        self._train_size = train_size
+        self._test_size = test_size
+        self._step = step if step is not None else test_size
+        self._anchored = anchored
+        self._epochs = epochs
+        self._num_envs = num_envs
+        self._window_size = window_size
+        self._initial_balance = initial_balance
+        self._ppo_kwargs = ppo_kwargs
+        self._torch_threads = torch_threads
+        self._max_workers = max_workers if max_workers is not None else max(1, os.cpu_count() // torch_threads)
+        self._seed = seed
+
+    @property
+    def folds(self) -> typing.List[typing.Tuple[typing.Tuple[int, int], typing.Tuple[int, int]]]:
+        """ (train rows, test rows) of every fold as (start, stop) row ranges """
+        folds = []
+        start = 0
+        while start + self._train_size + self._test_size <= len(self._data_feeder):
+            train_stop = start + self._train_size
+            folds.append(((0 if self._anchored else start, train_stop), (train_stop, train_stop + self._test_size)))
+            start += self._step
+        return folds
+
+    def run(self, path: str = 'runs/walk_forward') -> pd.DataFrame:
+        folds = self.folds
+        assert len(folds) > 0, "the data feeder is shorter than one fold"
+
+        tasks = [
+            (
+                fold, train_rows, test_rows, path, self._epochs, self._num_envs, self._window_size,
+                self._initial_balance, self._ppo_kwargs, None if self._seed is None else self._seed + fold,
+            )
+            for fold, (train_rows, test_rows) in enumerate(folds)
+        ]
+        max_workers = min(self._max_workers, len(tasks))
+        table = pd.DataFrame(map_tasks(train_fold, tasks, self._data_feeder, max_workers, self._torch_threads))
+
+        os.makedirs(path, exist_ok=True)
+        table.to_csv(os.path.join(path, 'folds.csv'), index=False)
+        return table
+
+    def summary(self, table: pd.DataFrame) -> pd.DataFrame:
+        """ Mean, standard deviation, minimum and maximum of every out-of-sample metric across the folds """
+        metrics = table.drop(columns=['fold', 'train_start', 'train_end', 'test_start', 'test_end'])
+        return metrics.agg(['mean', 'std', 'min', 'max']).T
\ No newline at end of file
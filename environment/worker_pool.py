@@ -0,0 +1,46 @@
+import typing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from .data_feeder import PdDataFeeder
+
+# data feeder of a worker process, set once by the pool's initializer
+_data_feeder = None
+
+def _init_worker(data_feeder: PdDataFeeder, torch_threads: int = None) -> None:
+    global _data_feeder
+    if torch_threads is not None:
+        import torch
+        # every worker runs its own policy, more than a few threads each would oversubscribe the cores
+        torch.set_num_threads(torch_threads)
+    _data_feeder = data_feeder
+
+def _call(task: tuple):
+    function, args = task
+    return function(_data_feeder, *args)
+
+def map_tasks(
+        function: typing.Callable,
+        tasks: typing.List[tuple],
+        data_feeder: PdDataFeeder,
+        max_workers: int,
+        torch_threads: int = None,
+        chunksize: int = 1,
+    ) -> list:
+    """
+    Results of function(data_feeder, *task) for every task, computed in a ProcessPoolExecutor. The data feeder is
+    sent to every worker once by the pool's initializer instead of with every task, with a shared_memory=True data
+    feeder the workers attach to one copy of its arrays. function must be a module level function.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(data_feeder, torch_threads)) as executor:
+        return list(executor.map(_call, [(function, task) for task in tasks], chunksize=chunksize))
+
+def rank_table(results: typing.List[dict], rank_by: str, path: str = None) -> pd.DataFrame:
+    """ Table of the result dicts ranked by the rank_by column (descending, ties keep their order), written to path as csv if given """
+    table = pd.DataFrame(results).sort_values(rank_by, ascending=False, kind='stable').reset_index(drop=True)
+    table.insert(0, 'rank', np.arange(1, len(table) + 1))
+    if path is not None:
+        table.to_csv(path, index=False)
+
+    return table
\ No newline at end of file
@@ -1,17 +1,17 @@
-import pandas as pd
 from datetime import datetime
 
 from environment.data_feeder import PdDataFeeder
+from environment.feature_cache import FeatureCache
 from environment.trading_env import TradingEnv
 from environment.render import PygameRender
 from environment.scalers import MinMaxScaler
 from environment.reward import AccountValueChangeReward
-from environment.metrics import DifferentActions, AccountValue, SharpeRatio, MaxDrawdown, AverageWinLossRatio
+from environment.metrics import MetricSuite
 from environment.indicators import RSI, MACD, BollingerBands, ATR, LondonAsiaSession
-from environment.strategies import SupportResistanceDetector
+from environment.strategies import SupportResistanceStrategy
 
 
-df = pd.read_csv('data/fiat/EURUSD5.csv')
+df = FeatureCache().get('data/fiat/EURUSD5.csv', indicators=[RSI, MACD, BollingerBands, ATR, LondonAsiaSession])
 
 start_date = input("Enter the start date (YYYY-MM-DD): ")
 start_date_dt = datetime.strptime(start_date, "%Y-%m-%d")
@@ -26,46 +26,40 @@ print("Total days:", ratio_days)
 print("Start date:", df['date'].iloc[0])
 print("End date:", df['date'].iloc[-1])
 
-pd_data_feeder = PdDataFeeder(df, indicators=[RSI, MACD, BollingerBands, ATR, LondonAsiaSession])
+pd_data_feeder = PdDataFeeder(df, use_arrays=True)
 
-env = TradingEnv(
-    data_feeder = pd_data_feeder,
-    output_transformer = MinMaxScaler(min=pd_data_feeder.min, max=pd_data_feeder.max),
-    initial_balance = 1000.0,
-    max_episode_steps = len(df),
-    window_size = 2,
-    reward_function = AccountValueChangeReward(),
-    metrics = [
-        DifferentActions(),
-        AccountValue(),
-        SharpeRatio(ratio_days=ratio_days),
-        MaxDrawdown(),
-    ]
+window_size = 2
+scaler = MinMaxScaler(min=pd_data_feeder.min, max=pd_data_feeder.max, incremental=True)
+
+# the signals of the whole range in one pass, on the scaled features the detector used to read from the observations
+strategy = SupportResistanceStrategy()
+features = scaler.transform_array(pd_data_feeder.data)
+result = strategy.backtest(
+    pd_data_feeder,
+    features=features,
+    initial_balance=1000.0,
+    window_size=window_size,
+    metric_suite=MetricSuite(ratio_days=ratio_days, initial_account_value=1000.0),
 )
+for metric, value in result.metrics.items():
+    print(metric, value)
 
-pygameRender = PygameRender(frame_rate=120)
+if input("Render the backtest? (y/n) ") == 'y':
+    env = TradingEnv(
+        data_feeder = pd_data_feeder,
+        output_transformer = scaler,
+        initial_balance = 1000.0,
+        max_episode_steps = len(df),
+        window_size = window_size,
+        reward_function = AccountValueChangeReward(),
+    )
 
-state, info = env.reset()
-pygameRender.render(info)
-rewards = 0.0
-detector = SupportResistanceDetector()
+    pygameRender = PygameRender(frame_rate=120)
 
-while True:
-    action = detector.detect(state)
-    if action == 2:
-        detector.reset()
-    
-    state, reward, terminated, truncated, info = env.step(action)
-    rewards += reward
+    state, info = env.reset()
     pygameRender.render(info)
-
-    if terminated or truncated:
-
-        for metric, value in info['metrics'].items():
-            print(metric, value)
-        hours = 0
-        state, info = env.reset()
-        rewards = 0.0
-        pygameRender.reset()
+    for action in result.actions.tolist():
+        state, reward, terminated, truncated, info = env.step(action)
         pygameRender.render(info)
-        break
\ No newline at end of file
+
+    pygameRender.reset()
\ No newline at end of file
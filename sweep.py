@@ -0,0 +1,37 @@
+import json
+import argparse
+import pandas as pd
+
+from environment.data_feeder import PdDataFeeder
+from environment.feature_cache import FeatureCache
+from environment.indicators import RSI, MACD, BollingerBands, ATR, LondonAsiaSession
+from environment.sweep import Sweep
+
+pd.options.mode.copy_on_write = True
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Backtest the London breakout strategy for a parameter grid on several date ranges")
+    parser.add_argument('--data', default='data/fiat/EURUSD5.csv', help="OHLC csv file")
+    parser.add_argument('--grid', default='{"asia_hours": [[20, 2], [21, 2], [22, 2]], "london_hours": [[2, 5], [2, 4], [3, 5]]}',
+                        help="JSON object of SupportResistanceStrategy parameter name to list of values")
+    parser.add_argument('--ranges', nargs='+', required=True, help="date ranges as YYYY-MM-DD:YYYY-MM-DD")
+    parser.add_argument('--workers', type=int, default=None, help="number of worker processes, all cores by default")
+    parser.add_argument('--output', default='sweep_results.csv', help="csv file of the ranked results")
+    parser.add_argument('--rank-by', default='sharpe_ratio', help="metric the results are ranked by")
+    args = parser.parse_args()
+
+    df = FeatureCache().get(args.data, indicators=[RSI, MACD, BollingerBands, ATR, LondonAsiaSession])
+    pd_data_feeder = PdDataFeeder(df, use_arrays=True, shared_memory=True)
+
+    sweep = Sweep(
+        data_feeder=pd_data_feeder,
+        grid=json.loads(args.grid),
+        date_ranges=[date_range.split(':') for date_range in args.ranges],
+        max_workers=args.workers,
+        rank_by=args.rank_by,
+    )
+    table = sweep.run(args.output)
+    print(table.head(20).to_string(index=False))
+    print(f"{len(table)} backtests written to {args.output}")
+
+    pd_data_feeder.close()
\ No newline at end of file
@@ -5,17 +5,19 @@ from stable_baselines3.common.vec_env import DummyVecEnv
 
 from environment.trading_env import TradingEnv
 from environment.data_feeder import PdDataFeeder
+from environment.feature_cache import FeatureCache
 from environment.render import PygameRender
 from environment.indicators import RSI, MACD, BollingerBands, ATR
-from environment.scalers import MinMaxScaler
+from environment.scalers import Scaler
 from environment.reward import AccountValueChangeReward, StandartDeviationReward
+from environment.index_observations import set_policy_features
 from environment.metrics import DifferentActions, AccountValue, SharpeRatio, AccountValueChange, MaxDrawdown, AverageWinLossRatio, WinCount, LossCount
 from agent.helper import changement_calculator
 
 pd.options.mode.copy_on_write = True
 
 data_source = input("Parity name : (ex: BTCUSDT_4h)")
-df_test = pd.read_csv(f'data/crypto/{data_source}.csv')
+df_test = FeatureCache().get(f'data/crypto/{data_source}.csv', indicators=[RSI, MACD, BollingerBands, ATR])
 
 agent_number = input('Enter the agent number: ')
 start_date = input("Enter the start date (YYYY-MM-DD): ")
@@ -39,11 +41,18 @@ print("End date price (close)", df['close'].iloc[-1])
 changement_per = changement_calculator(df['close'].iloc[0], df['close'].iloc[-1])
 print("Percentage changement: ", changement_per )
 
-pd_data_feeder_test = PdDataFeeder(df, indicators=[RSI, MACD, BollingerBands, ATR])
+pd_data_feeder_test = PdDataFeeder(df, use_arrays=True)
+
+# reuse the scaling statistics of the training data, older runs were trained with the test data's price range
+scaler = Scaler.load_run(f"runs/{agent_number}", pd_data_feeder_test, incremental=True)
+
+model = PPO.load(f"runs/{agent_number}/best_model")
+# agents trained on index observations gather the windows from the features of the env
+index_observations = len(model.observation_space.shape) == 1
 
 env = TradingEnv(
     data_feeder=pd_data_feeder_test,
-    output_transformer=MinMaxScaler(min=pd_data_feeder_test.min, max=pd_data_feeder_test.max),
+    output_transformer=scaler,
     initial_balance=10000.0,
     max_episode_steps=len(df),
     window_size=50,
@@ -57,13 +66,15 @@ env = TradingEnv(
         AverageWinLossRatio(),
         WinCount(),
         LossCount()
-    ]
+    ],
+    index_observations=index_observations,
 )
+if index_observations:
+    set_policy_features(model.policy, env.features)
 
 vec_env = DummyVecEnv([lambda: env])
 pygameRender = PygameRender(frame_rate=120)
 
-model = PPO.load(f"runs/{agent_number}/best_model")
 actor_params = sum(p.numel() for p in model.policy.mlp_extractor.policy_net.parameters())
 print(f"Number of parameters in the actor network: {actor_params}")
 
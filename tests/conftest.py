@@ -0,0 +1,9 @@
+import pytest
+from benchmarks import make_ohlc
+from environment.data_feeder import PdDataFeeder
+from environment.indicators import RSI, MACD, BollingerBands, ATR
+
+@pytest.fixture(scope='session')
+def feeder():
+    """ Array-backed data feeder of 2000 random walk 4 hour bars with the indicators of train.py """
+    return PdDataFeeder(make_ohlc(2000, freq='4h'), indicators=[RSI, MACD, BollingerBands, ATR], use_arrays=True)
\ No newline at end of file
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from environment.scalers import MinMaxScaler
+from environment.trading_env import TradingEnv
+from environment.backtest import backtest
+from environment.metrics import DifferentActions, AccountValue, AccountValueChange, MaxDrawdown, SharpeRatio, AverageWinLossRatio, WinCount, LossCount
+
+def step_env(feeder, actions, seed=0):
+    """ TradingEnv stepped with every action, returns the start row, the states and the metrics """
+    env = TradingEnv(
+        data_feeder=feeder,
+        output_transformer=MinMaxScaler(min=feeder.min, max=feeder.max, incremental=True),
+        initial_balance=10000.0,
+        max_episode_steps=len(actions) + 50,
+        metrics=[DifferentActions(), AccountValue(), AccountValueChange(), MaxDrawdown(), SharpeRatio(), AverageWinLossRatio(), WinCount(), LossCount()],
+        metrics_schedule='episode',
+    )
+    np.random.seed(seed)
+    env.reset()
+    start_index = env._index - 1
+    states, executed = [env._observations[-1]], []
+    for action in actions.tolist():
+        _, _, _, _, info = env.step(action)
+        states.append(env._observations[-1])
+        executed.append(states[-1].allocation_percentage != states[-2].allocation_percentage)
+    return start_index, states, np.array(executed), info['metrics']
+
+ACTIONS = {
+    'random': np.random.default_rng(0).integers(0, 3, 1000),
+    # sells without assets at the start, buys at full allocation and sells at zero allocation are forced holds
+    'forced holds': np.array([1, 1, 0, 2, 2, 0, 2, 1, 1, 0, 1, 2, 2, 2, 1, 2, 0, 0, 1, 1] * 30),
+    'only holds': np.zeros(300, dtype=np.int64),
+    'only buys': np.full(300, 2),
+}
+
+@pytest.mark.parametrize('name', ACTIONS)
+def test_backtest_matches_trading_env(feeder, name):
+    actions = ACTIONS[name]
+    start_index, states, executed, metrics = step_env(feeder, actions)
+    result = backtest(feeder.column('close'), actions, 10000.0, start_index, dates=feeder.dates)
+
+    assert len(result) == len(states) == len(actions) + 1
+    np.testing.assert_array_equal(result.balance, [state.balance for state in states])
+    np.testing.assert_array_equal(result.assets, [state.assets for state in states])
+    np.testing.assert_array_equal(result.allocation, [state.allocation_percentage for state in states])
+    np.testing.assert_array_equal(result.account_value, [state.account_value for state in states])
+    # executed trades are the actions that changed the allocation, the rest are holds
+    np.testing.assert_array_equal(result.actions != 0, executed)
+    np.testing.assert_array_equal(result.actions[executed], actions[executed])
+    assert result.metrics == pytest.approx(metrics, rel=1e-9, abs=1e-12)
+
+def test_backtest_without_dates(feeder):
+    result = backtest(feeder.column('close'), ACTIONS['forced holds'], 10000.0, 100)
+    assert result.metrics is None
+    with pytest.raises(AssertionError):
+        backtest(feeder.column('close'), np.full(len(feeder), 2), 10000.0, 100)
\ No newline at end of file
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from benchmarks import make_ohlc
+from environment.data_feeder import PdDataFeeder
+from environment.indicators import RSI, MACD, BollingerBands, ATR, LondonAsiaSession
+
+FIELDS = (
+    'date', 'open', 'high', 'low', 'close', 'volume', 'rsi', 'macd', 'signal', 'ma', 'bb_upper', 'bb_lower',
+    'atr', 'short_ema', 'long_ema', 'session',
+)
+
+@pytest.mark.parametrize('indicators, drop_volume', [
+    ([RSI, MACD, BollingerBands, ATR], False),
+    ([RSI, MACD, BollingerBands, ATR, LondonAsiaSession], False),
+    ([RSI, MACD, BollingerBands, ATR], True),
+])
+def test_array_states_match_iloc(indicators, drop_volume):
+    df = make_ohlc(1500, freq='15min')
+    if drop_volume:
+        df = df.drop(columns='volume')
+    iloc_feeder = PdDataFeeder(df.copy(), indicators=indicators)
+    array_feeder = PdDataFeeder(df.copy(), indicators=indicators, use_arrays=True)
+    assert len(iloc_feeder) == len(array_feeder)
+
+    for index in [0, 1, len(iloc_feeder) // 2, len(iloc_feeder) - 1, -1]:
+        a, b = iloc_feeder[index], array_feeder[index]
+        for field in FIELDS:
+            assert getattr(a, field) == getattr(b, field), (index, field)
+
+def test_slice_subset_and_date_rows(feeder):
+    dates, data = feeder.slice(100, 150)
+    assert np.shares_memory(data, feeder.data)
+    assert dates[0] == feeder.dates[100] and len(data) == 50
+
+    subset = feeder.subset(100, 150)
+    assert len(subset) == 50
+    assert subset[0].close == feeder[100].close and subset[-1].date == feeder[149].date
+    assert subset.min == data[:, feeder.columns.index('low')].min()
+    assert subset.max == data[:, feeder.columns.index('high')].max()
+
+    assert feeder.date_rows(feeder.dates[100], feeder.dates[149]) == (100, 150)
\ No newline at end of file
@@ -0,0 +1,47 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks import make_ohlc
+from environment.data_feeder import PdDataFeeder
+from environment.feature_cache import FeatureCache
+from environment.indicators import RSI, MACD, BollingerBands, ATR
+
+INDICATORS = [RSI, MACD, BollingerBands, ATR]
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'data.csv'
+    make_ohlc(1000, freq='1h').to_csv(path, index=False)
+    return str(path)
+
+def test_matches_data_feeder(tmp_path, csv_path):
+    cache = FeatureCache(str(tmp_path / 'cache'))
+    df = cache.get(csv_path, indicators=INDICATORS)
+    expected = PdDataFeeder(pd.read_csv(csv_path), indicators=INDICATORS)._df.reset_index(drop=True)
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+    # the second call is a hit on the same entry
+    pd.testing.assert_frame_equal(cache.get(csv_path, indicators=INDICATORS), df)
+    assert len(cache.entries()) == 1
+
+def test_parameters_are_applied(tmp_path, csv_path):
+    cache = FeatureCache(str(tmp_path / 'cache'))
+    default = cache.get(csv_path, indicators=INDICATORS)
+    window = cache.get(csv_path, indicators=INDICATORS, window=20)
+    assert cache.key(csv_path, INDICATORS) != cache.key(csv_path, INDICATORS, window=20)
+    assert len(cache.entries()) == 2
+
+    df = pd.read_csv(csv_path)
+    df['date'] = pd.to_datetime(df['date'])
+    expected = RSI(df.copy(), window=20).calculate().dropna()
+    rsi = window.set_index('date')['rsi']
+    np.testing.assert_allclose(rsi, expected.set_index('date')['rsi'].loc[rsi.index])
+    assert not np.allclose(rsi, default.set_index('date')['rsi'].loc[rsi.index])
+    # parameters of one indicator leave the others untouched
+    np.testing.assert_allclose(window.set_index('date')['macd'], default.set_index('date')['macd'].loc[rsi.index])
+
+def test_unknown_parameters_are_rejected(tmp_path, csv_path):
+    cache = FeatureCache(str(tmp_path / 'cache'))
+    with pytest.raises(AssertionError):
+        cache.get(csv_path, indicators=[RSI, MACD], num_std=3)
+    assert not os.path.exists(tmp_path / 'cache') or cache.entries() == []
\ No newline at end of file
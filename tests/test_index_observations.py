@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+import torch as th
+from stable_baselines3 import PPO
+from environment.scalers import MinMaxScaler
+from environment.reward import StandartDeviationReward
+from environment.trading_env import TradingEnv
+from environment.vec_trading_env import VecTradingEnv
+from environment.index_observations import IndexRolloutBuffer, WindowFeaturesExtractor, set_policy_features
+
+def make_env(feeder, index_observations, num_envs=2, max_episode_steps=280, window_size=50):
+    return VecTradingEnv(
+        feeder,
+        num_envs=num_envs,
+        output_transformer=MinMaxScaler().fit(feeder),
+        initial_balance=10000.0,
+        max_episode_steps=max_episode_steps,
+        window_size=window_size,
+        reward_function=StandartDeviationReward(),
+        seed=1,
+        index_observations=index_observations,
+    )
+
+@pytest.mark.parametrize('n_steps, max_episode_steps', [(200, 280), (64, 60), (300, 90)])
+def test_rebuilt_observations_across_rollouts(feeder, n_steps, max_episode_steps):
+    # rollouts shorter and longer than the episodes, every rollout after the first starts in the middle of one
+    window_env, index_env = make_env(feeder, False, max_episode_steps=max_episode_steps), make_env(feeder, True, max_episode_steps=max_episode_steps)
+    buffer = IndexRolloutBuffer(n_steps, index_env.observation_space, index_env.action_space, n_envs=index_env.num_envs)
+    extractor = WindowFeaturesExtractor(index_env.observation_space)
+    extractor.set_features(index_env.features)
+
+    rng = np.random.default_rng(0)
+    window_obs, index_obs = window_env.reset(), index_env.reset()
+    episode_starts = np.ones(index_env.num_envs, dtype=bool)
+    zeros = th.zeros(index_env.num_envs)
+    for rollout in range(6):
+        # the steps of collect_rollouts
+        buffer.reset()
+        windows = []
+        for step in range(n_steps):
+            actions = rng.integers(0, 3, index_env.num_envs)
+            buffer.add(index_obs, actions, np.zeros(index_env.num_envs), episode_starts, zeros, zeros)
+            windows.append(window_obs.copy())
+            window_obs, _, _, _ = window_env.step(actions)
+            index_obs, _, episode_starts, _ = index_env.step(actions)
+        buffer.compute_returns_and_advantage(zeros, episode_starts)
+        next(buffer.get(batch_size=1))
+
+        envs, steps = np.divmod(np.arange(n_steps * index_env.num_envs), n_steps)
+        rebuilt = extractor(th.as_tensor(buffer.observations_of(steps, envs))).numpy()
+        expected = np.stack(windows)[steps, envs].reshape(len(steps), -1)
+        assert np.array_equal(rebuilt, expected), f"rollout {rollout}: {np.any(rebuilt != expected, axis=1).sum()} observations differ"
+
+def test_ppo_index_rollout_buffer_matches_window_observations(feeder):
+    def learn(index_observations):
+        env = make_env(feeder, index_observations)
+        kwargs = dict(n_steps=200, batch_size=50, n_epochs=2, seed=0, device='cpu')
+        if index_observations:
+            kwargs.update(policy_kwargs=dict(features_extractor_class=WindowFeaturesExtractor), rollout_buffer_class=IndexRolloutBuffer)
+        model = PPO('MlpPolicy', env, **kwargs)
+        if index_observations:
+            set_policy_features(model.policy, env.features)
+        # 6 rollouts of 200 steps over episodes of 230 steps
+        model.learn(1200)
+        return model
+
+    # created and trained one after the other, both models draw the same random numbers
+    window_model = learn(False)
+    index_model = learn(True)
+    for window_parameter, index_parameter in zip(window_model.policy.parameters(), index_model.policy.parameters()):
+        assert th.equal(window_parameter, index_parameter)
+
+def test_trading_env_shares_features(feeder):
+    scaler = MinMaxScaler().fit(feeder)
+    features = scaler.transform_array(feeder.data)
+    index_envs = [TradingEnv(feeder, scaler, max_episode_steps=300, info=(), index_observations=True, features=features) for _ in range(2)]
+    window_env = TradingEnv(feeder, scaler, max_episode_steps=300, info=(), precompute_observations=True, features=features)
+    extractor = WindowFeaturesExtractor(index_envs[0].observation_space)
+    extractor.set_features(features)
+    assert all(env.features is features for env in index_envs)
+    assert np.shares_memory(window_env._windows, features) and np.shares_memory(extractor._features.numpy(), features)
+
+    np.random.seed(0)
+    index_obs, _ = index_envs[0].reset()
+    np.random.seed(0)
+    window_obs, _ = window_env.reset()
+    for action in np.random.default_rng(0).integers(0, 3, 100):
+        assert th.equal(extractor(th.as_tensor(index_obs[None])), th.as_tensor(window_obs).flatten()[None])
+        index_obs, *_ = index_envs[0].step(action)
+        window_obs, *_ = window_env.step(action)
\ No newline at end of file
@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+from benchmarks import make_ohlc
+from environment.data_feeder import PdDataFeeder
+from environment.indicators import RSI, MACD, BollingerBands, ATR, LondonAsiaSession
+from environment.indicator_engine import IndicatorEngine, rolling_mean_grid, rsi_sweep, bollinger_sweep, macd_sweep
+
+INDICATORS = [RSI, MACD, BollingerBands, ATR]
+
+def make_bars(rows=3000):
+    """ Random walk bars with a flat stretch, where the std and the average gain and loss are zero """
+    df = make_ohlc(rows, freq='15min')
+    df.loc[1000:1100, ['open', 'high', 'low', 'close']] = df.loc[999, 'close']
+    return df
+
+def flat_windows(close, window):
+    changes = np.r_[0, np.cumsum(np.diff(close) != 0)]
+    flat = np.zeros(len(close), dtype=bool)
+    flat[window - 1:] = changes[window - 1:] == changes[:len(close) - window + 1]
+    return flat
+
+def exact_flat_bands(df, window=20):
+    """ Bands of zero width in flat windows, the std of pandas leaves a residue of up to ~1e-6 in some of them """
+    flat = flat_windows(df['close'].to_numpy(), window)
+    df.loc[flat, 'bb_upper'] = df.loc[flat, 'bb_lower'] = df.loc[flat, 'close']
+    return df
+
+def bands(df, window=20, num_std=2):
+    return exact_flat_bands(BollingerBands(df, window=window, num_std=num_std).calculate(), window)
+
+def calculate(df, indicators, **kwargs):
+    for indicator_cls in indicators:
+        parameters = {name: value for name, value in kwargs.items() if name in IndicatorEngine._params(indicator_cls)}
+        df = bands(df, **parameters) if indicator_cls is BollingerBands else indicator_cls(df, **parameters).calculate()
+    return df
+
+def assert_close(actual, expected, column, atol=1e-8):
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected), err_msg=column)
+    np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=atol, err_msg=column)
+
+# the grids take the std of every window from running sums of squares over a whole row chunk, narrow windows
+# lose up to ~1e-7 to the cancellation
+GRID_STD_ATOL = 1e-6
+
+@pytest.mark.parametrize('chunk_size', [8192, 1000, 7, 1])
+@pytest.mark.parametrize('kwargs', [{}, {'window': 5, 'short_window': 3, 'long_window': 30, 'signal_window': 1}])
+def test_engine_matches_indicators(chunk_size, kwargs):
+    df = make_bars()
+    engine = IndicatorEngine(INDICATORS, chunk_size=chunk_size, **kwargs)
+    block = engine.compute(df['close'].to_numpy(), df['high'].to_numpy(), df['low'].to_numpy())
+    # the indicator classes only take the parameters in their signature
+    expected = calculate(df.copy(), INDICATORS, **kwargs)
+    for i, column in enumerate(engine.columns):
+        assert_close(block[:, i], expected[column].to_numpy(), column)
+
+@pytest.mark.parametrize('indicators', [INDICATORS, [MACD, ATR], INDICATORS + [LondonAsiaSession]])
+def test_fused_data_feeder(indicators):
+    df = make_bars()
+    fused = PdDataFeeder(df.copy(), indicators=indicators, fused_indicators=True)._df
+    expected = PdDataFeeder(df.copy(), indicators=indicators)._df
+    if BollingerBands in indicators:
+        expected = exact_flat_bands(expected)
+    assert list(fused.columns) == list(expected.columns)
+    assert fused.index.equals(expected.index)
+    for column in fused.columns:
+        if column == 'date' or column == 'session':
+            assert np.array_equal(fused[column].to_numpy(), expected[column].to_numpy())
+        else:
+            assert_close(fused[column].to_numpy(dtype=np.float64), expected[column].to_numpy(dtype=np.float64), column)
+
+@pytest.mark.parametrize('param_chunk', [32, 3, 1])
+def test_rsi_sweep(param_chunk):
+    df = make_bars()
+    windows = [2, 5, 14, 30, 31, 100, 7]
+    out = rsi_sweep(df['close'].to_numpy(), windows, param_chunk=param_chunk)
+    for j, window in enumerate(windows):
+        assert_close(out[:, j], RSI(df.copy(), window=window).calculate()['rsi'].to_numpy(), f'rsi {window}')
+
+@pytest.mark.parametrize('param_chunk', [32, 2])
+def test_bollinger_sweep(param_chunk):
+    df = make_bars()
+    params = [(20, 2), (5, 1.5), (50, 3), (20, 1), (2, 2)]
+    out = bollinger_sweep(df['close'].to_numpy(), params, param_chunk=param_chunk)
+    for j, (window, num_std) in enumerate(params):
+        expected = bands(df.copy(), window=window, num_std=num_std)
+        assert_close(out['ma'][:, j], expected['ma'].to_numpy(), 'ma')
+        for column in ('bb_upper', 'bb_lower'):
+            assert_close(out[column][:, j], expected[column].to_numpy(), column, atol=GRID_STD_ATOL)
+
+@pytest.mark.parametrize('param_chunk', [32, 2])
+def test_macd_sweep(param_chunk):
+    df = make_bars()
+    # shared short and long spans within and across parameter chunks
+    params = [(12, 26, 9), (12, 50, 9), (5, 26, 3), (1, 26, 1), (26, 12, 9)]
+    out = macd_sweep(df['close'].to_numpy(), params, param_chunk=param_chunk)
+    for j, (short_window, long_window, signal_window) in enumerate(params):
+        expected = MACD(df.copy(), short_window, long_window, signal_window).calculate()
+        for column in ('short_ema', 'long_ema', 'macd', 'signal'):
+            assert_close(out[column][:, j], expected[column].to_numpy(), column)
+
+@pytest.mark.parametrize('chunk_size', [8192, 100, 3])
+def test_rolling_mean_grid_row_chunks(chunk_size):
+    close = make_bars()['close']
+    windows = np.array([1, 2, 20, 150])
+    mean, std = np.empty((len(close), len(windows))), np.empty((len(close), len(windows)))
+    rolling_mean_grid(close.to_numpy(), windows, mean, std_out=std, chunk_size=chunk_size)
+    for j, window in enumerate(windows):
+        assert_close(mean[:, j], close.rolling(window).mean().to_numpy(), f'mean {window}')
+        expected = close.rolling(window).std().to_numpy(copy=True)
+        expected[flat_windows(close.to_numpy(), window) & (window > 1)] = 0.0
+        assert_close(std[:, j], expected, f'std {window}', atol=GRID_STD_ATOL)
\ No newline at end of file
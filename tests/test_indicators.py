@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks import make_ohlc
+from environment.indicators import LondonAsiaSession, SessionIndicator
+
+def session_loop(data):
+    """ Row by row LondonAsiaSession implementation the vectorized one replaced """
+    data['session'] = 0
+    for index, row in data.iterrows():
+        if not row['date'].dayofweek >= 5:
+            if 2 <= row['date'].hour < 5:
+                data.at[index, 'session'] = 2 # London open session
+            elif 20 <= row['date'].hour < 24 or 0 <= row['date'].hour < 2:
+                data.at[index, 'session'] = 1 # Asia session
+    return data
+
+@pytest.mark.parametrize('freq', ['5min', '1h', '4h'])
+def test_london_asia_session_matches_loop(freq):
+    # three weeks of bars, every hour and weekday is covered
+    df = make_ohlc({'5min': 6048, '1h': 504, '4h': 126}[freq], freq=freq, start='2021-03-01 00:00')
+    expected = session_loop(df.copy())['session'].to_numpy()
+    assert np.array_equal(LondonAsiaSession(df.copy()).calculate()['session'].to_numpy(), expected)
+
+def test_session_indicator_windows():
+    dates = pd.date_range('2021-03-01', periods=7 * 24 * 4, freq='15min')
+    sessions = ((3, 7.5, 9), (4, 8, 10), (5, 22, 1))
+    labels = SessionIndicator(pd.DataFrame({'date': dates}), sessions=sessions).calculate()['session'].to_numpy()
+
+    hours = dates.hour + dates.minute / 60
+    expected = np.where((hours >= 7.5) & (hours < 9), 3, np.where((hours >= 8) & (hours < 10), 4, np.where((hours >= 22) | (hours < 1), 5, 0)))
+    expected[dates.dayofweek >= 5] = 0
+    assert np.array_equal(labels, expected)
+
+def test_session_indicator_timezone():
+    dates = pd.date_range('2021-03-01', periods=7 * 24, freq='1h')
+    labels = LondonAsiaSession(pd.DataFrame({'date': dates}), tz='Europe/Istanbul').calculate()['session'].to_numpy()
+    # Istanbul is UTC+3, so the labels are the UTC labels of the dates 3 hours later
+    shifted = session_loop(pd.DataFrame({'date': dates + pd.Timedelta(hours=3)}))['session'].to_numpy()
+    assert np.array_equal(labels, shifted)
\ No newline at end of file
@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+import pytest
+from environment.state import State
+from environment.metrics import (
+    DifferentActions, AccountValue, AccountValueChange, MaxDrawdown, SharpeRatio, SortinoRatio, CalmarRatio,
+    AverageWinLossRatio, WinCount, LossCount, MetricSuite,
+)
+
+class ListSharpeRatio:
+    """ SharpeRatio before it was made constant memory, it keeps every daily return """
+    def __init__(self, ratio_days=365.25):
+        self.ratio_days = ratio_days
+
+    def update(self, state):
+        time_difference_days = (state.date - self.prev_state.date).days
+        if time_difference_days >= 1:
+            self.daily_returns.append((state.account_value - self.prev_state.account_value) / self.prev_state.account_value)
+            self.prev_state = state
+
+    @property
+    def result(self):
+        if len(self.daily_returns) == 0:
+            return 0.0
+
+        mean = np.mean(self.daily_returns)
+        std = np.std(self.daily_returns)
+        if std == 0:
+            return 0.0
+
+        return mean / std * np.sqrt(self.ratio_days)
+
+    def reset(self, prev_state=None):
+        self.prev_state = prev_state
+        self.daily_returns = []
+
+def make_states(dates, account_values, allocations=None):
+    allocations = np.zeros(len(account_values)) if allocations is None else allocations
+    states = []
+    for date, account_value, allocation in zip(pd.DatetimeIndex(dates), account_values, allocations):
+        state = State(date=date, open=1.0, high=1.0, low=1.0, close=1.0)
+        state.balance = account_value
+        state.allocation_percentage = allocation
+        states.append(state)
+    return states
+
+def daily_returns_of(dates, account_values):
+    """ Returns between the first state and every first state at least a day after the previous anchor """
+    anchors = [0]
+    for i, date in enumerate(dates):
+        if date - dates[anchors[-1]] >= pd.Timedelta(days=1):
+            anchors.append(i)
+    anchor_values = account_values[anchors]
+    return anchor_values[1:] / anchor_values[:-1] - 1.0
+
+def random_episode(freq, steps, start='2021-03-01 07:35', gaps=False, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=steps, freq=freq)
+    if gaps:
+        # drop random rows, e.g. weekends and missing bars
+        dates = dates[np.sort(rng.choice(steps, steps // 2, replace=False))]
+    account_values = 10000.0 * np.cumprod(1.0 + rng.normal(0.0, 0.002, len(dates)))
+    return dates, account_values
+
+@pytest.mark.parametrize('freq, steps, gaps', [('5min', 5000, False), ('4h', 1000, False), ('1h', 3000, True)])
+def test_sharpe_ratio_matches_list_implementation(freq, steps, gaps):
+    states = make_states(*random_episode(freq, steps, gaps=gaps))
+    metric, reference = SharpeRatio(ratio_days=180), ListSharpeRatio(ratio_days=180)
+    metric.reset(states[0])
+    reference.reset(states[0])
+    for state in states[1:]:
+        metric.update(state)
+        reference.update(state)
+        assert metric.result == pytest.approx(reference.result, rel=1e-9, abs=1e-12)
+    assert metric.count == len(reference.daily_returns) > 0
+
+def test_sharpe_ratio_without_returns():
+    states = make_states(*random_episode('1h', 24))
+    metric = SharpeRatio()
+    metric.reset(states[0])
+    for state in states[1:]:
+        metric.update(state)
+        assert metric.result == 0.0
+
+    flat = make_states(pd.date_range('2021-03-01', periods=100, freq='4h'), np.full(100, 10000.0))
+    metric.reset(flat[0])
+    for state in flat[1:]:
+        metric.update(state)
+    assert metric.count > 0 and metric.result == 0.0
+
+METRIC_CLASSES = [
+    DifferentActions, AccountValue, AccountValueChange, MaxDrawdown, SharpeRatio, SortinoRatio, CalmarRatio,
+    AverageWinLossRatio, WinCount, LossCount,
+]
+
+@pytest.mark.parametrize('metric_class', METRIC_CLASSES)
+@pytest.mark.parametrize('chunk_size', [1, 7, 100, 1000])
+def test_extend_matches_update(metric_class, chunk_size):
+    dates, account_values = random_episode('4h', 1000, gaps=True)
+    allocations = (np.random.default_rng(1).random(len(dates)) < 0.3).astype(np.float64)
+    states = make_states(dates, account_values, allocations)
+
+    updated = metric_class()
+    updated.reset(states[0])
+    for state in states[1:]:
+        updated.update(state)
+
+    # chunks overlap by one state, like the chunks TradingEnv records
+    extended = metric_class()
+    extended.reset(states[0])
+    dates = dates.to_numpy()
+    for start in range(0, len(states) - 1, chunk_size):
+        stop = min(start + chunk_size + 1, len(states))
+        extended.extend(dates[start:stop], account_values[start:stop], allocations[start:stop])
+    assert extended.result == pytest.approx(updated.result, rel=1e-12, abs=1e-15)
+
+def test_sortino_and_calmar_ratio():
+    dates, account_values = random_episode('4h', 1000)
+    daily_returns = daily_returns_of(dates, account_values)
+    max_drawdown = np.min(account_values / np.maximum.accumulate(account_values) - 1.0)
+
+    results = {}
+    for metric in (SortinoRatio(ratio_days=365), CalmarRatio(ratio_days=365)):
+        states = make_states(dates, account_values)
+        metric.reset(states[0])
+        for state in states[1:]:
+            metric.update(state)
+        results[metric.name] = metric.result
+
+    downside_deviation = np.sqrt(np.mean(np.minimum(daily_returns, 0.0) ** 2))
+    assert results['sortino_ratio'] == pytest.approx(np.mean(daily_returns) / downside_deviation * np.sqrt(365), rel=1e-9)
+    assert results['calmar_ratio'] == pytest.approx(np.mean(daily_returns) * 365 / abs(max_drawdown), rel=1e-9)
+
+def test_metric_suite_sharpe_ratio():
+    dates, account_values = random_episode('1h', 3000, gaps=True)
+    metric = SharpeRatio(ratio_days=120)
+    states = make_states(dates, account_values)
+    metric.reset(states[0])
+    for state in states[1:]:
+        metric.update(state)
+    results = MetricSuite(ratio_days=120).compute(dates.to_numpy(), account_values, np.zeros(len(dates)))
+    assert results['sharpe_ratio'] == pytest.approx(metric.result, rel=1e-9)
+
+SUITE_METRICS = [DifferentActions, AccountValue, AccountValueChange, MaxDrawdown, SharpeRatio, AverageWinLossRatio, WinCount, LossCount]
+
+def updated_results(dates, account_values, allocations, ratio_days=365.25):
+    metrics = [metric_class(ratio_days=ratio_days) if metric_class is SharpeRatio else metric_class() for metric_class in SUITE_METRICS]
+    states = make_states(dates, account_values, allocations)
+    for metric in metrics:
+        metric.reset(states[0])
+    for state in states[1:]:
+        for metric in metrics:
+            metric.update(state)
+    return {metric.name: metric.result for metric in metrics}
+
+def test_metric_suite_matches_metrics():
+    rng = np.random.default_rng(2)
+    episodes, steps = 6, 800
+    dates = np.broadcast_to(pd.date_range('2021-03-01', periods=steps, freq='2h').to_numpy(), (episodes, steps))
+    allocations = (rng.random((episodes, steps)) < 0.4).astype(np.float64)
+    account_values = 10000.0 * np.cumprod(1.0 + rng.normal(0.0, 0.003, (episodes, steps)) * allocations, axis=1)
+    # a full episode, one without a daily return and a single state one among them
+    lengths = np.array([steps, 1, 5, 13, 400, 799])
+
+    results = MetricSuite(ratio_days=200).compute(dates, account_values, allocations, lengths=lengths)
+    for episode, length in enumerate(lengths):
+        expected = updated_results(dates[episode, :length], account_values[episode, :length], allocations[episode, :length], ratio_days=200)
+        assert set(results) == set(expected)
+        for name, value in expected.items():
+            assert results[name][episode] == pytest.approx(value, rel=1e-9, abs=1e-12), (episode, name)
+
+    # one episode without a batch dimension gives scalars
+    single = MetricSuite(ratio_days=200).compute(dates[4, :400], account_values[4, :400], allocations[4, :400])
+    assert single == pytest.approx({name: results[name][4] for name in results}, rel=1e-12)
\ No newline at end of file
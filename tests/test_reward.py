@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+from environment.state import State, Observations
+from environment.reward import RewardBatch, StandartDeviationReward
+
+class WindowStandartDeviationReward:
+    """ StandartDeviationReward before it was made incremental, it rebuilds the close differences of the window """
+    def __init__(self, sigma_tgt=0.2, bp=0.0001, mu=1) -> None:
+        self.sigma_tgt = sigma_tgt
+        self.bp = bp
+        self.mu = mu
+        self.sigma_estimate = []
+
+    def _calculate_sigma(self, rt):
+        if len(self.sigma_estimate) == 0:
+            sigma_t_minus_1 = np.std(rt)
+        else:
+            sigma_t_minus_1 = np.sqrt(0.9 * self.sigma_estimate[-1]**2 + 0.1 * np.std(rt)**2)
+        self.sigma_estimate.append(sigma_t_minus_1)
+        return sigma_t_minus_1
+
+    def __call__(self, observations: Observations) -> float:
+        rt = np.diff([state.close for state in observations])
+        sigma_t_minus_1 = self._calculate_sigma(rt)
+        At_minus_1 = observations[-1].account_value
+        At_minus_2 = observations[-2].account_value if len(observations) >= 2 else 0
+        volatility_scaling = (self.sigma_tgt / sigma_t_minus_1) * (At_minus_1 / At_minus_2)
+        transaction_cost = self.bp * observations[-2].close
+        reward = self.mu * volatility_scaling * (rt - transaction_cost)
+        return float(np.mean(reward))
+
+def make_series(steps, flat=0, seed=0):
+    """ Random walk closes, the first flat rows constant, and account values """
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.002, steps)))
+    close[:flat] = close[0]
+    account_values = 10000.0 * np.cumprod(1.0 + rng.normal(0.0, 0.001, steps))
+    return close, account_values
+
+def rewards_of(reward_function, close, account_values, window_size, episodes=((0, None),)):
+    """ Rewards of one environment stepped over the episodes ((start, stop) rows), like TradingEnv does """
+    dates = pd.date_range('2021-01-01', periods=len(close), freq='4h')
+    rewards = []
+    for start, stop in episodes:
+        observations = Observations(window_size)
+        for i in range(start, len(close) if stop is None else stop):
+            state = State(date=dates[i], open=close[i], high=close[i], low=close[i], close=close[i])
+            state.balance = account_values[i]
+            observations.append(state)
+            if i >= start + window_size:
+                rewards.append(reward_function(observations))
+    return np.array(rewards)
+
+CASES = {
+    'random': dict(window_size=50, flat=0, bp=0.0001),
+    'one close difference': dict(window_size=2, flat=0, bp=0.0001),
+    'flat first window': dict(window_size=50, flat=80, bp=0.0001),
+    'flat without costs': dict(window_size=10, flat=30, bp=0.0),
+}
+
+@pytest.mark.filterwarnings('ignore:divide by zero', 'ignore:invalid value')
+@pytest.mark.parametrize('case', CASES)
+def test_standart_deviation_reward_matches_window_implementation(case):
+    window_size, flat, bp = CASES[case]['window_size'], CASES[case]['flat'], CASES[case]['bp']
+    close, account_values = make_series(400, flat=flat)
+    # two episodes without reset, the sigma estimate carries over like in TradingEnv
+    episodes = ((0, 250), (0, 400))
+    expected = rewards_of(WindowStandartDeviationReward(bp=bp), close, account_values, window_size, episodes)
+    reward_function = StandartDeviationReward(bp=bp)
+    rewards = rewards_of(reward_function, close, account_values, window_size, episodes)
+
+    if flat > window_size:
+        # the flat windows at the start have sigma 0 and an infinite (or, without costs, undefined) reward
+        assert (np.isnan(expected[0]) if bp == 0 else np.isneginf(expected[0]))
+    np.testing.assert_allclose(rewards, expected, rtol=1e-9, atol=0.0)
+    assert len(reward_function.sigma_estimate) == 2
+
+@pytest.mark.filterwarnings('ignore:divide by zero', 'ignore:invalid value')
+@pytest.mark.parametrize('case', CASES)
+def test_standart_deviation_reward_batch(case):
+    window_size, flat, bp = CASES[case]['window_size'], CASES[case]['flat'], CASES[case]['bp']
+    num_envs, steps = 3, 300
+    series = [make_series(steps, flat=flat, seed=seed) for seed in range(num_envs)]
+    expected = np.stack([rewards_of(WindowStandartDeviationReward(bp=bp), close, account_values, window_size) for close, account_values in series], axis=1)
+
+    reward_function = StandartDeviationReward(bp=bp)
+    close_data = np.concatenate([close for close, _ in series])
+    account_values = np.stack([values for _, values in series], axis=1)
+    offsets = np.arange(num_envs) * steps
+    rewards = np.stack([
+        reward_function(RewardBatch(
+            last_account_value=account_values[i - 1],
+            account_value=account_values[i],
+            close_data=close_data,
+            index=offsets + i,
+            window_size=window_size,
+            new_episode=np.full(num_envs, i == window_size),
+        ))
+        for i in range(window_size, steps)
+    ])
+    np.testing.assert_allclose(rewards, expected, rtol=1e-9, atol=0.0)
\ No newline at end of file
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from environment.scalers import Scaler, MinMaxScaler, StandardScaler, RobustScaler, SCALED_FEATURES
+from environment.state import Observations, OBSERVATION_FEATURES
+
+def scaled(feeder):
+    return feeder.data[:, :len(SCALED_FEATURES)]
+
+@pytest.mark.parametrize('scaler, offset, divisor', [
+    (MinMaxScaler(), lambda x: x.min(axis=0), lambda x: x.max(axis=0) - x.min(axis=0)),
+    (StandardScaler(), lambda x: x.mean(axis=0), lambda x: x.std(axis=0)),
+    (RobustScaler(), lambda x: np.median(x, axis=0), lambda x: np.subtract(*np.percentile(x, [75, 25], axis=0))),
+    (RobustScaler((10, 90)), lambda x: np.median(x, axis=0), lambda x: np.subtract(*np.percentile(x, [90, 10], axis=0))),
+])
+def test_fitted_statistics(feeder, scaler, offset, divisor):
+    scaler.fit(feeder)
+    x = scaled(feeder)
+    np.testing.assert_allclose(scaler._offset, offset(x))
+    np.testing.assert_allclose(scaler._divisor, divisor(x))
+
+    features = np.concatenate([feeder.data[:100], np.full((100, 1), 0.5)], axis=1)
+    expected = (features[:, :len(SCALED_FEATURES)] - offset(x)) / divisor(x)
+    out = scaler.transform_array(features)
+    assert out.dtype == np.float32
+    np.testing.assert_allclose(out[:, :len(SCALED_FEATURES)], expected, rtol=1e-6, atol=1e-6)
+    # session and allocation_percentage are passed through
+    np.testing.assert_array_equal(out[:, len(SCALED_FEATURES):], features[:, len(SCALED_FEATURES):])
+
+def test_global_range_and_constant_columns(feeder):
+    scaler = MinMaxScaler(min=feeder.min, max=feeder.max)
+    assert scaler.fitted
+    np.testing.assert_array_equal(scaler._offset, feeder.min)
+    np.testing.assert_array_equal(scaler._divisor, feeder.max - feeder.min)
+
+    data = scaled(feeder).copy()
+    data[:, OBSERVATION_FEATURES.index('volume')] = 3.0
+    scaler = StandardScaler().fit(data)
+    # a constant column is centered but not divided by its zero std
+    assert scaler._divisor[OBSERVATION_FEATURES.index('volume')] == 1.0
+    assert np.all(scaler.transform_array(data)[:, OBSERVATION_FEATURES.index('volume')] == 0.0)
+
+@pytest.mark.parametrize('scaler', [MinMaxScaler(), MinMaxScaler(min=10.0, max=20.0), StandardScaler(), RobustScaler((5.0, 95.0))])
+def test_save_load(tmp_path, feeder, scaler):
+    if not scaler.fitted:
+        scaler.fit(feeder)
+    path = str(tmp_path / 'run' / 'scaler.npz')
+    scaler.save(path)
+
+    loaded = Scaler.load(path, incremental=True)
+    assert type(loaded) is type(scaler) and loaded._incremental
+    np.testing.assert_array_equal(loaded._offset, scaler._offset)
+    np.testing.assert_array_equal(loaded._divisor, scaler._divisor)
+    if isinstance(scaler, RobustScaler):
+        assert loaded.quantile_range == (5.0, 95.0)
+    np.testing.assert_array_equal(loaded.transform_array(feeder.data), scaler.transform_array(feeder.data))
+
+    assert type(Scaler.load_run(str(tmp_path / 'run'), feeder)) is type(scaler)
+
+def test_load_run_without_scaler(tmp_path, feeder):
+    # runs saved before the scalers were stored are scaled with the price range of the evaluated data
+    scaler = Scaler.load_run(str(tmp_path), feeder, incremental=True)
+    assert isinstance(scaler, MinMaxScaler) and scaler._incremental
+    expected = MinMaxScaler(min=feeder.min, max=feeder.max)
+    np.testing.assert_array_equal(scaler.transform_array(feeder.data), expected.transform_array(feeder.data))
+    assert Scaler.load_run(str(tmp_path)) is None
+
+@pytest.mark.parametrize('scaler_cls', [MinMaxScaler, RobustScaler])
+def test_incremental_transform_across_resets(feeder, scaler_cls, window_size=20):
+    incremental, full = scaler_cls(incremental=True).fit(feeder), scaler_cls().fit(feeder)
+    observations = Observations(window_size)
+    rng = np.random.default_rng(0)
+    for start, steps in [(0, 30), (500, 5), (123, 40), (124, 1)]:
+        # like TradingEnv.reset, the window is filled before the first observation
+        observations.reset()
+        for index in range(start, start + window_size):
+            observations.append(feeder[index])
+        for index in range(start + window_size, start + window_size + steps):
+            # the newest state changes after its append, like its allocation in TradingEnv.step
+            observations[-1].allocation_percentage = rng.random()
+            np.testing.assert_array_equal(incremental.transform(observations), full.transform(observations))
+            observations.append(feeder[index])
+
+    # transforms while the window fills up change the observation shape
+    observations.reset()
+    for index in range(window_size + 3):
+        observations.append(feeder[index])
+        np.testing.assert_array_equal(incremental.transform(observations), full.transform(observations))
\ No newline at end of file
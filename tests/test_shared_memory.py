@@ -0,0 +1,43 @@
+import os
+import numpy as np
+import pytest
+from multiprocessing import shared_memory
+from stable_baselines3.common.vec_env import SubprocVecEnv
+from benchmarks import make_ohlc
+from benchmarks.shared_memory import EnvFactory
+from environment.data_feeder import PdDataFeeder
+from environment.indicators import RSI, MACD, BollingerBands, ATR
+
+def mapped_files(pid: int) -> set:
+    with open(f'/proc/{pid}/maps') as f:
+        return {line.split()[-1] for line in f if len(line.split()) == 6}
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/maps'), reason='reads the memory maps of the workers from /proc')
+def test_workers_attach_the_shared_blocks():
+    feeder = PdDataFeeder(make_ohlc(5000), indicators=[RSI, MACD, BollingerBands, ATR], shared_memory=True)
+    names = [shared.name for shared in feeder._shared]
+    try:
+        # spawned workers get the feeder pickled, like on platforms without fork
+        vec_env = SubprocVecEnv([EnvFactory(feeder) for _ in range(2)], start_method='spawn')
+        try:
+            vec_env.reset()
+            for action in np.random.default_rng(0).integers(0, 3, (20, 2)):
+                vec_env.step(action)
+
+            for process in vec_env.processes:
+                files = mapped_files(process.pid)
+                assert all(any(path.endswith(name) for path in files) for name in names)
+            for worker_feeder in vec_env.get_attr('_data_feeder'):
+                assert [shared.name for shared in worker_feeder._shared] == names
+                assert worker_feeder._df is None
+                np.testing.assert_array_equal(worker_feeder.data, feeder.data)
+                worker_feeder.close()
+        finally:
+            vec_env.close()
+    finally:
+        feeder.close()
+
+    # the owner unlinked the blocks
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
\ No newline at end of file
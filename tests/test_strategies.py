@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from benchmarks import make_ohlc
+from environment.data_feeder import PdDataFeeder
+from environment.indicators import RSI, MACD, BollingerBands, ATR, LondonAsiaSession, SessionIndicator
+from environment.scalers import MinMaxScaler
+from environment.trading_env import TradingEnv
+from environment.strategies import SupportResistanceDetector, SupportResistanceStrategy
+
+def make_feeder(sessions=None, rows=6000, freq='15min'):
+    """ Random walk with an upward drift and waves, so there are closes above the Asia highs (buys) and below the Asia closes (sells) """
+    df = make_ohlc(rows, freq=freq)
+    trend = np.arange(rows) * 3e-4 + 0.02 * np.sin(np.arange(rows) * 2 * np.pi / 300)
+    df[['open', 'high', 'low', 'close']] *= np.exp(trend)[:, None]
+    if sessions is None:
+        return PdDataFeeder(df, indicators=[RSI, MACD, BollingerBands, ATR, LondonAsiaSession], use_arrays=True)
+    df = SessionIndicator(df, sessions=sessions).calculate()
+    return PdDataFeeder(df, indicators=[RSI, MACD, BollingerBands, ATR], use_arrays=True)
+
+def detector_loop(features):
+    """ The detector gets every row as the oldest row of a window and is reset after a buy """
+    detector = SupportResistanceDetector()
+    signals = np.zeros(len(features), dtype=np.int64)
+    for row in range(len(features)):
+        signals[row] = detector.detect(features[row:row + 1])
+        if signals[row] == 2:
+            detector.reset()
+    return signals
+
+def detector_env(feeder, window_size):
+    """ The detector on the observations of a TradingEnv over the whole feeder, as rule_based.py ran it """
+    env = TradingEnv(
+        data_feeder=feeder,
+        output_transformer=MinMaxScaler(min=feeder.min, max=feeder.max, incremental=True),
+        initial_balance=1000.0,
+        max_episode_steps=len(feeder),
+        window_size=window_size,
+    )
+    detector = SupportResistanceDetector()
+    obs, info = env.reset()
+    actions, done = [], False
+    while not done:
+        action = int(detector.detect(obs))
+        if action == 2:
+            detector.reset()
+        actions.append(action)
+        obs, reward, terminated, truncated, info = env.step(action)
+        done = terminated or truncated
+    return np.array(actions)
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 256])
+@pytest.mark.parametrize('freq', ['5min', '1h'])
+def test_signals_match_detector(chunk_size, freq):
+    feeder = make_feeder(freq=freq)
+    features = MinMaxScaler(min=feeder.min, max=feeder.max).transform_array(feeder.data)
+    expected = detector_loop(features)
+    # several buys, so the detector is reset several times
+    assert np.count_nonzero(expected == 2) > 3 and np.count_nonzero(expected == 1) > 3
+    assert np.array_equal(SupportResistanceStrategy(chunk_size=chunk_size).signals(features), expected)
+
+@pytest.mark.parametrize('window_size', [2, 5])
+def test_actions_match_stepped_detector(window_size):
+    feeder = make_feeder(rows=2000)
+    features = MinMaxScaler(min=feeder.min, max=feeder.max).transform_array(feeder.data)
+    expected = detector_env(feeder, window_size)
+    assert np.count_nonzero(expected == 2) > 1
+    assert np.array_equal(SupportResistanceStrategy().actions(features, window_size), expected)
+
+@pytest.mark.parametrize('asia_hours, london_hours', [((22, 3), (3, 6.5)), ((0, 4), None), (None, (7, 9))])
+def test_session_hours(asia_hours, london_hours):
+    # the detector reads the session column of features labelled with the hours, the strategy labels the dates
+    sessions = (
+        (2, *(london_hours if london_hours is not None else (2, 5))),
+        (1, *(asia_hours if asia_hours is not None else (20, 2))),
+    )
+    labelled = make_feeder(sessions=sessions)
+    feeder = make_feeder()
+    assert not np.array_equal(labelled.column('session'), feeder.column('session'))
+
+    features = MinMaxScaler(min=feeder.min, max=feeder.max).transform_array(feeder.data)
+    expected = detector_loop(MinMaxScaler(min=labelled.min, max=labelled.max).transform_array(labelled.data))
+    assert np.count_nonzero(expected == 2) > 3
+    strategy = SupportResistanceStrategy(asia_hours=asia_hours, london_hours=london_hours, chunk_size=4)
+    assert np.array_equal(strategy.signals(features, feeder.dates), expected)
+    assert np.array_equal(strategy.actions(features, 3, feeder.dates), expected[:len(feeder) - 3])
\ No newline at end of file
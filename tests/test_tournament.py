@@ -0,0 +1,94 @@
+import os
+import numpy as np
+import pytest
+import torch as th
+from stable_baselines3 import PPO
+from environment.data_feeder import PdDataFeeder
+from environment.scalers import Scaler, MinMaxScaler
+from environment.trading_env import TradingEnv
+from environment.vec_trading_env import VecTradingEnv
+from environment.reward import StandartDeviationReward
+from environment.metrics import DifferentActions, AccountValue, AccountValueChange, MaxDrawdown, SharpeRatio, AverageWinLossRatio, WinCount, LossCount
+from environment.index_observations import IndexRolloutBuffer, WindowFeaturesExtractor, set_policy_features
+from environment.tournament import evaluate_agent, Tournament
+
+WINDOWS = [('2020-02-01', '2020-04-30'), ('2020-05-01', '2020-08-31'), ('2020-09-01', '2020-10-15')]
+
+def save_agent(feeder, run_path, index_observations, scaler):
+    """ An untrained agent with large random weights, so that it trades """
+    env = VecTradingEnv(
+        feeder,
+        num_envs=2,
+        output_transformer=scaler if scaler is not None else MinMaxScaler(min=feeder.min, max=feeder.max),
+        initial_balance=10000.0,
+        max_episode_steps=200,
+        reward_function=StandartDeviationReward(),
+        index_observations=index_observations,
+    )
+    kwargs = dict(policy_kwargs=dict(features_extractor_class=WindowFeaturesExtractor), rollout_buffer_class=IndexRolloutBuffer) if index_observations else {}
+    model = PPO('MlpPolicy', env, seed=0, device='cpu', **kwargs)
+    generator = th.Generator().manual_seed(0)
+    with th.no_grad():
+        for parameter in model.policy.parameters():
+            parameter.add_(th.randn(parameter.shape, generator=generator) * 3)
+    os.makedirs(run_path, exist_ok=True)
+    model.save(os.path.join(run_path, 'best_model'))
+    if scaler is not None:
+        scaler.save(os.path.join(run_path, 'scaler.npz'))
+
+def stepped_episode(feeder, run_path, start, end):
+    """ One TradingEnv episode over the window stepped like test.py """
+    start_row, stop_row = feeder.date_rows(start, end)
+    window_feeder = PdDataFeeder(feeder._df.iloc[start_row:stop_row].copy(), use_arrays=True)
+    model = PPO.load(os.path.join(run_path, 'best_model'), device='cpu')
+    index_observations = len(model.observation_space.shape) == 1
+    env = TradingEnv(
+        data_feeder=window_feeder,
+        output_transformer=Scaler.load_run(run_path, window_feeder, incremental=True),
+        initial_balance=10000.0,
+        max_episode_steps=len(window_feeder),
+        metrics=[
+            DifferentActions(), AccountValue(), AccountValueChange(), MaxDrawdown(),
+            SharpeRatio(ratio_days=(np.datetime64(end) - np.datetime64(start)).astype(int)),
+            AverageWinLossRatio(), WinCount(), LossCount(),
+        ],
+        index_observations=index_observations,
+    )
+    if index_observations:
+        set_policy_features(model.policy, env.features)
+    obs, info = env.reset()
+    while True:
+        action, _ = model.predict(obs, deterministic=True)
+        obs, reward, terminated, truncated, info = env.step(action)
+        if terminated or truncated:
+            return info['metrics']
+
+@pytest.mark.parametrize('index_observations', [False, True])
+@pytest.mark.parametrize('fit_scaler', [False, True])
+def test_evaluate_agent_matches_test_loop(tmp_path, feeder, index_observations, fit_scaler):
+    run_path = str(tmp_path / '1')
+    # runs without scaler.npz are scaled with the price range of every window
+    save_agent(feeder, run_path, index_observations, MinMaxScaler().fit(feeder) if fit_scaler else None)
+
+    results = evaluate_agent(feeder, run_path, WINDOWS)
+    assert [(row['agent'], row['start'], row['end']) for row in results] == [('1', *window) for window in WINDOWS]
+    for row, (start, end) in zip(results, WINDOWS):
+        expected = stepped_episode(feeder, run_path, start, end)
+        assert expected['different_actions'] > 1
+        assert {name: row[name] for name in expected} == pytest.approx(expected, rel=1e-9, abs=1e-12)
+
+def test_tournament_ranks_the_agents(tmp_path, feeder):
+    for agent, fit_scaler in (('1', True), ('2', False), ('10', True)):
+        save_agent(feeder, str(tmp_path / agent), False, MinMaxScaler().fit(feeder) if fit_scaler else None)
+    # folders without a best_model are not agents
+    os.makedirs(tmp_path / 'logs')
+
+    tournament = Tournament(feeder, WINDOWS[:2], runs_path=str(tmp_path), max_workers=2)
+    assert tournament.agents == [str(tmp_path / agent) for agent in ('1', '2', '10')]
+    table = tournament.run(str(tmp_path / 'tournament.csv'))
+    assert len(table) == 6 and table['rank'].tolist() == list(range(1, 7))
+    assert table['sharpe_ratio'].is_monotonic_decreasing
+    for agent in ('1', '2', '10'):
+        expected = evaluate_agent(feeder, str(tmp_path / agent), WINDOWS[:2])
+        rows = table[table['agent'] == agent].sort_values('start')
+        assert rows['account_value'].tolist() == [row['account_value'] for row in expected]
\ No newline at end of file
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from environment.scalers import MinMaxScaler
+from environment.trading_env import TradingEnv
+from environment.metrics import DifferentActions, AccountValue, AccountValueChange, MaxDrawdown, SharpeRatio, AverageWinLossRatio, WinCount, LossCount
+
+def make_env(feeder, metrics_schedule, info=('metrics',), max_episode_steps=500):
+    return TradingEnv(
+        data_feeder=feeder,
+        output_transformer=MinMaxScaler(min=feeder.min, max=feeder.max),
+        initial_balance=10000.0,
+        max_episode_steps=max_episode_steps,
+        window_size=10,
+        metrics=[DifferentActions(), AccountValue(), AccountValueChange(), MaxDrawdown(), SharpeRatio(), AverageWinLossRatio(), WinCount(), LossCount()],
+        info=info,
+        metrics_schedule=metrics_schedule,
+    )
+
+def run_episode(feeder, metrics_schedule, actions):
+    env = make_env(feeder, metrics_schedule)
+    # the episode start is drawn from the global random state
+    np.random.seed(0)
+    env.reset()
+    infos = []
+    for action in actions:
+        obs, reward, terminated, truncated, info = env.step(action)
+        infos.append(info.get('metrics'))
+        if terminated or truncated:
+            break
+    return infos
+
+@pytest.mark.parametrize('metrics_schedule', [1, 7, 64, 1000, 'episode'])
+def test_metrics_schedule_matches_step(feeder, metrics_schedule):
+    actions = np.random.default_rng(0).integers(0, 3, 490)
+    expected = run_episode(feeder, 'step', actions)
+    infos = run_episode(feeder, metrics_schedule, actions)
+    assert len(infos) == len(expected) == 490
+
+    steps = [step for step, metrics in enumerate(infos) if metrics is not None]
+    every = len(actions) if metrics_schedule == 'episode' else metrics_schedule
+    assert steps == sorted(set(range(every - 1, len(actions), every)) | {len(actions) - 1})
+    for step in steps:
+        assert infos[step] == pytest.approx(expected[step], rel=1e-12, abs=1e-15)
+
+@pytest.mark.parametrize('metrics_schedule', ['step', 7, 'episode'])
+def test_metrics_are_updated_without_info(feeder, metrics_schedule):
+    actions = np.random.default_rng(0).integers(0, 3, 490)
+    expected = run_episode(feeder, 'step', actions)[-1]
+
+    env = make_env(feeder, metrics_schedule, info=())
+    np.random.seed(0)
+    env.reset()
+    for action in actions:
+        obs, reward, terminated, truncated, info = env.step(action)
+        assert info == {}
+    assert {metric.name: metric.result for metric in env.metrics} == pytest.approx(expected, rel=1e-12, abs=1e-15)
\ No newline at end of file
@@ -0,0 +1,25 @@
+import pytest
+from environment.vec_trading_env import VecTradingEnv
+
+@pytest.fixture
+def env(feeder):
+    return VecTradingEnv(feeder, num_envs=4, max_episode_steps=100, window_size=10)
+
+def test_set_attr_all_envs(env):
+    env.set_attr('custom', 1)
+    env.set_attr('custom', 2, indices=[0, 1, 2, 3])
+    assert env.get_attr('custom') == [2, 2, 2, 2]
+    assert env.get_attr('custom', indices=[1]) == [2]
+
+@pytest.mark.parametrize('indices', [0, [1, 2], range(3)])
+def test_set_attr_subset(env, indices):
+    with pytest.raises(AssertionError):
+        env.set_attr('custom', 1, indices=indices)
+
+def test_env_method(env):
+    calls = []
+    env.record = lambda value: calls.append(value) or value
+    assert env.env_method('record', 3) == [3, 3, 3, 3]
+    assert calls == [3]
+    with pytest.raises(AssertionError):
+        env.env_method('record', 3, indices=[0])
\ No newline at end of file
@@ -0,0 +1,45 @@
+import os
+import pandas as pd
+import pytest
+from stable_baselines3 import PPO
+from environment.scalers import Scaler
+from environment.tournament import Tournament, evaluate_policy
+from environment.walk_forward import WalkForward
+
+def make_walk_forward(feeder, **kwargs):
+    return WalkForward(feeder, train_size=300, test_size=100, step=1000, num_envs=2, ppo_kwargs=dict(batch_size=60), max_workers=1, seed=0, **kwargs)
+
+@pytest.fixture(scope='module')
+def walk_forward_run(feeder, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('walk_forward'))
+    walk_forward = make_walk_forward(feeder)
+    return walk_forward, walk_forward.run(path), path
+
+def test_folds(feeder):
+    assert make_walk_forward(feeder).folds == [((0, 300), (300, 400)), ((1000, 1300), (1300, 1400))]
+    assert make_walk_forward(feeder, anchored=True).folds == [((0, 300), (300, 400)), ((0, 1300), (1300, 1400))]
+
+def test_fold_results(feeder, walk_forward_run):
+    walk_forward, table, path = walk_forward_run
+    pd.testing.assert_frame_equal(pd.read_csv(os.path.join(path, 'folds.csv'), parse_dates=['train_start', 'train_end', 'test_start', 'test_end']), table, check_dtype=False)
+
+    for fold, (train_rows, test_rows) in enumerate(walk_forward.folds):
+        fold_path = os.path.join(path, f'fold_{fold}')
+        # the model after the last epoch, not a selected best_model
+        assert sorted(os.listdir(fold_path)) == ['model.zip', 'scaler.npz']
+        row = table.iloc[fold]
+        assert row['test_start'] == pd.Timestamp(feeder.dates[test_rows[0]]) and row['test_end'] == pd.Timestamp(feeder.dates[test_rows[1] - 1])
+
+        # the first window ends at the first test row, so the episode covers all test rows
+        model = PPO.load(os.path.join(fold_path, 'model'), device='cpu')
+        eval_rows = (test_rows[0] - 49, test_rows[1])
+        result, = evaluate_policy(feeder, model, [eval_rows], [(row['test_end'] - row['test_start']).days], Scaler.load_run(fold_path), 10000.0)
+        assert len(result) == test_rows[1] - test_rows[0]
+        assert result.metrics == pytest.approx(row[list(result.metrics)].to_dict(), rel=1e-12)
+
+def test_tournament_of_the_folds(feeder, walk_forward_run):
+    _, table, path = walk_forward_run
+    windows = [(str(table['test_start'][0].date()), str(table['test_end'][0].date()))]
+    tournament = Tournament(feeder, windows, runs_path=path, max_workers=1, model_name='model')
+    assert tournament.agents == [os.path.join(path, 'fold_0'), os.path.join(path, 'fold_1')]
+    assert sorted(tournament.run()['agent']) == ['fold_0', 'fold_1']
\ No newline at end of file
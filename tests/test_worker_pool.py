@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+from environment.worker_pool import map_tasks, rank_table
+
+def close_sum(data_feeder, start, stop):
+    return float(data_feeder.column('close')[start:stop].sum())
+
+def test_map_tasks(feeder):
+    tasks = [(start, start + 100) for start in range(0, 1000, 100)]
+    results = map_tasks(close_sum, tasks, feeder, max_workers=2, chunksize=3)
+    assert results == [close_sum(feeder, *task) for task in tasks]
+
+def test_rank_table(tmp_path):
+    results = [{'agent': 'a', 'sharpe_ratio': 0.5}, {'agent': 'b', 'sharpe_ratio': 1.5}, {'agent': 'c', 'sharpe_ratio': 0.5}]
+    table = rank_table(results, 'sharpe_ratio', str(tmp_path / 'table.csv'))
+    assert list(table.columns) == ['rank', 'agent', 'sharpe_ratio']
+    # ties keep the order of the results
+    assert table['agent'].tolist() == ['b', 'a', 'c'] and np.array_equal(table['rank'], [1, 2, 3])
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'table.csv'), table)
\ No newline at end of file
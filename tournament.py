@@ -0,0 +1,38 @@
+import argparse
+import pandas as pd
+
+from environment.data_feeder import PdDataFeeder
+from environment.feature_cache import FeatureCache
+from environment.indicators import RSI, MACD, BollingerBands, ATR
+from environment.tournament import Tournament
+
+pd.options.mode.copy_on_write = True
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Evaluate every saved agent in the runs folder on several date windows")
+    parser.add_argument('--data', required=True, help="parity name, ex: BTCUSDT_4h")
+    parser.add_argument('--windows', nargs='+', required=True, help="date windows as YYYY-MM-DD:YYYY-MM-DD")
+    parser.add_argument('--runs', default='runs', help="folder of the saved agents")
+    parser.add_argument('--model', default='best_model', help="file name of the saved agents, model for the folds of walk_forward.py")
+    parser.add_argument('--workers', type=int, default=None, help="number of worker processes, all cores by default")
+    parser.add_argument('--torch-threads', type=int, default=1, help="torch threads of every worker")
+    parser.add_argument('--output', default='tournament_results.csv', help="csv file of the ranked results")
+    args = parser.parse_args()
+
+    df = FeatureCache().get(f'data/crypto/{args.data}.csv', indicators=[RSI, MACD, BollingerBands, ATR])
+    pd_data_feeder = PdDataFeeder(df, use_arrays=True, shared_memory=True)
+
+    tournament = Tournament(
+        data_feeder=pd_data_feeder,
+        windows=[window.split(':') for window in args.windows],
+        runs_path=args.runs,
+        max_workers=args.workers,
+        torch_threads=args.torch_threads,
+        model_name=args.model,
+    )
+    table = tournament.run(args.output)
+    print(table.to_string(index=False))
+    print(tournament.summary(table).to_string())
+    print(f"{len(table)} evaluations written to {args.output}")
+
+    pd_data_feeder.close()
\ No newline at end of file
@@ -1,4 +1,3 @@
-import pandas as pd
 from stable_baselines3 import PPO
 import torch as th
 from stable_baselines3.common.env_util import make_vec_env
@@ -7,26 +6,40 @@ from stable_baselines3.common.callbacks import EvalCallback
 from agent.helper import get_agent_number
 from environment.trading_env import TradingEnv
 from environment.data_feeder import PdDataFeeder
+from environment.feature_cache import FeatureCache
 from environment.indicators import RSI, MACD, BollingerBands, ATR
-from environment.scalers import MinMaxScaler
+from environment.scalers import Scaler, MinMaxScaler
 from environment.reward import StandartDeviationReward 
+from environment.index_observations import IndexRolloutBuffer, WindowFeaturesExtractor, set_policy_features
 from environment.metrics import DifferentActions, AccountValue, AccountValueChange, MaxDrawdown, SharpeRatio, AverageWinLossRatio, WinCount, LossCount
 
 data_source = input("Parity name : (ex: BTCUSDT_4h)")
-df = pd.read_csv(f'data/crypto/{data_source}.csv')
+df = FeatureCache().get(f'data/crypto/{data_source}.csv', indicators=[RSI, MACD, BollingerBands, ATR])
 df = df[:-720] # leave data for testing
 epoch = int(input("Enter the epoch: "))
-pd_data_feeder = PdDataFeeder(df, indicators=[RSI, MACD, BollingerBands, ATR])
+pd_data_feeder = PdDataFeeder(df, use_arrays=True)
 ratio_days = (df['date'].iloc[-1] - df['date'].iloc[0]).days
+run_number = get_agent_number("runs/")
+
+# fit the per-column scaling statistics once on the training data and store them next to the model for test.py
+scaler = MinMaxScaler().fit(pd_data_feeder)
+scaler.save(f"runs/{run_number}/scaler.npz")
+# the scaled features are shared by the envs and the policy, which gathers the observation windows from them
+features = scaler.transform_array(pd_data_feeder.data)
 
 def make_env():
     return TradingEnv(
         data_feeder=pd_data_feeder,
-        output_transformer=MinMaxScaler(min=pd_data_feeder.min, max=pd_data_feeder.max),
+        output_transformer=Scaler.load(f"runs/{run_number}/scaler.npz", incremental=True),
         initial_balance=10000.0,
         max_episode_steps=len(df),
         window_size=50,
         reward_function=StandartDeviationReward(),
+        index_observations=True,
+        features=features,
+        # nothing reads the states or per-step metrics while training, the metrics are calculated once per episode
+        info=('metrics',),
+        metrics_schedule='episode',
         metrics=[
             DifferentActions(),
             AccountValue(),
@@ -40,7 +53,6 @@ def make_env():
     )
 
 vec_env = make_vec_env(make_env, n_envs=4)
-run_number = get_agent_number("runs/")
 print(f"Run number: {run_number}")
 print(f"Total days: {ratio_days}")
 print(f"Start date: {df['date'].iloc[0]}")
@@ -49,8 +61,12 @@ print(f"End date: {df['date'].iloc[-1]}")
 eval_callback = EvalCallback(vec_env, best_model_save_path=f"runs/{run_number}",
                             log_path=f"runs/{run_number}/", eval_freq=len(df), n_eval_episodes=1,
                             deterministic=True, render=False, verbose=1)
+# observations are row indexes plus the allocation column, the rollout buffer stores only these and the policy
+# gathers the windows from the scaled features
 policy_kwargs = dict(activation_fn=th.nn.ReLU,
-                     net_arch=dict(pi=[128, 128], vf=[128, 128]))
+                     net_arch=dict(pi=[128, 128], vf=[128, 128]),
+                     features_extractor_class=WindowFeaturesExtractor)
 
-model_ppo = PPO("MlpPolicy", vec_env, verbose=1, n_steps=len(df), n_epochs=epoch, learning_rate = 0.0001, batch_size=64, policy_kwargs=policy_kwargs, device='cuda')
+model_ppo = PPO("MlpPolicy", vec_env, verbose=1, n_steps=len(df), n_epochs=epoch, learning_rate = 0.0001, batch_size=64, policy_kwargs=policy_kwargs, device='cuda', rollout_buffer_class=IndexRolloutBuffer)
+set_policy_features(model_ppo.policy, features)
 model_ppo.learn(total_timesteps=epoch*len(df), callback=eval_callback)
\ No newline at end of file
@@ -0,0 +1,45 @@
+import json
+import argparse
+import pandas as pd
+
+from environment.data_feeder import PdDataFeeder
+from environment.feature_cache import FeatureCache
+from environment.indicators import RSI, MACD, BollingerBands, ATR
+from environment.walk_forward import WalkForward
+
+pd.options.mode.copy_on_write = True
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train and evaluate PPO agents on rolling train/test folds")
+    parser.add_argument('--data', required=True, help="parity name, ex: BTCUSDT_4h")
+    parser.add_argument('--train-size', type=int, required=True, help="training rows of every fold")
+    parser.add_argument('--test-size', type=int, default=720, help="test rows of every fold")
+    parser.add_argument('--step', type=int, default=None, help="rows the folds move forward by, test-size by default")
+    parser.add_argument('--anchored', action='store_true', help="train every fold from the first row (expanding window)")
+    parser.add_argument('--epochs', type=int, default=1, help="epochs of every fold")
+    parser.add_argument('--ppo-kwargs', default='{}', help="JSON object of PPO arguments, ex: {\"n_steps\": 2048}")
+    parser.add_argument('--torch-threads', type=int, default=1, help="torch threads of every training job")
+    parser.add_argument('--workers', type=int, default=None, help="concurrent training jobs, cpu count // torch-threads by default")
+    parser.add_argument('--output', default='runs/walk_forward', help="folder of the fold models and results")
+    args = parser.parse_args()
+
+    df = FeatureCache().get(f'data/crypto/{args.data}.csv', indicators=[RSI, MACD, BollingerBands, ATR])
+    pd_data_feeder = PdDataFeeder(df, use_arrays=True, shared_memory=True)
+
+    walk_forward = WalkForward(
+        data_feeder=pd_data_feeder,
+        train_size=args.train_size,
+        test_size=args.test_size,
+        step=args.step,
+        anchored=args.anchored,
+        epochs=args.epochs,
+        ppo_kwargs=json.loads(args.ppo_kwargs),
+        torch_threads=args.torch_threads,
+        max_workers=args.workers,
+    )
+    print(f"{len(walk_forward.folds)} folds")
+    table = walk_forward.run(args.output)
+    print(table.to_string(index=False))
+    print(walk_forward.summary(table).to_string())
+
+    pd_data_feeder.close()
\ No newline at end of file